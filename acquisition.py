@@ -0,0 +1,361 @@
+# acquisition.py
+import logging
+import threading
+import time
+from drivers import BUFFERED, PER_SAMPLE
+from metrics import log_event
+from scheduler import SampleScheduler, SKIP
+
+log = logging.getLogger("dmm.acquisition")
+
+
+class RetryPolicy:
+    """
+    RetryPolicy says how transient I/O errors during a run are handled: up to `attempts`
+    retries per reading or block, with an exponential backoff from initial_delay up to
+    max_delay seconds. Before each retry reconnect() is called, e.g. to reopen the
+    resource through DeviceManager.reopen_resource.
+    """
+    def __init__(self, errors=(OSError,), attempts=5, initial_delay=0.5, max_delay=30.0, reconnect=None):
+        self.errors = errors
+        self.attempts = attempts
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.reconnect = reconnect
+
+    def delay(self, attempt):
+        return min(self.max_delay, self.initial_delay * 2 ** (attempt - 1))
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class BaseAcquisitionRunner:
+    """
+    BaseAcquisitionRunner holds what AcquisitionRunner and its asyncio counterpart
+    AsyncAcquisitionRunner (async_instrument.py) share: the choice of mode and block size,
+    the sample schedule, the timestamps of buffered blocks, the delivery of samples to the
+    recorder, checkpoint and callbacks, and the retry decisions. Subclasses only wait and
+    talk to the instrument, blocking or with await.
+
+    mode is "per-sample" or "buffered"; by default the fastest mode the
+    instrument driver declares is used. A buffered run whose interval is too
+    long for a single reading to be fetched within the I/O timeout is paced
+    per sample instead. settings (from InstrumentDriver.settings)
+    configure the instrument once at the start of the run; without them every
+    per-sample reading sends the function's MEASure command.
+
+    With a RetryPolicy, transient I/O errors are retried after reconnecting and
+    reconfiguring the instrument. With a Checkpoint, progress is saved as the run
+    goes, and a run can be resumed from first_index (see checkpoint.py).
+    The measurement provides driver, metrics and instrument (the resource name).
+    """
+    def __init__(self, measurement, measurement_type, num_measurements, interval_seconds,
+                 mode=None, overrun_policy=SKIP, recorder=None, settings=None,
+                 retry=None, checkpoint=None, first_index=0):
+        self.measurement = measurement
+        self.measurement_type = measurement_type
+        self.num_measurements = num_measurements
+        self.interval_seconds = interval_seconds
+        self.mode = mode or measurement.driver.fastest_mode
+        self.recorder = recorder
+        self.settings = settings
+        self.retry = retry
+        self.checkpoint = checkpoint
+        self.first_index = first_index
+        self.retries = 0
+        self.scheduler = SampleScheduler(interval_seconds, overrun_policy)
+        self.instrument_paced = False
+        self._chunk_size = None
+        self._buffer_count = None
+        self._block_started = None  # When the last attempt to read a block started
+        self._on_retry = None
+        self._overruns = 0
+        self._skipped = 0
+        self._cancel_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def paused(self):
+        return not self._resume_event.is_set()
+
+    def cancel(self):
+        """
+        Request the run to stop. Safe to call from any thread.
+        """
+        self._cancel_event.set()
+        self._resume_event.set()  # Wake up a paused run so it can exit
+
+    def pause(self):
+        """
+        Pause the run before the next sample is taken.
+        """
+        self._resume_event.clear()
+
+    def resume(self):
+        """
+        Resume a paused run.
+        """
+        self._resume_event.set()
+
+    def timing_statistics(self):
+        """
+        Return the achieved sample timing of the last run.
+        """
+        stats = self.scheduler.statistics()
+        stats["instrument_paced"] = self.instrument_paced
+        return stats
+
+    def _started(self, timeout_seconds, on_retry):
+        """
+        Pick the block size of a buffered run, falling back to per-sample pacing if a
+        single reading does not fit in the I/O timeout, and log the start of the run.
+        """
+        self._on_retry = on_retry
+        if self.mode == BUFFERED:
+            self._chunk_size = buffer_chunk_size(self.measurement.driver.buffer, self.num_measurements,
+                                                 self.interval_seconds, timeout_seconds)
+            if not self._chunk_size:
+                log_event(log, logging.WARNING, "Interval too long for a buffered run, pacing per sample",
+                          instrument=self.measurement.instrument, interval_seconds=self.interval_seconds)
+                self.mode = PER_SAMPLE
+                self._chunk_size = None
+        log_event(log, logging.INFO, "Run started", instrument=self.measurement.instrument,
+                  type=self.measurement_type, samples=self.num_measurements, interval_seconds=self.interval_seconds,
+                  mode=self.mode, first_index=self.first_index)
+        if self.checkpoint:
+            self.checkpoint.update(force=True)
+
+    def _failed(self, error):
+        log_event(log, logging.ERROR, "Run failed", instrument=self.measurement.instrument,
+                  type=self.measurement_type, error=str(error), retries=self.retries)
+
+    def _finished(self, completed):
+        log_event(log, logging.INFO, "Run finished", instrument=self.measurement.instrument,
+                  type=self.measurement_type, completed=completed, retries=self.retries,
+                  **self.timing_statistics())
+        if self.checkpoint:
+            self.checkpoint.update(force=True)
+
+    def _display_not_restored(self, error):
+        # The samples are taken; a display left off does not fail the run
+        log_event(log, logging.WARNING, "Could not turn the display back on", instrument=self.measurement.instrument,
+                  error=str(error))
+
+    def _start_schedule(self, start_time):
+        self.scheduler.start(start_time)
+        if self.first_index:
+            self.scheduler.skip_to_now()
+
+    def _count_overruns(self):
+        if self.scheduler.overruns == self._overruns:
+            return
+        metrics, instrument = self.measurement.metrics, self.measurement.instrument
+        metrics.counter("dmm_schedule_overruns_total", "Samples taken an interval or more late",
+                        instrument=instrument).inc(self.scheduler.overruns - self._overruns)
+        metrics.counter("dmm_skipped_samples_total", "Samples dropped by the skip overrun policy",
+                        instrument=instrument).inc(self.scheduler.skipped - self._skipped)
+        self._overruns, self._skipped = self.scheduler.overruns, self.scheduler.skipped
+
+    def _deliver(self, on_sample, index, timestamp, measured_value):
+        """
+        Hand one sample to the recorder, the checkpoint and on_sample.
+        """
+        if self.recorder:
+            self.recorder.append(timestamp, measured_value)
+        if self.checkpoint:
+            self.checkpoint.update(timestamp)
+        if on_sample:
+            on_sample(index, timestamp, measured_value)
+
+    def _block_count(self, done):
+        """
+        Return the number of readings in the next buffered block, and whether the instrument's
+        sample count has to be changed for it (only the last block of a run is shorter).
+        """
+        count = min(self._chunk_size, self.num_measurements - done)
+        changed = count != self._buffer_count
+        self._buffer_count = count
+        return count, changed
+
+    def _block_timestamps(self, block_start, block_end, count):
+        """
+        Return the timestamps of the readings of a buffered block that was started at
+        block_start and fetched at block_end (seconds since the start of the run).
+        Each reading takes the interval plus its own integration time, which depends on
+        the settings, so the readings are spread evenly over the measured duration of the
+        block; the last one is stamped when the block was fetched.
+        """
+        step = (block_end - block_start) / count if count else 0.0
+        return [block_start + (k + 1) * step for k in range(count)]
+
+    def _retry_delay(self, error, attempt):
+        """
+        Decide whether failed attempt number `attempt` is retried. Returns the delay before the
+        next attempt, or None if the error has to be raised.
+        """
+        if self.retry is None or not isinstance(error, self.retry.errors) or attempt > self.retry.attempts:
+            return None
+        self.retries += 1
+        delay = self.retry.delay(attempt)
+        self.measurement.metrics.counter("dmm_retries_total", "Readings retried by a RetryPolicy",
+                                         instrument=self.measurement.instrument).inc()
+        log_event(log, logging.WARNING, "Retrying after I/O error", instrument=self.measurement.instrument,
+                  attempt=attempt, delay_seconds=delay, error=str(error))
+        if self._on_retry:
+            self._on_retry(attempt, error, delay)
+        return delay
+
+
+class AcquisitionRunner(BaseAcquisitionRunner):
+    """
+    AcquisitionRunner drives a Measurement for a fixed number of samples.
+    It contains no GUI code, so it can run on a worker thread and be
+    cancelled or paused from another thread. See BaseAcquisitionRunner
+    for the modes, settings, retries and checkpoints.
+    """
+    def run(self, on_sample=None, on_progress=None, start_time=None, on_retry=None):
+        """
+        Acquire all samples, calling on_sample(index, timestamp, value) and
+        on_progress(done, total) after each one. Timestamps are seconds since
+        the start of the run on the monotonic clock; pass start_time to share
+        the same time base between several runners, or to continue the
+        timestamps of a resumed run. on_retry(attempt, error, delay) is called
+        before a transient error is retried.
+        Samples are also appended to the recorder, if one was given.
+        Returns True if the run completed, False if it was cancelled.
+        """
+        timeout_ms = getattr(self.measurement.usb_device, "timeout", None)
+        self._started(timeout_ms / 1000 if timeout_ms else None, on_retry)
+        completed = False
+        try:
+            if self.settings:
+                self._with_retry(self.measurement.configure, self.settings)
+            if self.mode == BUFFERED:
+                completed = self._run_buffered(on_sample, on_progress, start_time)
+            else:
+                completed = self._run_per_sample(on_sample, on_progress, start_time)
+            return completed
+        except _Cancelled:
+            return False
+        except Exception as e:
+            self._failed(e)
+            raise
+        finally:
+            self._finished(completed)
+            try:
+                self.measurement.restore_display()
+            except Exception as e:
+                self._display_not_restored(e)
+
+    def _run_per_sample(self, on_sample, on_progress, start_time=None):
+        """
+        Take one reading per scheduled deadline.
+        """
+        self._start_schedule(start_time)
+        for i in range(self.first_index, self.num_measurements):
+            if not self._wait_if_paused():
+                return False
+
+            timestamp = self.scheduler.wait(self._cancel_event)
+            if timestamp is None:
+                return False
+            self._count_overruns()
+
+            measured_value = self._with_retry(self.measurement.read, self.measurement_type, i + 1)
+            self._deliver(on_sample, i, timestamp, measured_value)
+            if on_progress:
+                on_progress(i + 1, self.num_measurements)
+        return True
+
+    def _wait_if_paused(self):
+        """
+        Block while paused. Returns False if the run was cancelled.
+        """
+        if self.paused:
+            self._resume_event.wait()
+            self.scheduler.reset_deadline()
+        return not self.cancelled
+
+    def _run_buffered(self, on_sample, on_progress, start_time=None):
+        """
+        Let the instrument pace and store the readings itself, then fetch
+        them in blocks. Cancel and pause take effect between blocks.
+        """
+        self.instrument_paced = True
+        self._with_retry(self._configure_buffer)
+        if start_time is None:
+            start_time = time.monotonic()
+        done = self.first_index
+        while done < self.num_measurements:
+            if not self._wait_if_paused():
+                return False
+
+            values = self._with_retry(self._read_block, done)
+            timestamps = self._block_timestamps(self._block_started - start_time, time.monotonic() - start_time,
+                                               len(values))
+            for timestamp, measured_value in zip(timestamps, values):
+                self._deliver(on_sample, done, timestamp, measured_value)
+                done += 1
+            if on_progress:
+                on_progress(done, self.num_measurements)
+        return True
+
+    def _configure_buffer(self):
+        self.measurement.configure_buffer(self.measurement_type, self._chunk_size, self.interval_seconds)
+        self._buffer_count = self._chunk_size
+
+    def _read_block(self, done):
+        count, changed = self._block_count(done)
+        if changed:
+            self.measurement.set_buffer_count(count)
+        self._block_started = time.monotonic()
+        return self.measurement.read_buffer()
+
+    def _with_retry(self, operation, *args):
+        """
+        Call operation, retrying transient I/O errors as the retry policy allows. Before
+        each retry the device is reconnected and the run's configuration is sent again;
+        reconnecting, reconfiguring and the operation together make up one attempt.
+        """
+        attempt = 0
+        while True:
+            try:
+                if attempt:
+                    self._reconnect()
+                return operation(*args)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                if self._cancel_event.wait(delay):
+                    raise _Cancelled()
+
+    def _reconnect(self):
+        if self.retry.reconnect:
+            self.retry.reconnect()
+        if self.settings:
+            self.measurement.configure(self.settings)
+        if self._chunk_size is not None:
+            self._configure_buffer()
+
+
+def buffer_chunk_size(buffer, num_measurements, interval_seconds, timeout_seconds):
+    """
+    Pick how many readings to take per block: no more than the
+    instrument's reading memory, and few enough that filling it
+    finishes well within the I/O timeout. Returns 0 if not even one
+    reading does; the run has to be paced per sample then.
+    """
+    chunk_size = min(num_measurements, buffer.max_samples or num_measurements)
+    sample_seconds = interval_seconds + buffer.reading_seconds
+    if timeout_seconds and sample_seconds > 0:
+        chunk_size = min(chunk_size, int(timeout_seconds * 0.8 / sample_seconds))
+    return chunk_size
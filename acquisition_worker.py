@@ -0,0 +1,114 @@
+# acquisition_worker.py
+import time
+from PyQt6 import QtCore
+from metrics import default_metrics
+
+
+class AcquisitionWorker(QtCore.QObject):
+    """
+    AcquisitionWorker runs an AcquisitionRunner on a QThread and reports
+    samples, progress and completion back to the GUI thread through signals.
+
+    Samples are coalesced into batches of (index, timestamp, value) tuples and
+    emitted at most max_rate times per second, so the GUI cost per second stays
+    the same however fast the instrument is sampled. Emitted samples count
+    towards dmm_pending_samples until the GUI calls samples_shown().
+    """
+    samples_acquired = QtCore.pyqtSignal(list)
+    progress = QtCore.pyqtSignal(int, int)
+    retrying = QtCore.pyqtSignal(int, str, float)
+    error = QtCore.pyqtSignal(str)
+    finished = QtCore.pyqtSignal(bool)
+
+    def __init__(self, runner, max_rate=30):
+        super().__init__()
+        self.runner = runner
+        self.min_emit_interval = 1 / max_rate
+        self._batch = []
+        self._progress = None
+        self._last_emit = 0.0
+        self.pending_samples = default_metrics().gauge("dmm_pending_samples",
+                                                       "Samples acquired but not yet shown by the GUI")
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        """
+        Run the acquisition. Emits finished(True) on completion and
+        finished(False) if the run was cancelled or failed.
+        """
+        completed = False
+        try:
+            completed = self.runner.run(on_sample=self._on_sample, on_progress=self._on_progress,
+                                        on_retry=self._on_retry)
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self._emit_batch()
+            self.finished.emit(completed)
+
+    def _on_retry(self, attempt, error, delay):
+        self._emit_batch()
+        self.retrying.emit(attempt, str(error), delay)
+
+    def _on_sample(self, index, timestamp, measured_value):
+        self._batch.append((index, timestamp, measured_value))
+
+    def _on_progress(self, done, total):
+        self._progress = (done, total)
+        if time.monotonic() - self._last_emit >= self.min_emit_interval:
+            self._emit_batch()
+
+    def _emit_batch(self):
+        if self._batch:
+            batch, self._batch = self._batch, []
+            self.pending_samples.inc(len(batch))
+            self.samples_acquired.emit(batch)
+        if self._progress:
+            self.progress.emit(*self._progress)
+            self._progress = None
+        self._last_emit = time.monotonic()
+
+    def samples_shown(self, count):
+        """
+        Called by the GUI once it has processed a batch of samples_acquired.
+        """
+        self.pending_samples.dec(count)
+
+    def cancel(self):
+        self.runner.cancel()
+
+    def pause(self):
+        self.runner.pause()
+
+    def resume(self):
+        self.runner.resume()
+
+
+class AsyncAcquisitionWorker(AcquisitionWorker):
+    """
+    AsyncAcquisitionWorker runs an AsyncAcquisitionRunner on an EventLoopThread instead of
+    a QThread, with the same signals and batching. The signals are emitted from the event
+    loop thread and delivered to the GUI thread as queued signals.
+    """
+    def __init__(self, runner, loop_thread, max_rate=30):
+        super().__init__(runner, max_rate)
+        self.loop_thread = loop_thread
+        self.future = None
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        """
+        Start the acquisition on the event loop and return immediately.
+        """
+        self.future = self.loop_thread.submit(self._run())
+
+    async def _run(self):
+        completed = False
+        try:
+            completed = await self.runner.run(on_sample=self._on_sample, on_progress=self._on_progress,
+                                              on_retry=self._on_retry)
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self._emit_batch()
+            self.finished.emit(completed)
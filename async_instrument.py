@@ -0,0 +1,464 @@
+# async_instrument.py
+"""
+Asynchronous instrument I/O.
+
+Instruments are driven from an asyncio event loop instead of one blocking thread per meter:
+
+    ExecutorInstrument   wraps a blocking resource from DeviceManager (USB, GPIB, VISA, simulated)
+                         and runs its calls on a shared thread pool.
+    SocketInstrument     talks to raw-socket LAN instruments (TCPIP::host::port::SOCKET) with
+                         asyncio streams, so waiting for a meter costs no thread at all.
+
+Both offer awaitable write, query and read_values (bulk read) calls with a per-call timeout.
+AsyncMeasurement and AsyncAcquisitionRunner are the asyncio counterparts of Measurement and
+AcquisitionRunner, and EventLoopThread runs the event loop next to the Qt event loop.
+
+Example:
+    async def main():
+        runners = {name: AsyncAcquisitionRunner(await open_measurement(device_manager, info), "DC Voltage", 100, 0.1,
+                                                retry=retry_policy(device_manager, info))
+                   for name, info in devices.items()}
+        await acquire_all(runners, on_sample=print)
+"""
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from acquisition import BaseAcquisitionRunner, RetryPolicy
+from device_manager import resource_name
+from drivers import BUFFERED
+from metrics import default_metrics
+from scheduler import SKIP
+
+SOCKET_RESOURCE = re.compile(r"TCPIP\d*::([^:]+)::(\d+)::SOCKET$", re.IGNORECASE)
+STREAM_LIMIT = 1024 * 1024  # Largest response line, e.g. a full reading memory
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+
+def shared_executor():
+    """
+    Return the thread pool shared by all ExecutorInstruments.
+    """
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="dmm-io")
+        return _shared_executor
+
+
+class ExecutorInstrument:
+    """
+    ExecutorInstrument makes a blocking resource awaitable by running its calls on a thread pool.
+    A command and its response are kept together by a per-instrument lock. If a call times out
+    the awaiting task is released at once; the blocked call still finishes on its pool thread
+    before the next call to the same instrument starts.
+    """
+    def __init__(self, resource, executor=None, timeout=None):
+        self.resource = resource
+        self.resource_name = getattr(resource, "instrument", None) or getattr(resource, "resource_name", "unknown")
+        self.executor = executor or shared_executor()
+        self.timeout = timeout
+        self._lock = asyncio.Lock()
+        self._io_lock = threading.Lock()
+
+    async def write(self, message, timeout=None):
+        async with self._lock:
+            await self._call(timeout, self.resource.write_raw, message)
+
+    async def query(self, message, timeout=None):
+        async with self._lock:
+            return await self._call(timeout, self._query, message)
+
+    async def read_values(self, message, timeout=None):
+        """
+        Send a query that returns a comma-separated block of readings and parse it.
+        """
+        response = await self.query(message, timeout)
+        return [float(value) for value in response.split(",")]
+
+    async def close(self):
+        """
+        Resources are owned by the DeviceManager pool and closed by DeviceManager.close_all.
+        """
+        pass
+
+    def _query(self, message):
+        self.resource.write_raw(message)
+        return self.resource.read()
+
+    def _locked(self, function, *args):
+        with self._io_lock:
+            return function(*args)
+
+    async def _call(self, timeout, function, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self._locked, function, *args)
+        return await asyncio.wait_for(future, timeout or self.timeout)
+
+
+class SocketInstrument:
+    """
+    SocketInstrument talks SCPI over a raw TCP socket with asyncio streams.
+    The connection is opened on first use. After a timeout or a broken connection it is
+    dropped, so a late response cannot be taken as the answer to the next query, and
+    reopened by the next call.
+    """
+    def __init__(self, host, port, timeout=10.0, read_termination=b"\n"):
+        self.host = host
+        self.port = port
+        self.resource_name = f"TCPIP::{host}::{port}::SOCKET"
+        self.timeout = timeout
+        self.read_termination = read_termination
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+
+    async def write(self, message, timeout=None):
+        async with self._lock:
+            await self._send(message, timeout or self.timeout)
+
+    async def query(self, message, timeout=None):
+        timeout = timeout or self.timeout
+        async with self._lock:
+            await self._send(message, timeout)
+            try:
+                response = await asyncio.wait_for(self._reader.readuntil(self.read_termination), timeout)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, OSError):
+                await self._drop()
+                raise
+            return response.decode("ascii")
+
+    async def read_values(self, message, timeout=None):
+        """
+        Send a query that returns a comma-separated block of readings and parse it.
+        """
+        response = await self.query(message, timeout)
+        return [float(value) for value in response.split(",")]
+
+    async def close(self):
+        async with self._lock:
+            await self._drop()
+
+    async def _send(self, message, timeout):
+        try:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, limit=STREAM_LIMIT), timeout)
+            self._writer.write(message)
+            await asyncio.wait_for(self._writer.drain(), timeout)
+        except (asyncio.TimeoutError, OSError):
+            await self._drop()
+            raise
+
+    async def _drop(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+async def open_instrument(device_manager, device_info, executor=None):
+    """
+    Return an async instrument for a device entry from devices.json: a SocketInstrument for
+    TCPIP::host::port::SOCKET resources, otherwise an ExecutorInstrument around the pooled connection.
+    """
+    timeout = device_info["timeout"] / 1000
+    match = SOCKET_RESOURCE.match(resource_name(device_info))
+    if match:
+        return SocketInstrument(match.group(1), int(match.group(2)), timeout)
+    loop = asyncio.get_running_loop()
+    connection = await loop.run_in_executor(executor or shared_executor(), device_manager.connect_device, device_info)
+    return ExecutorInstrument(connection, executor, timeout)
+
+
+async def open_measurement(device_manager, device_info, executor=None):
+    """
+    Return an AsyncMeasurement for a device entry, using the device's driver.
+    """
+    device = await open_instrument(device_manager, device_info, executor)
+    return AsyncMeasurement(device, device_manager.driver(device_info), device_manager.metrics)
+
+
+def retry_policy(device_manager, device_info, **options):
+    """
+    Return a RetryPolicy for async runs on a device entry. A SocketInstrument drops a broken
+    connection and opens a new one on the next call, so it needs no reconnect; other resources
+    are reopened in the DeviceManager pool (see DeviceManager.retry_policy).
+    """
+    if SOCKET_RESOURCE.match(resource_name(device_info)):
+        return RetryPolicy(errors=(OSError, asyncio.IncompleteReadError), **options)
+    return device_manager.retry_policy(device_info, **options)
+
+
+class AsyncMeasurement:
+    """
+    AsyncMeasurement takes readings through an async instrument with the commands of an
+    InstrumentDriver, like Measurement does for blocking resources. device is the
+    ExecutorInstrument or SocketInstrument; instrument is its resource name.
+    """
+    def __init__(self, device, driver, metrics=None):
+        self.device = device
+        self.driver = driver
+        self.metrics = metrics or default_metrics()
+        self.instrument = device.resource_name
+        self.configured_type = None
+        self._display_off = False
+
+    async def configure(self, settings):
+        """
+        Configure the instrument once for a run with the settings from InstrumentDriver.settings.
+        """
+        for command in self.driver.configure_commands(settings):
+            await self.device.write(command.raw)
+        self._display_off = settings.get("display") is False
+        self.configured_type = settings["measurement_type"]
+
+    async def restore_display(self):
+        if self._display_off:
+            await self.device.write(self.driver.display.format(state="ON").raw)
+            self._display_off = False
+
+    async def read(self, measurement_type, timeout=None):
+        """
+        Take a single reading. MEASure is only sent if the run was not configured with configure().
+        """
+        function = self.driver.function(measurement_type)
+        if measurement_type != self.configured_type:
+            await self.device.write(function.measure.raw)
+        if self.driver.trigger:
+            await self.device.write(self.driver.trigger.raw)
+        return float(await self.device.query(self.driver.fetch.raw, timeout))
+
+    async def configure_buffer(self, measurement_type, count, interval_seconds):
+        configured = measurement_type == self.configured_type
+        for command in self.driver.buffer_commands(measurement_type, count, interval_seconds, configured):
+            await self.device.write(command.raw)
+
+    async def set_buffer_count(self, count):
+        await self.device.write(self.driver.buffer.sample_count.format(count=count).raw)
+
+    async def read_buffer(self, timeout=None):
+        """
+        Start a buffered acquisition and fetch all readings in one block.
+        """
+        await self.device.write(self.driver.buffer.initiate.raw)
+        return await self.device.read_values(self.driver.buffer.fetch.raw, timeout)
+
+
+class AsyncAcquisitionRunner(BaseAcquisitionRunner):
+    """
+    AsyncAcquisitionRunner is the asyncio counterpart of AcquisitionRunner: the same modes,
+    pacing, overrun policies, retries, checkpoints and recorder (see BaseAcquisitionRunner),
+    but waiting for the instrument, the next deadline or a retry never blocks a thread.
+    cancel(), pause() and resume() may be called from any thread. timeout overrides the
+    I/O timeout of the instrument.
+    """
+    def __init__(self, measurement, measurement_type, num_measurements, interval_seconds,
+                 mode=None, overrun_policy=SKIP, recorder=None, settings=None,
+                 retry=None, checkpoint=None, first_index=0, timeout=None):
+        super().__init__(measurement, measurement_type, num_measurements, interval_seconds, mode, overrun_policy,
+                         recorder, settings, retry, checkpoint, first_index)
+        self.timeout = timeout
+        self._loop = None
+        self._task = None
+        self._resumed = None
+
+    def cancel(self):
+        super().cancel()
+        self._call_in_loop(self._cancel_task)
+
+    def pause(self):
+        super().pause()
+        self._call_in_loop(self._update_resumed)
+
+    def resume(self):
+        super().resume()
+        self._call_in_loop(self._update_resumed)
+
+    async def run(self, on_sample=None, on_progress=None, start_time=None, on_retry=None):
+        """
+        Acquire all samples, calling on_sample(index, timestamp, value), on_progress(done, total)
+        and on_retry(attempt, error, delay) as AcquisitionRunner.run does.
+        Returns True if the run completed, False if it was cancelled with cancel().
+        """
+        self._resumed = asyncio.Event()
+        self._update_resumed()
+        self._task = asyncio.current_task()
+        self._loop = asyncio.get_running_loop()
+        self._started(self.timeout or getattr(self.measurement.device, "timeout", None), on_retry)
+        completed = False
+        try:
+            if self.cancelled:
+                return False
+            if self.settings:
+                await self._with_retry(self.measurement.configure, self.settings)
+            if self.mode == BUFFERED:
+                completed = await self._run_buffered(on_sample, on_progress, start_time)
+            else:
+                completed = await self._run_per_sample(on_sample, on_progress, start_time)
+            return completed
+        except asyncio.CancelledError:
+            if not self.cancelled:
+                raise
+            return False
+        except Exception as e:
+            self._failed(e)
+            raise
+        finally:
+            self._task = None  # A late cancel() must not interrupt restoring the display
+            self._finished(completed)
+            try:
+                await self.measurement.restore_display()
+            except Exception as e:
+                self._display_not_restored(e)
+
+    async def _run_per_sample(self, on_sample, on_progress, start_time):
+        self._start_schedule(start_time)
+        for i in range(self.first_index, self.num_measurements):
+            if not await self._wait_if_paused():
+                return False
+            deadline = self.scheduler.next_deadline()
+            delay = deadline - self.scheduler.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            timestamp = self.scheduler.taken(deadline)
+            self._count_overruns()
+
+            measured_value = await self._with_retry(self.measurement.read, self.measurement_type, self.timeout)
+            self._deliver(on_sample, i, timestamp, measured_value)
+            if on_progress:
+                on_progress(i + 1, self.num_measurements)
+        return True
+
+    async def _run_buffered(self, on_sample, on_progress, start_time):
+        self.instrument_paced = True
+        await self._with_retry(self._configure_buffer)
+        if start_time is None:
+            start_time = time.monotonic()
+        done = self.first_index
+        while done < self.num_measurements:
+            if not await self._wait_if_paused():
+                return False
+
+            values = await self._with_retry(self._read_block, done)
+            timestamps = self._block_timestamps(self._block_started - start_time, time.monotonic() - start_time,
+                                               len(values))
+            for timestamp, measured_value in zip(timestamps, values):
+                self._deliver(on_sample, done, timestamp, measured_value)
+                done += 1
+            if on_progress:
+                on_progress(done, self.num_measurements)
+        return True
+
+    async def _configure_buffer(self):
+        await self.measurement.configure_buffer(self.measurement_type, self._chunk_size, self.interval_seconds)
+        self._buffer_count = self._chunk_size
+
+    async def _read_block(self, done):
+        count, changed = self._block_count(done)
+        if changed:
+            await self.measurement.set_buffer_count(count)
+        self._block_started = time.monotonic()
+        return await self.measurement.read_buffer(self.timeout)
+
+    async def _with_retry(self, operation, *args):
+        """
+        Await operation, retrying transient I/O errors as the retry policy allows, like
+        AcquisitionRunner._with_retry. A blocking reconnect runs on the shared thread pool.
+        """
+        attempt = 0
+        while True:
+            try:
+                if attempt:
+                    await self._reconnect()
+                return await operation(*args)
+            except Exception as e:
+                attempt += 1
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    async def _reconnect(self):
+        if self.retry.reconnect:
+            await self._loop.run_in_executor(shared_executor(), self.retry.reconnect)
+        if self.settings:
+            await self.measurement.configure(self.settings)
+        if self._chunk_size is not None:
+            await self._configure_buffer()
+
+    async def _wait_if_paused(self):
+        if not self._resumed.is_set():
+            await self._resumed.wait()
+            self.scheduler.reset_deadline()
+        return not self.cancelled
+
+    def _update_resumed(self):
+        if self.paused:
+            self._resumed.clear()
+        else:
+            self._resumed.set()
+
+    def _cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def _call_in_loop(self, callback):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(callback)
+
+
+async def acquire_all(runners, on_sample=None, on_progress=None):
+    """
+    Run several AsyncAcquisitionRunners concurrently on the current event loop with a
+    shared start time. on_sample(name, index, timestamp, value) and on_progress(name, done, total)
+    receive the device name first. Returns {name: True/False or the exception that stopped the device}.
+    """
+    start_time = time.monotonic()
+    names = list(runners)
+
+    def bind(callback, name):
+        return (lambda *args: callback(name, *args)) if callback else None
+
+    results = await asyncio.gather(*(runners[name].run(bind(on_sample, name), bind(on_progress, name), start_time)
+                                     for name in names), return_exceptions=True)
+    return dict(zip(names, results))
+
+
+class EventLoopThread:
+    """
+    EventLoopThread runs an asyncio event loop on a background thread, so coroutines can be
+    started from the Qt GUI thread with submit() while Qt keeps its own event loop.
+    """
+    def __init__(self, name="dmm-asyncio"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the loop. Returns a concurrent.futures.Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        """
+        Stop the loop and wait for the thread to exit.
+        """
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.loop.close()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
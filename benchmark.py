@@ -0,0 +1,380 @@
+# benchmark.py
+"""
+Acquisition benchmark. Drives Measurement and DeviceManager against the simulated
+instrument or real hardware and reports samples per second and the latency of every
+stage of the acquisition path. Results are saved as JSON so they can be compared
+against a stored baseline.
+
+Example:
+    python benchmark.py --device Simulated_DMM --count 500 --output benchmarks/baseline.json
+    python benchmark.py --device Simulated_DMM --count 500 --compare benchmarks/baseline.json
+    python benchmark.py --startup
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from acquisition import AcquisitionRunner
+from device_manager import DeviceManager
+from drivers import BUFFERED, DEFAULT_DEVICES_FILE, PER_SAMPLE, load_devices
+from measurement import Measurement
+
+CONFIGURED = "configured"  # per-sample, configured once instead of MEASure per sample
+
+
+def summarize(latencies):
+    """
+    Summarize a list of latencies in seconds as count, mean, p50 and p99 in milliseconds.
+    """
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": percentile(50),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+class TimedResource:
+    """
+    TimedResource wraps an instrument resource and records the latency of every
+    write, query and read, keyed by the SCPI command header (arguments stripped).
+    The last response of every query is kept for the parsing benchmark.
+    """
+    def __init__(self, resource):
+        self.resource = resource
+        self.latencies = {}
+        self.responses = {}
+        self._last_command = ""
+
+    def write(self, command):
+        return self._timed(f"write {command.split(' ')[0]}", self.resource.write, command)
+
+    def write_raw(self, message):
+        self._last_command = message.decode("ascii").strip().split(" ")[0]
+        return self._timed(f"write {self._last_command}", self.resource.write_raw, message)
+
+    def query(self, command):
+        key = f"query {command.split(' ')[0]}"
+        response = self._timed(key, self.resource.query, command)
+        self.responses[key] = response
+        return response
+
+    def read(self):
+        key = f"read {self._last_command}"
+        response = self._timed(key, self.resource.read)
+        self.responses[key] = response
+        return response
+
+    def _timed(self, key, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.latencies.setdefault(key, []).append(time.perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
+
+def benchmark_acquisition(connection, driver, measurement_type, count, interval_seconds, mode, settings=None):
+    """
+    Run one acquisition and return the throughput and per-stage latencies.
+    mode is the name of the run: PER_SAMPLE, CONFIGURED or BUFFERED.
+    """
+    timed = TimedResource(connection)
+    measurement = Measurement(timed, driver=driver, verbose=False, keep_values=False)
+    runner = AcquisitionRunner(measurement, measurement_type, count, interval_seconds,
+                               mode=PER_SAMPLE if mode == CONFIGURED else mode, settings=settings)
+
+    stages = {"schedule wait": [], "sample total": []}
+    scheduler_wait = runner.scheduler.wait
+
+    def timed_wait(cancel_event=None):
+        start = time.perf_counter()
+        timestamp = scheduler_wait(cancel_event)
+        stages["schedule wait"].append(time.perf_counter() - start)
+        return timestamp
+
+    runner.scheduler.wait = timed_wait
+
+    last_sample = [time.perf_counter()]
+
+    def on_sample(index, timestamp, value):
+        now = time.perf_counter()
+        stages["sample total"].append(now - last_sample[0])
+        last_sample[0] = now
+
+    start = time.perf_counter()
+    runner.run(on_sample=on_sample, on_progress=lambda done, total: last_sample.__setitem__(0, time.perf_counter()))
+    elapsed = time.perf_counter() - start
+
+    responses = [response.strip() for response in timed.responses.values() if response.strip()]
+    return {
+        "mode": mode,
+        "settings": settings,
+        "samples": count,
+        "elapsed_s": elapsed,
+        "samples_per_second": count / elapsed if elapsed > 0 else None,
+        "transactions": {key: summarize(values) for key, values in timed.latencies.items()},
+        # In buffered mode samples arrive in blocks, so only the transactions are meaningful
+        "stages": {} if runner.mode == BUFFERED else {key: summarize(values) for key, values in stages.items()},
+        "parse": benchmark_parse(responses),
+    }
+
+
+def benchmark_parse(responses, repeat=2000):
+    """
+    Time the float parsing done by Measurement for the given raw responses.
+    """
+    readings = sum(len(response.split(",")) for response in responses)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for response in responses:
+            [float(value) for value in response.split(",")]
+    elapsed = time.perf_counter() - start
+    return {"readings_per_response": readings / max(1, len(responses)),
+            "us_per_reading": elapsed / (repeat * max(1, readings)) * 1e6}
+
+
+def benchmark_gui(count=5000, batch_size=100):
+    """
+    Measure the cost of showing samples in the status view, per sample line
+    versus batched through StatusLog. Needs PyQt6; runs with the offscreen platform.
+    """
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt6 import QtWidgets
+        from status_log import StatusLog
+    except ImportError:
+        return {"skipped": "PyQt6 is not installed"}
+
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    lines = [f"Measurement {i + 1}: {5.0:.5f} V" for i in range(count)]
+
+    text_edit = QtWidgets.QTextEdit()
+    start = time.perf_counter()
+    for line in lines:
+        text_edit.append(line)
+    app.processEvents()
+    per_line = (time.perf_counter() - start) / count
+
+    text_edit = QtWidgets.QTextEdit()
+    status_log = StatusLog(text_edit)
+    status_log.begin_samples()
+    start = time.perf_counter()
+    for i in range(0, count, batch_size):
+        status_log.append_lines(lines[i:i + batch_size])
+    app.processEvents()
+    batched = (time.perf_counter() - start) / count
+
+    return {"samples": count, "append_us_per_sample": per_line * 1e6,
+            "status_log_us_per_sample": batched * 1e6, "batch_size": batch_size}
+
+
+def measure_startup(launched_at):
+    """
+    Start the GUI and return the seconds from launched_at (time.time() when the process was
+    started) until the window module is imported, the window is created, the window is first
+    painted and the background instrument scan has finished.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6 import QtCore, QtWidgets
+    from main_window import MainWindow
+    times = {"imported_s": time.time() - launched_at}
+
+    app = QtWidgets.QApplication([])
+    MainWindow.offer_resume = lambda self, path=None: None  # No resume dialog in the benchmark
+    window = MainWindow()
+    times["window_created_s"] = time.time() - launched_at
+
+    class PaintFilter(QtCore.QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QtCore.QEvent.Type.Paint and "first_paint_s" not in times:
+                times["first_paint_s"] = time.time() - launched_at
+                QtCore.QTimer.singleShot(0, app.quit)
+            return False
+
+    paint_filter = PaintFilter()
+    window.installEventFilter(paint_filter)
+    QtCore.QTimer.singleShot(10000, app.quit)
+    window.show()
+    app.exec()
+
+    try:
+        window.device_manager.list_resources()  # Waits for the scan started by the window
+        times["devices_listed_s"] = time.time() - launched_at
+    except Exception:
+        times["devices_listed_s"] = None
+    window.close()
+    return times
+
+
+def benchmark_startup(runs=3):
+    """
+    Measure the time to first paint of the GUI, launched in a fresh interpreter for each
+    run so imports are not cached. Returns the median of each stage over the runs.
+    """
+    try:
+        import PyQt6
+    except ImportError:
+        return {"skipped": "PyQt6 is not installed"}
+
+    results = []
+    for _ in range(runs):
+        launched_at = time.time()
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), "--startup-child", repr(launched_at)],
+                                 capture_output=True, text=True, timeout=120,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen")))
+        if process.returncode != 0:
+            return {"error": (process.stderr.strip().splitlines() or ["startup failed"])[-1]}
+        results.append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    summary = {"runs": runs}
+    for key in results[0]:
+        values = [result[key] for result in results if result.get(key) is not None]
+        summary[key] = statistics.median(values) if values else None
+    return summary
+
+
+def print_startup(startup):
+    if "skipped" in startup or "error" in startup:
+        print(f"[startup] {startup.get('skipped') or 'error: ' + startup['error']}")
+        return
+    print(f"[startup] median of {startup['runs']} launches")
+    for key, label in (("imported_s", "modules imported"), ("window_created_s", "window created"),
+                       ("first_paint_s", "first paint"), ("devices_listed_s", "instrument scan done")):
+        value = startup.get(key)
+        print(f"  {label:<32} {value * 1000:8.1f} ms" if value is not None else f"  {label:<32} -")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare samples per second against a baseline. Returns a list of regression messages.
+    """
+    regressions = []
+    for mode, result in results["runs"].items():
+        reference = baseline.get("runs", {}).get(mode)
+        if not reference or not reference.get("samples_per_second") or not result.get("samples_per_second"):
+            continue
+        change = result["samples_per_second"] / reference["samples_per_second"] - 1
+        print(f"{mode}: {result['samples_per_second']:.1f} samples/s ({change:+.1%} vs baseline)")
+        if change < -tolerance:
+            regressions.append(f"{mode} throughput dropped by {-change:.1%}")
+    return regressions
+
+
+def print_results(results):
+    for mode, result in results["runs"].items():
+        print(f"\n[{mode}] {result['samples']} samples in {result['elapsed_s']:.3f} s "
+              f"= {result['samples_per_second']:.1f} samples/s")
+        for group in ("transactions", "stages"):
+            for key, stats in result[group].items():
+                if stats["count"]:
+                    print(f"  {key:<32} n={stats['count']:<6} p50={stats['p50_ms']:8.3f} ms  p99={stats['p99_ms']:8.3f} ms")
+        print(f"  {'float parsing':<32} {result['parse']['us_per_reading']:.3f} us/reading")
+    gui = results["gui"]
+    if "skipped" in gui:
+        print(f"\n[gui] skipped: {gui['skipped']}")
+    else:
+        print(f"\n[gui] QTextEdit.append {gui['append_us_per_sample']:.1f} us/sample, "
+              f"StatusLog {gui['status_log_us_per_sample']:.1f} us/sample")
+
+
+def save_results(results, path):
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=4)
+        print(f"\nResults saved to {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition path.")
+    parser.add_argument("--devices-file", default=DEFAULT_DEVICES_FILE, help="device configuration file")
+    parser.add_argument("--device", default="Simulated_DMM", help="device name from the devices file")
+    parser.add_argument("--type", default="DC Voltage", help="measurement type")
+    parser.add_argument("--count", type=int, default=200, help="samples per run")
+    parser.add_argument("--interval", type=float, default=0, help="interval between samples in ms")
+    parser.add_argument("--mode", choices=[PER_SAMPLE, CONFIGURED, BUFFERED, "all"], default="all")
+    parser.add_argument("--speed", help="speed preset for the configured and buffered runs (default: the driver's default)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the GUI update benchmark")
+    parser.add_argument("--startup", action="store_true",
+                        help="only measure the GUI startup time (time to first paint)")
+    parser.add_argument("--startup-runs", type=int, default=3, help="launches measured by --startup; the median is reported")
+    parser.add_argument("--startup-child", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed throughput drop vs. the baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    if args.startup_child is not None:
+        print(json.dumps(measure_startup(args.startup_child)))
+        return 0
+    if args.startup:
+        results = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "startup": benchmark_startup(args.startup_runs),
+        }
+        print_startup(results["startup"])
+        save_results(results, args.output)
+        return 0
+
+    devices = load_devices(args.devices_file)
+    device_info = devices[args.device]
+
+    device_manager = DeviceManager()
+    try:
+        connection = device_manager.connect_device(device_info)
+        results = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "device": args.device,
+            "identification": device_manager.identify(device_info),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {"type": args.type, "count": args.count, "interval_ms": args.interval},
+            "runs": {},
+        }
+        driver = device_manager.driver(device_info)
+        settings = driver.settings(args.type, args.speed or driver.default_speed)
+        if args.mode in (PER_SAMPLE, "all"):
+            results["runs"][PER_SAMPLE] = benchmark_acquisition(connection, driver, args.type, args.count,
+                                                                args.interval / 1000, PER_SAMPLE)
+        if args.mode in (CONFIGURED, "all") and settings:
+            results["runs"][CONFIGURED] = benchmark_acquisition(connection, driver, args.type, args.count,
+                                                                args.interval / 1000, CONFIGURED, settings)
+        if args.mode in (BUFFERED, "all") and driver.buffer:
+            results["runs"][BUFFERED] = benchmark_acquisition(connection, driver, args.type, args.count,
+                                                              args.interval / 1000, BUFFERED, settings)
+    finally:
+        device_manager.close_all()
+    results["gui"] = {"skipped": "disabled with --no-gui"} if args.no_gui else benchmark_gui()
+
+    print_results(results)
+    save_results(results, args.output)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for message in regressions:
+            print(f"Regression: {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
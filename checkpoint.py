@@ -0,0 +1,104 @@
+# checkpoint.py
+"""
+Checkpoints for resumable long runs.
+
+While a run is recorded, a small JSON file next to the recording ("<recording>.checkpoint")
+holds everything needed to continue it: the device, the measurement settings and how many
+samples are safely on disk. It is replaced atomically, so it is never half written, and the
+recording is flushed and synced before the checkpoint is updated, so the recording always
+holds at least the samples the checkpoint counts.
+
+A run that completes or is stopped by the user removes its checkpoint. A checkpoint that is
+still there on the next start belongs to a run that crashed or failed, and can be resumed
+with resume_point(): the samples are appended to the same recording, continuing the sample
+index and the timestamps.
+"""
+import glob
+import json
+import os
+import time
+from datetime import datetime
+from recorder import Recording
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+VERSION = 1
+
+
+def checkpoint_path(recording_path):
+    return recording_path + CHECKPOINT_SUFFIX
+
+
+def write_atomic(path, data):
+    """
+    Write a JSON file so that readers see either the old or the new content, never a partial file.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "w") as file:
+        json.dump(data, file, indent=4)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+
+def find_checkpoints(directory):
+    """
+    Return the checkpoint files of interrupted runs in a directory, newest first.
+    """
+    paths = glob.glob(os.path.join(directory, "*" + CHECKPOINT_SUFFIX))
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+
+def load_checkpoint(path):
+    with open(path, "r") as file:
+        state = json.load(file)
+    if state.get("version") != VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {state.get('version')}")
+    return state
+
+
+def resume_point(state):
+    """
+    Return (samples, time_offset) for continuing a run: the number of samples in the recording
+    and the timestamp the next sample should get, one interval after the last recorded one.
+    """
+    with Recording(state["recording"]) as recording:
+        samples = len(recording)
+        last_timestamp = recording[-1][0] if samples else None
+    if last_timestamp is None:
+        return 0, 0.0
+    return samples, last_timestamp + max(state["interval_seconds"], 0.0)
+
+
+class Checkpoint:
+    """
+    Checkpoint keeps the checkpoint file of one recorded run up to date.
+    update() is called after every sample or block and writes at most every interval_seconds.
+    """
+    def __init__(self, recorder, state, interval_seconds=5.0):
+        self.recorder = recorder
+        self.path = checkpoint_path(recorder.path)
+        self.state = dict(state, version=VERSION, recording=recorder.path)
+        self.interval_seconds = interval_seconds
+        self._last_write = None
+
+    def update(self, last_timestamp=None, force=False):
+        """
+        Sync the recording and write the checkpoint, if interval_seconds have passed or force is set.
+        """
+        if last_timestamp is not None:
+            self.state["last_timestamp"] = last_timestamp
+        now = time.monotonic()
+        if not force and self._last_write is not None and now - self._last_write < self.interval_seconds:
+            return
+        self.recorder.flush(sync=True)
+        self.state["samples"] = self.recorder.count
+        self.state["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        write_atomic(self.path, self.state)
+        self._last_write = now
+
+    def remove(self):
+        """
+        Delete the checkpoint once the run no longer needs to be resumed.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
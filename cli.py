@@ -0,0 +1,310 @@
+# cli.py
+"""
+Headless command-line entry point. Runs measurements without importing Qt.
+
+Example:
+    python cli.py --device BK_Precision_5493C --type "DC Voltage" --count 100 --interval 500 --output run.txt
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from acquisition import AcquisitionRunner
+from async_instrument import AsyncAcquisitionRunner, acquire_all, open_measurement, retry_policy
+from checkpoint import Checkpoint, load_checkpoint, resume_point
+from device_manager import DeviceManager
+from drivers import AUTO_RANGE, BUFFERED, DEFAULT_DEVICES_FILE, PER_SAMPLE, default_registry, format_settings, load_devices
+from measurement import Measurement
+from metrics import add_monitoring_arguments, start_monitoring
+from multi_device_session import MultiDeviceSession
+from recorder import Recorder, identification_metadata
+from running_stats import RunningStatistics, format_statistics
+from scheduler import SKIP, CATCH_UP, format_timing
+from simulated_instrument import SIMULATED_DEVICE_INFO, SIMULATED_DEVICE_NAME
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run DMM measurements without the GUI.")
+    parser.add_argument("--devices-file", default=DEFAULT_DEVICES_FILE, help="device configuration file")
+    parser.add_argument("--list-devices", action="store_true", help="list configured devices and exit")
+    parser.add_argument("--device", action="append", help="device name from the devices file; repeat to measure several devices at once")
+    parser.add_argument("--all-devices", action="store_true", help="measure every device in the devices file at once")
+    parser.add_argument("--type", default="DC Voltage", help="measurement type, as listed by --list-devices")
+    parser.add_argument("--count", type=int, default=1, help="number of measurements")
+    parser.add_argument("--interval", type=float, default=500, help="interval between measurements in ms")
+    parser.add_argument("--speed", help="speed/accuracy preset of the instrument driver, e.g. Fast or Accurate "
+                                        "(default: the driver's default, see --list-devices)")
+    parser.add_argument("--range", type=range_value, default=AUTO_RANGE, help="fixed measurement range, or 'auto' (default)")
+    parser.add_argument("--mode", choices=[PER_SAMPLE, BUFFERED],
+                        help="who paces the samples: the software scheduler, or the instrument with its reading memory "
+                             "(default: the driver's fastest mode)")
+    parser.add_argument("--policy", default=SKIP, choices=[SKIP, CATCH_UP], help="what to do when the instrument cannot keep up")
+    parser.add_argument("--output", help="output file (default: stdout)")
+    parser.add_argument("--record", help="also append the samples to a binary .dmmrec recording; "
+                                         "progress is checkpointed next to it so the run can be resumed")
+    parser.add_argument("--resume", metavar="CHECKPOINT", help="resume an interrupted recorded run from its .checkpoint file")
+    parser.add_argument("--retries", type=int, default=5, help="retries per reading after an I/O error (0 to fail at once)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="drive all devices from one asyncio event loop instead of one thread per device")
+    parser.add_argument("--simulate", action="store_true", help="measure the simulated instrument instead of real hardware")
+    add_monitoring_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def range_value(text):
+    return AUTO_RANGE if text.lower() == AUTO_RANGE else float(text)
+
+
+def device_settings(args, driver):
+    """
+    Return the instrument settings for the run and the unit of the measurement type.
+    """
+    return driver.settings(args.type, args.speed or driver.default_speed, args.range), driver.unit(args.type)
+
+
+def write_header(output, args, identifications, settings):
+    output.write(f"# Measurement done at: {datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}\n")
+    for name, identification in identifications.items():
+        output.write(f"# Device {name}: {identification}\n")
+        output.write(f"# {format_settings(*settings[name])}\n")
+    output.write(f"# Measurement Type: {args.type}\n")
+    output.write(f"# Number of measurements: {args.count}\n")
+    output.write(f"# Interval: {args.interval} ms\n")
+
+
+def run_single(args, devices, device_manager, output, resume=None):
+    """
+    Measure a single device. resume is the checkpoint state of an interrupted run to continue.
+    """
+    device_info = devices[args.device[0]]
+    usb_device = device_manager.connect_device(device_info)
+    identifications = {args.device[0]: device_manager.identify(device_info)}
+    driver = device_manager.driver(device_info)
+    settings, unit = (resume["settings"], resume["unit"]) if resume else device_settings(args, driver)
+
+    recorder = None
+    checkpoint = None
+    first_index = 0
+    start_time = None
+    if resume:
+        first_index, time_offset = resume_point(resume)
+        start_time = time.monotonic() - time_offset  # Timestamps continue where the recording ends
+        recorder = Recorder.reopen(resume["recording"])
+        checkpoint = Checkpoint(recorder, resume)
+    elif args.record:
+        metadata = {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            **identification_metadata(next(iter(identifications.values()), "")),
+            "measurement_type": args.type,
+            "unit": unit,
+            "settings": settings,
+            "num_measurements": args.count,
+            "interval_seconds": args.interval / 1000,
+        }
+        recorder = Recorder(args.record, metadata)
+        checkpoint = Checkpoint(recorder, {
+            "device": args.device[0],
+            "measurement_type": args.type,
+            "unit": unit,
+            "num_measurements": args.count,
+            "interval_seconds": args.interval / 1000,
+            "mode": args.mode or driver.fastest_mode,
+            "overrun_policy": args.policy,
+            "settings": settings,
+            "started_at": metadata["started_at"],
+        })
+
+    measurement = Measurement(usb_device, driver=driver, verbose=False, keep_values=False)
+    statistics = RunningStatistics()
+    retry = device_manager.retry_policy(device_info, attempts=args.retries) if args.retries > 0 else None
+    runner = AcquisitionRunner(measurement, args.type, args.count, args.interval / 1000,
+                               mode=args.mode, overrun_policy=args.policy,
+                               recorder=recorder, settings=settings,
+                               retry=retry, checkpoint=checkpoint, first_index=first_index)
+    write_header(output, args, identifications, {args.device[0]: (settings, unit)})
+    if resume:
+        output.write(f"# Resumed at sample {first_index} of {args.count}\n")
+    output.write("# index\ttimestamp_s\tvalue\n")
+
+    def on_sample(index, timestamp, value):
+        statistics.add(value, timestamp)
+        output.write(f"{index}\t{timestamp:.6f}\t{value}\n")
+
+    def on_retry(attempt, error, delay):
+        print(f"I/O error: {error}; reconnecting in {delay:.1f} s (attempt {attempt} of {args.retries})", file=sys.stderr)
+
+    try:
+        completed = runner.run(on_sample=on_sample, start_time=start_time, on_retry=on_retry)
+    except KeyboardInterrupt:
+        runner.cancel()
+        completed = False
+    except Exception:
+        if checkpoint:
+            print(f"The run can be resumed with: python cli.py --resume {checkpoint.path}", file=sys.stderr)
+            checkpoint = None  # Keep it for --resume
+        raise
+    finally:
+        if checkpoint:
+            checkpoint.remove()
+        if recorder:
+            recorder.close()
+
+    for line in format_timing(runner.timing_statistics()):
+        output.write(f"# {line}\n")
+    for line in format_statistics(statistics.snapshot()):
+        output.write(f"# {line}\n")
+    return completed
+
+
+def run_multi(args, devices, device_manager, output):
+    """
+    Measure several devices in parallel and write one merged row per tick of the shared schedule.
+    """
+    session = MultiDeviceSession(device_manager, {name: devices[name] for name in args.device})
+    names = session.open()
+    for name, error in session.errors.items():
+        print(f"Error: could not open {name}: {error}", file=sys.stderr)
+    if not names:
+        return False
+
+    settings = {name: device_settings(args, device_manager.driver(devices[name])) for name in names}
+    write_header(output, args, session.identifications, settings)
+    output.write("# tick\t" + "\t".join(f"{name}_timestamp_s\t{name}_value" for name in names) + "\n")
+    try:
+        for tick, readings in session.acquire(args.type, args.count, args.interval / 1000, args.policy,
+                                               args.speed, args.range, args.mode):
+            columns = []
+            for name in names:
+                timestamp, value = readings.get(name, (None, None))
+                columns.append("" if timestamp is None else f"{timestamp:.6f}")
+                columns.append("" if value is None else f"{value}")
+            output.write(f"{tick}\t" + "\t".join(columns) + "\n")
+    except KeyboardInterrupt:
+        session.cancel()
+        return False
+    for name, error in session.errors.items():
+        print(f"Error: {name}: {error}", file=sys.stderr)
+    return not session.errors
+
+
+def run_async(args, devices, device_manager, output):
+    """
+    Measure all devices from one asyncio event loop. LAN socket instruments use
+    native asyncio streams; other resources share a thread pool. Rows are written
+    as they arrive, one sample per line.
+    """
+    async def open_device(name):
+        measurement = await open_measurement(device_manager, devices[name])
+        identification = (await measurement.device.query(b"*IDN?\n")).strip()
+        return measurement, identification
+
+    async def acquire():
+        opened = dict(zip(args.device, await asyncio.gather(*(open_device(name) for name in args.device))))
+        settings = {name: device_settings(args, measurement.driver) for name, (measurement, _) in opened.items()}
+        runners = {name: AsyncAcquisitionRunner(measurement, args.type, args.count, args.interval / 1000,
+                                                mode=args.mode, overrun_policy=args.policy, settings=settings[name][0],
+                                                retry=retry_policy(device_manager, devices[name], attempts=args.retries)
+                                                if args.retries > 0 else None)
+                   for name, (measurement, _) in opened.items()}
+        write_header(output, args, {name: identification for name, (_, identification) in opened.items()}, settings)
+        output.write("# index\tdevice\ttimestamp_s\tvalue\n")
+        try:
+            return await acquire_all(runners, on_sample=lambda name, index, timestamp, value:
+                                     output.write(f"{index}\t{name}\t{timestamp:.6f}\t{value}\n"))
+        finally:
+            for measurement, _ in opened.values():
+                await measurement.device.close()
+
+    try:
+        results = asyncio.run(acquire())
+    except KeyboardInterrupt:
+        return False
+    for name, result in results.items():
+        if isinstance(result, BaseException):
+            print(f"Error: {name}: {result or type(result).__name__}", file=sys.stderr)
+    return all(result is True for result in results.values())
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    devices = load_devices(args.devices_file)
+
+    resume = None
+    if args.resume:
+        try:
+            resume = load_checkpoint(args.resume)
+        except (OSError, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return 2
+        args.device = [resume["device"]]
+        args.type = resume["measurement_type"]
+        args.count = resume["num_measurements"]
+        args.interval = resume["interval_seconds"] * 1000
+        args.mode = resume["mode"]
+        args.policy = resume["overrun_policy"]
+        args.use_async = False
+
+    registry = default_registry()
+    if args.list_devices:
+        for name, device_info in devices.items():
+            driver = registry.for_device(device_info)
+            print(f"{name}: {', '.join(driver.functions)}")
+            if driver.speeds:
+                print(f"    speeds: {', '.join(driver.speeds)} (default {driver.default_speed})")
+        return 0
+    if args.simulate:
+        devices.setdefault(SIMULATED_DEVICE_NAME, SIMULATED_DEVICE_INFO)
+        args.device = [SIMULATED_DEVICE_NAME]
+    elif args.all_devices and resume is None:
+        args.device = list(devices)
+    if not args.device:
+        print("Error: --device or --all-devices is required unless --simulate is given.", file=sys.stderr)
+        return 2
+    unknown = [name for name in args.device if name not in devices]
+    if unknown:
+        print(f"Error: unknown device(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    unsupported = [name for name in args.device if args.type not in registry.for_device(devices[name]).functions]
+    if unsupported:
+        print(f"Error: {', '.join(unsupported)} cannot measure {args.type}", file=sys.stderr)
+        return 2
+    if args.mode == BUFFERED:
+        unbuffered = [name for name in args.device if registry.for_device(devices[name]).buffer is None]
+        if unbuffered:
+            print(f"Error: {', '.join(unbuffered)} cannot take buffered readings", file=sys.stderr)
+            return 2
+    for name in args.device if resume is None else []:
+        try:
+            device_settings(args, registry.for_device(devices[name]))
+        except ValueError as e:
+            print(f"Error: {name}: {str(e)}", file=sys.stderr)
+            return 2
+    if args.count < 1:
+        print("Error: --count must be at least 1.", file=sys.stderr)
+        return 2
+
+    metrics_server = start_monitoring(args.metrics_port, args.log_json)
+    device_manager = DeviceManager()
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.use_async:
+            completed = run_async(args, devices, device_manager, output)
+        elif len(args.device) > 1:
+            completed = run_multi(args, devices, device_manager, output)
+        else:
+            completed = run_single(args, devices, device_manager, output, resume)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        completed = False
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        device_manager.close_all()
+        if metrics_server:
+            metrics_server.stop()
+    return 0 if completed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
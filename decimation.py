@@ -0,0 +1,98 @@
+# decimation.py
+from array import array
+
+
+class MinMaxDecimator:
+    """
+    MinMaxDecimator keeps a bounded min/max summary of a sample stream for plotting.
+
+    Samples are collected into at most `capacity` buckets, each holding the time of its
+    first sample and the minimum and maximum value. When the buckets are full, neighbouring
+    pairs are merged and every bucket from then on covers twice as many samples, so memory
+    is fixed by the capacity whether the run has 10 samples or 10 million, and spikes are
+    never averaged away. columns() reduces the buckets further to one per screen pixel.
+    """
+    def __init__(self, capacity=4096):
+        if capacity < 2 or capacity % 2:
+            raise ValueError("capacity must be an even number of at least 2")
+        self.capacity = capacity
+        self.times = array("d", bytes(8 * capacity))
+        self.minimums = array("d", bytes(8 * capacity))
+        self.maximums = array("d", bytes(8 * capacity))
+        self.reset()
+
+    def reset(self):
+        self.count = 0          # Buckets in use
+        self.samples = 0        # Samples added in total
+        self.bucket_size = 1    # Samples per bucket
+        self.minimum = None
+        self.maximum = None
+        self.last_time = None
+        self._fill = 0          # Samples in the last bucket
+
+    def add(self, timestamp, value):
+        if self._fill == 0:
+            if self.count == self.capacity:
+                self._merge_pairs()
+            i = self.count
+            self.times[i] = timestamp
+            self.minimums[i] = value
+            self.maximums[i] = value
+            self.count += 1
+        else:
+            i = self.count - 1
+            if value < self.minimums[i]:
+                self.minimums[i] = value
+            elif value > self.maximums[i]:
+                self.maximums[i] = value
+        self._fill += 1
+        if self._fill == self.bucket_size:
+            self._fill = 0
+
+        self.samples += 1
+        self.last_time = timestamp
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def extend(self, samples):
+        """
+        Add (timestamp, value) pairs.
+        """
+        for timestamp, value in samples:
+            self.add(timestamp, value)
+
+    def columns(self, width):
+        """
+        Reduce the buckets to at most `width` columns spread over the time span of the data.
+        Returns (xs, minimums, maximums) with xs as column numbers from 0 to width - 1.
+        """
+        xs, minimums, maximums = [], [], []
+        if not self.count or width < 1:
+            return xs, minimums, maximums
+        first_time = self.times[0]
+        span = self.last_time - first_time
+        scale = (width - 1) / span if span > 0 else 0.0
+        for i in range(self.count):
+            x = int((self.times[i] - first_time) * scale)
+            if xs and xs[-1] == x:
+                if self.minimums[i] < minimums[-1]:
+                    minimums[-1] = self.minimums[i]
+                if self.maximums[i] > maximums[-1]:
+                    maximums[-1] = self.maximums[i]
+            else:
+                xs.append(x)
+                minimums.append(self.minimums[i])
+                maximums.append(self.maximums[i])
+        return xs, minimums, maximums
+
+    def _merge_pairs(self):
+        half = self.capacity // 2
+        for i in range(half):
+            j = 2 * i
+            self.times[i] = self.times[j]
+            self.minimums[i] = min(self.minimums[j], self.minimums[j + 1])
+            self.maximums[i] = max(self.maximums[j], self.maximums[j + 1])
+        self.count = half
+        self.bucket_size *= 2
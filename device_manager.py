@@ -1,15 +1,268 @@
 # device_manager.py
-import pyvisa
+import logging
+import sys
+import threading
+import time
+from acquisition import RetryPolicy
+from drivers import default_registry
+from metrics import default_metrics, log_event
+from simulated_instrument import SimulatedInstrument, SIMULATED_PREFIX
+
+VI_ERROR_TMO = -1073807339  # VISA status code of a timeout
+
+log = logging.getLogger("dmm.device_manager")
+_connection_errors = None
+
+
+def connection_errors():
+    """
+    Return the errors after which a resource is considered broken and is reopened.
+    The pyvisa errors are only included once pyvisa has been loaded to open a real
+    resource; until then no pyvisa error can occur, and simulated devices work
+    without pyvisa installed.
+    """
+    global _connection_errors
+    if _connection_errors is None:
+        pyvisa = sys.modules.get("pyvisa")
+        if pyvisa is None:
+            return (OSError,)
+        _connection_errors = (pyvisa.errors.VisaIOError, pyvisa.errors.InvalidSession, OSError)
+    return _connection_errors
+
+
+def is_timeout(error):
+    """
+    Return True if an I/O error is a timeout rather than a broken connection.
+    """
+    return isinstance(error, TimeoutError) or getattr(error, "error_code", None) == VI_ERROR_TMO
+
+
+def resource_name(device_info):
+    """
+    Return the VISA resource string of a device entry from devices.json.
+    """
+    return device_info["resource_string"]
+
+
+class PooledConnection:
+    """
+    PooledConnection wraps a pooled pyvisa resource. Failed calls are not retried
+    here: a reopened session has no pending response, so only the whole reading
+    (trigger and fetch) can be repeated. The RetryPolicy of a run reopens the
+    resource and retries the reading; otherwise the health check in connect_device
+    reopens a stale resource before the next use.
+
+    Every call is timed into dmm_io_seconds, and failed calls are counted
+    in dmm_io_errors_total (see metrics.py).
+    """
+    def __init__(self, device_manager, device_info, resource):
+        self.device_manager = device_manager
+        self.device_info = device_info
+        self.resource = resource
+        self.instrument = resource_name(device_info)
+        self._io_seconds = {}
+
+    def write(self, command):
+        return self._call("write", command)
+
+    def write_raw(self, message):
+        return self._call("write_raw", message)
+
+    def query(self, command):
+        return self._call("query", command)
+
+    def read(self):
+        return self._call("read")
+
+    def close(self):
+        """
+        Connections are owned by the pool and closed by DeviceManager.close_all.
+        """
+        pass
+
+    def _call(self, method, *args):
+        histogram = self._io_seconds.get(method)
+        if histogram is None:
+            histogram = self._io_seconds[method] = self.device_manager.metrics.histogram(
+                "dmm_io_seconds", "Time per I/O call on a pooled connection",
+                instrument=self.instrument, operation=method)
+        start = time.perf_counter()
+        try:
+            result = getattr(self.resource, method)(*args)
+        except Exception as e:
+            kind = "timeout" if is_timeout(e) else "error"
+            self.device_manager.metrics.counter("dmm_io_errors_total", "Failed I/O calls",
+                                                instrument=self.instrument, kind=kind).inc()
+            log_event(log, logging.WARNING, "I/O error", instrument=self.instrument, operation=method,
+                      kind=kind, error=str(e), seconds=time.perf_counter() - start)
+            raise
+        histogram.observe(time.perf_counter() - start)
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.resource, name)
+
 
 class DeviceManager:
     """
     DeviceManager class handles the connection to the measurement devices.
+    Resources are opened once and kept in a pool, so back-to-back runs reuse
+    the same connection. Everything is closed by close_all on application exit.
+
+    The pyvisa ResourceManager is created on first use, since initialising the
+    backend takes a while; list_resources() can warm it up on a background thread.
     """
-    def __init__(self):
-        self.resource_manager = pyvisa.ResourceManager('@py')
+    def __init__(self, visa_backend='@py', metrics=None):
+        self.visa_backend = visa_backend
+        self.metrics = metrics or default_metrics()
+        self.driver_registry = default_registry()
+        self._resource_manager = None
+        self._resource_manager_lock = threading.Lock()
+        self._discovered = None
+        self._discovery_lock = threading.Lock()
+        self._connections = {}
+        self._resources = {}
+        self._simulated_instruments = {}
+        self._identifications = {}
+        self._locks = {}
+        self._pool_lock = threading.Lock()
+
+    @property
+    def resource_manager(self):
+        """
+        The pyvisa ResourceManager, created on first use. Safe to call from any thread.
+        """
+        with self._resource_manager_lock:
+            if self._resource_manager is None:
+                import pyvisa
+                self._resource_manager = pyvisa.ResourceManager(self.visa_backend)
+            return self._resource_manager
+
+    def list_resources(self, refresh=False):
+        """
+        Return the VISA resource strings of the instruments found on the system.
+        Scanning is slow (the backend probes every USB and serial port), so the
+        result is cached until refresh is set. Safe to call from any thread.
+        """
+        with self._discovery_lock:
+            if self._discovered is None or refresh:
+                self._discovered = tuple(self.resource_manager.list_resources())
+            return self._discovered
 
     def connect_device(self, device_info):
         """
         Connect to the device using the provided device information.
+        Returns the pooled connection, health-checked and reopened if it went stale.
+        """
+        key = resource_name(device_info)
+        with self._lock_for(key):
+            connection = self._connections.get(key)
+            if connection is None:
+                resource = self._open_resource(device_info)
+                connection = PooledConnection(self, device_info, resource)
+                self._connections[key] = connection
+            elif not self._is_healthy(connection.resource):
+                connection.resource = self._reopen(device_info)
+            return connection
+
+    def driver(self, device_info):
+        """
+        Return the InstrumentDriver for the device, as named by its "driver" entry.
+        """
+        return self.driver_registry.for_device(device_info)
+
+    def retry_policy(self, device_info, **options):
+        """
+        Return a RetryPolicy for runs on the device: connection errors are retried
+        after reopening the resource. options are passed on to RetryPolicy.
+        Call it after connect_device, so the pyvisa errors of a real resource are included.
+        """
+        return RetryPolicy(errors=connection_errors(), reconnect=lambda: self.reopen_resource(device_info), **options)
+
+    def identify(self, device_info):
+        """
+        Return the *IDN? string of the device. It is queried once per connection and cached.
         """
-        return self.resource_manager.open_resource(device_info["resource"], timeout=device_info["timeout"])
\ No newline at end of file
+        key = resource_name(device_info)
+        if key not in self._identifications:
+            connection = self.connect_device(device_info)
+            self._identifications[key] = connection.query("*IDN?").strip()
+        return self._identifications[key]
+
+    def reopen_resource(self, device_info):
+        """
+        Close and reopen the resource for the device, e.g. after a timeout.
+        """
+        with self._lock_for(resource_name(device_info)):
+            return self._reopen(device_info)
+
+    def close_device(self, device_info):
+        """
+        Close the device and remove it from the pool.
+        """
+        key = resource_name(device_info)
+        with self._lock_for(key):
+            self._connections.pop(key, None)
+            self._identifications.pop(key, None)
+            self._close_quietly(self._resources.pop(key, None))
+            self._update_open_connections()
+
+    def close_all(self):
+        """
+        Close every pooled device. Called on application exit.
+        """
+        for key in list(self._resources):
+            with self._lock_for(key):
+                self._connections.pop(key, None)
+                self._close_quietly(self._resources.pop(key, None))
+        self._identifications.clear()
+        self._update_open_connections()
+
+    def _lock_for(self, key):
+        with self._pool_lock:
+            return self._locks.setdefault(key, threading.RLock())
+
+    def _open_resource(self, device_info):
+        name = resource_name(device_info)
+        if name.startswith(SIMULATED_PREFIX):
+            # A reopened session talks to the same simulated meter, which keeps its settings and random state
+            resource = self._simulated_instruments.get(name)
+            if resource is None:
+                resource = SimulatedInstrument(name, timeout=device_info["timeout"], **device_info.get("simulation", {}))
+                self._simulated_instruments[name] = resource
+            resource.open()
+        else:
+            resource = self.resource_manager.open_resource(name, timeout=device_info["timeout"])
+        self._resources[name] = resource
+        self._update_open_connections()
+        log_event(log, logging.INFO, "Resource opened", instrument=name)
+        return resource
+
+    def _update_open_connections(self):
+        self.metrics.gauge("dmm_connections_open", "Resources in the DeviceManager pool").set(len(self._resources))
+
+    def _reopen(self, device_info):
+        key = resource_name(device_info)
+        self.metrics.counter("dmm_reconnects_total", "Resources reopened after an I/O error", instrument=key).inc()
+        log_event(log, logging.WARNING, "Reopening resource", instrument=key)
+        self._close_quietly(self._resources.pop(key, None))
+        self._identifications.pop(key, None)
+        resource = self._open_resource(device_info)
+        if key in self._connections:
+            self._connections[key].resource = resource
+        return resource
+
+    def _is_healthy(self, resource):
+        try:
+            resource.query("*STB?")
+            return True
+        except connection_errors():
+            return False
+
+    def _close_quietly(self, resource):
+        if resource is None:
+            return
+        try:
+            resource.close()
+        except connection_errors():
+            pass
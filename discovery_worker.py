@@ -0,0 +1,31 @@
+# discovery_worker.py
+from PyQt6 import QtCore
+
+
+class DiscoveryWorker(QtCore.QObject):
+    """
+    DiscoveryWorker creates the VISA resource manager and scans for instruments
+    on a QThread, so the window is shown without waiting for the backend.
+    The scan result is cached by the DeviceManager.
+    """
+    error = QtCore.pyqtSignal(str)
+    finished = QtCore.pyqtSignal(list)
+
+    def __init__(self, device_manager, refresh=False):
+        super().__init__()
+        self.device_manager = device_manager
+        self.refresh = refresh
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        """
+        Scan for instruments. Emits finished with the resource strings found,
+        an empty list if the scan failed.
+        """
+        resources = []
+        try:
+            resources = list(self.device_manager.list_resources(self.refresh))
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit(resources)
@@ -0,0 +1,274 @@
+# drivers.py
+"""
+Data-driven instrument drivers.
+
+A driver describes how to talk to one family of meters: the supported measurement
+functions with their SCPI command templates, units, ranges and integration times,
+plus the trigger/fetch commands, the buffered acquisition commands and named speed
+presets (integration time, autozero, display) for the configure-once path. Drivers are
+loaded from devices/drivers.json (or registered from Python with DriverRegistry.register),
+and each device in devices.json names its driver with a "driver" key or defines it inline.
+
+Static commands are encoded to bytes, including the write termination, once when the
+driver is loaded, so the acquisition loop only hands ready-made bytes to the instrument.
+"""
+import json
+import os
+
+DEFAULT_DRIVERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "devices", "drivers.json")
+DEFAULT_DEVICES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "devices", "devices.json")
+PER_SAMPLE = "per-sample"
+BUFFERED = "buffered"
+AUTO_RANGE = "auto"
+
+
+class Command:
+    """
+    A SCPI command with its pre-encoded bytes.
+    """
+    def __init__(self, text, termination="\n"):
+        self.text = text
+        self.raw = (text + termination).encode("ascii")
+
+    def __repr__(self):
+        return f"Command({self.text!r})"
+
+
+class CommandTemplate:
+    """
+    A SCPI command with arguments, e.g. ":SAMPle:COUNt {count}". Formatted and encoded on use.
+    """
+    def __init__(self, template, termination="\n"):
+        self.template = template
+        self.termination = termination
+
+    def format(self, **arguments):
+        return Command(self.template.format(**arguments), self.termination)
+
+
+class FunctionDriver:
+    """
+    Commands and settings for one measurement function, e.g. "DC Voltage".
+    """
+    def __init__(self, name, definition, termination):
+        self.name = name
+        self.unit = definition.get("unit", "")
+        self.measure = Command(definition["measure"], termination)
+        self.configure = Command(definition["configure"], termination) if "configure" in definition else None
+        self.range = _template(definition, "range", termination)
+        self.autorange = _template(definition, "autorange", termination)
+        self.ranges = definition.get("ranges", [])
+        self.nplc = _template(definition, "nplc", termination)
+        self.nplc_values = definition.get("nplc_values", [])
+
+
+class BufferDriver:
+    """
+    Commands for acquiring into the instrument's reading memory and fetching a block.
+    """
+    def __init__(self, definition, termination):
+        self.setup = [Command(command, termination) for command in definition.get("setup", [])]
+        self.sample_count = CommandTemplate(definition["sample_count"], termination)
+        self.sample_interval = _template(definition, "sample_interval", termination)
+        self.initiate = Command(definition["initiate"], termination)
+        self.fetch = Command(definition["fetch"], termination)
+        self.max_samples = definition.get("max_samples")
+        self.reading_seconds = definition.get("reading_seconds", 0)
+
+
+class InstrumentDriver:
+    """
+    Everything needed to drive one family of instruments.
+    """
+    def __init__(self, name, definition):
+        termination = definition.get("write_termination", "\n")
+        self.name = name
+        self.description = definition.get("description", name)
+        self.functions = {function: FunctionDriver(function, function_definition, termination)
+                          for function, function_definition in definition["functions"].items()}
+        self.autozero = _template(definition, "autozero", termination)
+        self.display = _template(definition, "display", termination)
+        self.speeds = definition.get("speeds", {})
+        self.default_speed = definition.get("default_speed", next(iter(self.speeds), None))
+        self.trigger = Command(definition["trigger"], termination) if "trigger" in definition else None
+        self.fetch = Command(definition["fetch"], termination)
+        self.buffer = BufferDriver(definition["buffer"], termination) if "buffer" in definition else None
+        self.fastest_mode = definition.get("fastest_mode", BUFFERED if self.buffer else PER_SAMPLE)
+        if self.fastest_mode == BUFFERED and self.buffer is None:
+            raise ValueError(f"Driver {name} declares buffered mode but has no buffer commands")
+        for speed, preset in self.speeds.items():
+            for function in self.functions.values():
+                if "nplc" in preset and function.nplc_values and preset["nplc"] not in function.nplc_values:
+                    raise ValueError(f"Driver {name}: speed {speed} sets NPLC {preset['nplc']}, "
+                                     f"which {function.name} does not support")
+
+    def function(self, measurement_type):
+        """
+        Return the FunctionDriver for a measurement type, or raise ValueError if it is not supported.
+        """
+        if measurement_type not in self.functions:
+            raise ValueError(f"{self.description} does not support measurement type: {measurement_type}")
+        return self.functions[measurement_type]
+
+    def unit(self, measurement_type):
+        return self.function(measurement_type).unit
+
+    def settings(self, measurement_type, speed=None, measurement_range=AUTO_RANGE):
+        """
+        Return the settings Measurement.configure applies for a run: the function, the range
+        (AUTO_RANGE or a fixed range) and the NPLC, autozero and display state of the speed preset.
+        Only settings the driver has commands for are included. Returns None if the function
+        has no configure command and can only be measured with its MEASure command.
+        """
+        function = self.function(measurement_type)
+        if speed is not None and speed not in self.speeds:
+            raise ValueError(f"{self.description} has no speed setting: {speed}")
+        if function.configure is None:
+            if speed is not None or measurement_range != AUTO_RANGE:
+                raise ValueError(f"{measurement_type} cannot be configured on {self.description}")
+            return None
+
+        settings = {"measurement_type": measurement_type}
+        if speed is not None:
+            settings["speed"] = speed
+        if measurement_range == AUTO_RANGE:
+            if function.autorange:
+                settings["range"] = AUTO_RANGE
+        elif function.range is None or (function.ranges and measurement_range not in function.ranges):
+            raise ValueError(f"{measurement_type} does not support the range {measurement_range}")
+        else:
+            settings["range"] = measurement_range
+        preset = self.speeds.get(speed, {})
+        if "nplc" in preset and function.nplc:
+            settings["nplc"] = preset["nplc"]
+        if "autozero" in preset and self.autozero:
+            settings["autozero"] = preset["autozero"]
+        if "display" in preset and self.display:
+            settings["display"] = preset["display"]
+        return settings
+
+    def configure_commands(self, settings):
+        """
+        Return the commands that apply the settings from settings().
+        """
+        function = self.function(settings["measurement_type"])
+        commands = [function.configure]
+        if settings.get("range") == AUTO_RANGE:
+            commands.append(function.autorange.format(state="ON"))
+        elif "range" in settings:
+            commands.append(function.range.format(range=settings["range"]))
+        if "nplc" in settings:
+            commands.append(function.nplc.format(nplc=settings["nplc"]))
+        if "autozero" in settings:
+            commands.append(self.autozero.format(state=_on_off(settings["autozero"])))
+        if "display" in settings:
+            commands.append(self.display.format(state=_on_off(settings["display"])))
+        return commands
+
+    def buffer_commands(self, measurement_type, count, interval_seconds, configured=False):
+        """
+        Return the commands that set up buffered acquisition of count readings. The function's
+        configure command is left out if the run was already configured, as it would undo the settings.
+        """
+        function = self.function(measurement_type)
+        if self.buffer is None or function.configure is None:
+            raise ValueError(f"Buffered mode does not support measurement type: {measurement_type}")
+        commands = [] if configured else [function.configure]
+        commands += self.buffer.setup
+        if self.buffer.sample_interval:
+            commands.append(self.buffer.sample_interval.format(interval=interval_seconds))
+        commands.append(self.buffer.sample_count.format(count=count))
+        return commands
+
+
+class DriverRegistry:
+    """
+    DriverRegistry maps driver names to InstrumentDrivers and devices to their driver.
+    """
+    def __init__(self):
+        self.drivers = {}
+
+    def register(self, name, definition):
+        """
+        Add a driver from a definition dictionary (the same format as drivers.json).
+        """
+        self.drivers[name] = InstrumentDriver(name, definition)
+        return self.drivers[name]
+
+    def load(self, path):
+        """
+        Load all drivers from a JSON file.
+        """
+        with open(path, 'r') as file:
+            for name, definition in json.load(file).items():
+                self.register(name, definition)
+        return self
+
+    def for_device(self, device_info):
+        """
+        Return the driver of a device entry from devices.json.
+        The "driver" key is either the name of a registered driver or an inline definition.
+        """
+        driver = device_info.get("driver")
+        if isinstance(driver, dict):
+            return InstrumentDriver(device_info.get("resource_string", "inline"), driver)
+        if driver not in self.drivers:
+            raise ValueError(f"Unknown driver: {driver}")
+        return self.drivers[driver]
+
+
+def load_devices(path=DEFAULT_DEVICES_FILE):
+    """
+    Load the device entries from a devices.json file, as {name: device_info}.
+    """
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def format_settings(settings, unit=""):
+    """
+    Format the settings returned by InstrumentDriver.settings as one line, e.g.
+    "Instrument settings: speed Fast, range 10 V, NPLC 0.02, autozero off, display off".
+    """
+    if not settings:
+        return "Instrument settings: MEASure per sample (instrument defaults)"
+    parts = []
+    if "speed" in settings:
+        parts.append(f"speed {settings['speed']}")
+    if "range" in settings:
+        parts.append("range auto" if settings["range"] == AUTO_RANGE else f"range {settings['range']:g} {unit}".rstrip())
+    if "nplc" in settings:
+        parts.append(f"NPLC {settings['nplc']:g}")
+    for key in ("autozero", "display"):
+        if key in settings:
+            parts.append(f"{key} {'on' if settings[key] else 'off'}")
+    return "Instrument settings: " + ", ".join(parts)
+
+
+def _on_off(state):
+    return "ON" if state else "OFF"
+
+
+def _template(definition, key, termination):
+    return CommandTemplate(definition[key], termination) if key in definition else None
+
+
+_default_registry = None
+
+
+def default_registry():
+    """
+    Return the registry loaded from devices/drivers.json. It is loaded once per process.
+    """
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = DriverRegistry().load(DEFAULT_DRIVERS_FILE)
+    return _default_registry
+
+
+def default_driver():
+    """
+    Return the driver used when none is given (the first one in drivers.json).
+    """
+    registry = default_registry()
+    return next(iter(registry.drivers.values()))
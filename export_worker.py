@@ -0,0 +1,40 @@
+# export_worker.py
+import threading
+from PyQt6 import QtCore
+
+
+class ExportWorker(QtCore.QObject):
+    """
+    ExportWorker runs one of the exporter functions on a QThread, so a large
+    recording can be exported while the GUI stays responsive, and reports
+    its progress back to the GUI thread through signals.
+    """
+    progress = QtCore.pyqtSignal(int, int)
+    error = QtCore.pyqtSignal(str)
+    finished = QtCore.pyqtSignal(bool)
+
+    def __init__(self, export, recording_path, path, **options):
+        super().__init__()
+        self.export = export
+        self.recording_path = recording_path
+        self.path = path
+        self.options = options
+        self._cancel_event = threading.Event()
+
+    @QtCore.pyqtSlot()
+    def run(self):
+        """
+        Run the export. Emits finished(True) on completion and
+        finished(False) if the export was cancelled or failed.
+        """
+        completed = False
+        try:
+            completed = self.export(self.recording_path, self.path, on_progress=self.progress.emit,
+                                    cancel_event=self._cancel_event, **self.options)
+        except Exception as e:
+            self.error.emit(str(e))
+        finally:
+            self.finished.emit(completed)
+
+    def cancel(self):
+        self._cancel_event.set()
@@ -0,0 +1,185 @@
+# exporter.py
+"""
+Export of recordings to files and to the clipboard.
+
+Samples are streamed from the recording's memory map in chunks, so exporting millions of
+samples needs no copy of the data in memory. Every export reports progress through
+on_progress(done, total), can be cancelled between chunks through a threading.Event, and
+writes to a temporary file that replaces the target only once it is complete.
+ExportWorker (export_worker.py) runs the exports on a QThread.
+
+Formats:
+    export_csv        comma-separated timestamp_s,value lines with the metadata as "#" comment lines
+    export_report     text report: header lines, tab-separated samples, footer lines (statistics)
+    export_columnar   columnar binary file (.dmmcol), see below
+
+Layout of a .dmmcol file:
+    8 bytes   magic b"DMMCOL1\\0"
+    4 bytes   little-endian uint32 length of the JSON header
+    N bytes   JSON header: the recording metadata plus "rows" and "columns", a list of
+              {"name", "dtype", "offset"} with the offset in bytes from the start of the file,
+              padded so the first column starts on a 16-byte boundary
+    columns   one contiguous little-endian float64 column per field: timestamp_s, then value
+
+A column can be read without this module, e.g. numpy.fromfile(path, "<f8", rows, offset=offset).
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+from recorder import Recording, header_bytes
+
+COLUMNAR_MAGIC = b"DMMCOL1\0"
+COLUMNS = ("timestamp_s", "value")
+CHUNK_SIZE = 65536
+CLIPBOARD_MAX_SAMPLES = 100000
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def export_csv(recording_path, path, metadata=None, delimiter=",", on_progress=None, cancel_event=None,
+               chunk_size=CHUNK_SIZE):
+    """
+    Write the samples as CSV. metadata is added to the recording's metadata in the comment lines.
+    Returns True if the export completed, False if it was cancelled.
+    """
+    with Recording(recording_path) as recording:
+        def write(file):
+            for key, value in dict(recording.metadata, **(metadata or {})).items():
+                file.write(f"# {key}: {value}\n")
+            file.write(f"timestamp_s{delimiter}value\n")
+            for timestamps, values in _chunks(recording, on_progress, cancel_event, chunk_size):
+                file.write("".join(f"{timestamp:.6f}{delimiter}{value}\n"
+                                   for timestamp, value in zip(timestamps, values)))
+
+        return _write_file(path, "w", write)
+
+
+def export_report(recording_path, path, header_lines=(), footer_lines=(), on_progress=None, cancel_event=None,
+                  chunk_size=CHUNK_SIZE):
+    """
+    Write a text report: the header lines, one tab-separated timestamp and value per line, and the footer lines.
+    Returns True if the export completed, False if it was cancelled.
+    """
+    with Recording(recording_path) as recording:
+        def write(file):
+            for line in header_lines:
+                file.write(f"{line}\n")
+            file.write("\n")
+            for timestamps, values in _chunks(recording, on_progress, cancel_event, chunk_size):
+                file.write("".join(f"{timestamp:.6f}\t{value}\n" for timestamp, value in zip(timestamps, values)))
+            file.write("\n")
+            for line in footer_lines:
+                file.write(f"{line}\n")
+
+        return _write_file(path, "w", write)
+
+
+def export_columnar(recording_path, path, metadata=None, on_progress=None, cancel_event=None,
+                    chunk_size=CHUNK_SIZE):
+    """
+    Write the samples as a .dmmcol columnar file. metadata is added to the recording's metadata.
+    Returns True if the export completed, False if it was cancelled.
+    """
+    with Recording(recording_path) as recording:
+        rows = len(recording)
+        header = dict(recording.metadata, **(metadata or {}))
+        header["rows"] = rows
+        header["columns"] = [{"name": name, "dtype": "<f8"} for name in COLUMNS]
+        # The column offsets depend on the header length and the other way round; repeat until they agree
+        data_offset = 0
+        while True:
+            for index, column in enumerate(header["columns"]):
+                column["offset"] = data_offset + index * rows * 8
+            header_size = len(header_bytes(header, COLUMNAR_MAGIC))
+            if header_size == data_offset:
+                break
+            data_offset = header_size
+
+        def write(file):
+            file.write(header_bytes(header, COLUMNAR_MAGIC))
+            for index in range(len(COLUMNS)):
+                for block in _chunks(recording, on_progress, cancel_event, chunk_size,
+                                     done=index * rows, total=len(COLUMNS) * rows):
+                    column = array("d", block[index])
+                    if sys.byteorder != "little":
+                        column.byteswap()
+                    file.write(column.tobytes())
+
+        return _write_file(path, "wb", write)
+
+
+def load_columnar(path):
+    """
+    Read a .dmmcol file. Returns (metadata, columns) with columns a dict of arrays by name.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a columnar DMM export")
+        (length,) = struct.unpack("<I", file.read(4))
+        metadata = json.loads(file.read(length).decode("utf-8"))
+        columns = {}
+        for column in metadata["columns"]:
+            file.seek(column["offset"])
+            values = array("d")
+            values.frombytes(file.read(metadata["rows"] * 8))
+            if sys.byteorder != "little":
+                values.byteswap()
+            columns[column["name"]] = values
+    return metadata, columns
+
+
+def clipboard_text(recording_path, header_lines=(), max_samples=CLIPBOARD_MAX_SAMPLES):
+    """
+    Format the header lines and up to max_samples samples as tab-separated text for pasting
+    into a spreadsheet. Returns (text, samples_copied, samples_total).
+    """
+    with Recording(recording_path) as recording:
+        total = len(recording)
+        lines = list(header_lines) + ["", "timestamp_s\tvalue"]
+        copied = 0
+        for timestamps, values in recording.iter_chunks(min(CHUNK_SIZE, max(1, max_samples))):
+            count = min(len(values), max_samples - copied)
+            lines.extend(f"{timestamp:.6f}\t{value}" for timestamp, value in zip(timestamps[:count], values[:count]))
+            copied += count
+            if copied >= max_samples:
+                break
+    return "\n".join(lines) + "\n", copied, total
+
+
+def _chunks(recording, on_progress, cancel_event, chunk_size, done=0, total=None):
+    """
+    Yield the (timestamps, values) chunks of a recording, reporting progress after each
+    chunk and stopping with _Cancelled once cancel_event is set.
+    """
+    total = total if total is not None else len(recording)
+    for chunk in recording.iter_chunks(chunk_size):
+        if cancel_event is not None and cancel_event.is_set():
+            raise _Cancelled()
+        yield chunk
+        done += len(chunk[1])
+        if on_progress:
+            on_progress(done, total)
+
+
+def _write_file(path, mode, write):
+    """
+    Call write(file) on a temporary file and move it to path once it is complete.
+    Returns False, and leaves path untouched, if the export was cancelled.
+    """
+    temporary_path = path + ".tmp"
+    try:
+        with open(temporary_path, mode) as file:
+            write(file)
+    except _Cancelled:
+        os.remove(temporary_path)
+        return False
+    except Exception:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    os.replace(temporary_path, path)
+    return True
@@ -1,14 +1,23 @@
 # main.py
+import argparse
 import sys
 from PyQt6 import QtWidgets
 from main_window import MainWindow
+from metrics import add_monitoring_arguments, start_monitoring
 
 def main():
     """
     Main function to run the application.
     """
-    app = QtWidgets.QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="DMM-Control")
+    add_monitoring_arguments(parser)
+    args, qt_args = parser.parse_known_args()  # The remaining arguments are for Qt
+    metrics_server = start_monitoring(args.metrics_port, args.log_json)
+    app = QtWidgets.QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
+    app.aboutToQuit.connect(window.device_manager.close_all)  # Close pooled connections on exit
+    if metrics_server:
+        app.aboutToQuit.connect(metrics_server.stop)
     window.show()
     sys.exit(app.exec())
 
@@ -1,13 +1,27 @@
-import json
-import random
+import os
+import time
 from datetime import datetime
-from PyQt6 import QtWidgets
-from PyQt6.QtWidgets import QFileDialog
+from PyQt6 import QtCore, QtWidgets
+from PyQt6.QtWidgets import QFileDialog, QMessageBox
 from main_window_ui import Ui_Widget
 from measurement import Measurement
-from device_manager import DeviceManager
+from device_manager import DeviceManager, resource_name
+from discovery_worker import DiscoveryWorker
+from drivers import AUTO_RANGE, BUFFERED, PER_SAMPLE, default_driver, format_settings, load_devices
+from acquisition import AcquisitionRunner
+from acquisition_worker import AcquisitionWorker, AsyncAcquisitionWorker
+from async_instrument import AsyncAcquisitionRunner, AsyncMeasurement, EventLoopThread, ExecutorInstrument
+from checkpoint import Checkpoint, find_checkpoints, load_checkpoint, resume_point
+from scheduler import OVERRUN_POLICIES, format_timing
+from exporter import CLIPBOARD_MAX_SAMPLES, clipboard_text, export_columnar, export_csv, export_report
+from export_worker import ExportWorker
+from recorder import Recorder, Recording
+from running_stats import RunningStatistics, format_statistics
+from simulated_instrument import SIMULATED_PREFIX
+from status_log import StatusLog
 
-DEBUG = True  # Set to True for debug mode
+RECORDINGS_DIR = "recordings"
+DISCOVERED_DEVICE_TIMEOUT = 10000  # ms, for instruments found by the scan that are not in devices.json
 
 class MainWindow(QtWidgets.QWidget, Ui_Widget):
     """
@@ -19,22 +33,46 @@ class MainWindow(QtWidgets.QWidget, Ui_Widget):
         self.setupUi(self)
         self.device_manager = DeviceManager()
         self.usb_device = None
+        self.device_info = None
+        self.driver = None
         self.measurement = None
+        self.acquisition_thread = None
+        self.acquisition_worker = None
+        self.event_loop_thread = None  # Started for the first asyncio run
+        self.discovery_thread = None
+        self.discovery_worker = None
+        self.export_thread = None
+        self.export_worker = None
+        self.export_path = None
+        self.unit = ""
+        self.settings = None
+        self.timing_stats = None
+        self.statistics = RunningStatistics()
+        self.status_log = StatusLog(self.statusView)
+        self.recorder = None
+        self.recording_path = None
+        self.checkpoint = None
+        self.run_failed = False
 
         # Load device configuration from devices.json
-        with open('devices/devices.json', 'r') as file:
-            self.devices = json.load(file)
+        self.devices = load_devices()
 
         # Populate device menu with available devices
         self.DeviceMenu.addItems(self.devices.keys())
 
-        # Populate measurement type menu with available measurement types
-        self.MeastypeMenu.addItems(["DC Voltage", "Resistance", "Diode"])
-        self.MeastypeMenu.setCurrentIndex(0)  # Set default selection to "Voltage"
+        # Populate measurement type menu with the functions supported by the selected device's driver
+        self.update_measurement_types()
+
+        # Populate overrun policy menu
+        self.PolicyMenu.addItems(OVERRUN_POLICIES.keys())
 
         # Connect signals to slots
+        self.DeviceMenu.currentIndexChanged.connect(self.update_measurement_types)
         self.DeviceMenu.currentIndexChanged.connect(self.connect_device)
+        self.MeastypeMenu.currentIndexChanged.connect(self.update_ranges)
+        self.ModeMenu.currentIndexChanged.connect(self.update_policy_state)
         self.StartButton.clicked.connect(self.perform_measurement)
+        self.PauseButton.clicked.connect(self.toggle_pause)
         self.CopyButton.clicked.connect(self.copy_measurement)
         self.SaveButton.clicked.connect(self.save_measurement)
 
@@ -42,6 +80,13 @@ class MainWindow(QtWidgets.QWidget, Ui_Widget):
         self.AvgBox.toggled.connect(self.update_avgbox_state)
         self.update_avgbox_state()
 
+        # Scan for instruments in the background once the window is shown; the configured
+        # devices can be used right away, the VISA backend is only needed to open real hardware
+        QtCore.QTimer.singleShot(0, self.discover_devices)
+
+        # Offer to resume a run that was interrupted by a crash, once the window is shown
+        QtCore.QTimer.singleShot(0, self.offer_resume)
+
     def update_avgbox_state(self):
         """
         Update the state of the average and interval input fields based on the AvgBox checkbox.
@@ -59,6 +104,71 @@ class MainWindow(QtWidgets.QWidget, Ui_Widget):
             self.AvgEdit.setText("1")
             self.IntervalEdit.clear()
 
+    def update_measurement_types(self):
+        """
+        Fill the measurement type menu from the driver of the selected device, keeping the
+        current selection if the new driver supports it.
+        """
+        device_name = self.DeviceMenu.currentText()
+        if not device_name:
+            return
+        try:
+            self.driver = self.device_manager.driver(self.devices[device_name])
+        except ValueError as e:
+            self.statusView.append(f"Error: {str(e)}")
+            self.driver = None
+            self.MeastypeMenu.clear()
+            return
+        selected = self.MeastypeMenu.currentText()
+        self.MeastypeMenu.clear()
+        self.MeastypeMenu.addItems(self.driver.functions.keys())
+        if selected in self.driver.functions:
+            self.MeastypeMenu.setCurrentText(selected)
+        else:
+            self.MeastypeMenu.setCurrentIndex(0)  # Default to the driver's first function
+
+        # Speed presets of the driver; without presets every sample is measured with MEASure
+        self.SpeedMenu.clear()
+        self.SpeedMenu.addItems(self.driver.speeds.keys())
+        if self.driver.default_speed:
+            self.SpeedMenu.setCurrentText(self.driver.default_speed)
+        self.SpeedMenu.setEnabled(bool(self.driver.speeds))
+
+        # Buffered runs need reading memory on the instrument; the driver's fastest mode is the default
+        self.ModeMenu.clear()
+        self.ModeMenu.addItem("Per sample", PER_SAMPLE)
+        if self.driver.buffer is not None:
+            self.ModeMenu.addItem("Buffered", BUFFERED)
+        self.ModeMenu.setCurrentIndex(max(0, self.ModeMenu.findData(self.driver.fastest_mode)))
+        self.ModeMenu.setEnabled(self.ModeMenu.count() > 1)
+        self.update_policy_state()
+        self.update_ranges()
+
+    def update_policy_state(self):
+        """
+        Enable the overrun policy menu for per-sample runs only. A buffered run is paced by
+        the instrument, so there is no schedule to overrun.
+        """
+        buffered = self.ModeMenu.currentData() == BUFFERED
+        self.PolicyMenu.setEnabled(not buffered)
+        self.PolicyMenu.setToolTip("Buffered runs are paced by the instrument; the overrun policy "
+                                   "applies to per-sample runs" if buffered else "")
+
+    def update_ranges(self):
+        """
+        Fill the range menu with the fixed ranges of the selected measurement type.
+        """
+        self.RangeMenu.clear()
+        measurement_type = self.MeastypeMenu.currentText()
+        if self.driver is None or measurement_type not in self.driver.functions:
+            return
+        function = self.driver.function(measurement_type)
+        self.RangeMenu.addItem("Auto", AUTO_RANGE)
+        if function.range is not None:
+            for measurement_range in function.ranges:
+                self.RangeMenu.addItem(f"{measurement_range:g} {function.unit}", measurement_range)
+        self.RangeMenu.setEnabled(self.RangeMenu.count() > 1)
+
     def connect_device(self):
         """
         Connect to the selected device from the device menu.
@@ -66,13 +176,69 @@ class MainWindow(QtWidgets.QWidget, Ui_Widget):
         device_name = self.DeviceMenu.currentText()
         if device_name:
             device_info = self.devices[device_name]
-            self.usb_device = self.device_manager.connect_device(device_info)
-            identification = self.usb_device.query("*IDN?")
+            try:
+                self.usb_device = self.device_manager.connect_device(device_info)
+                identification = self.device_manager.identify(device_info)
+            except Exception as e:
+                self.statusView.append(f"Error: Could not connect to {device_name}: {str(e)}")
+                self.usb_device = None
+                self.device_info = None
+                self.clear_device_info()
+                return
+            self.device_info = device_info
             self.fill_device_info(identification)
-            self.measurement = Measurement(self.usb_device)
+            self.measurement = Measurement(self.usb_device, driver=self.driver)
         else:
             self.clear_device_info()
 
+    def discover_devices(self, refresh=False):
+        """
+        Scan for connected instruments on a worker thread. The result fills the device menu.
+        """
+        if self.discovery_thread is not None:
+            return
+        self.discovery_thread = QtCore.QThread(self)
+        self.discovery_worker = DiscoveryWorker(self.device_manager, refresh)
+        self.discovery_worker.moveToThread(self.discovery_thread)
+        self.discovery_thread.started.connect(self.discovery_worker.run)
+        self.discovery_worker.error.connect(self.on_discovery_error)
+        self.discovery_worker.finished.connect(self.on_discovery_finished)
+        self.discovery_worker.finished.connect(self.discovery_thread.quit)
+        self.discovery_thread.finished.connect(self.discovery_worker.deleteLater)
+        self.discovery_thread.finished.connect(self.discovery_thread.deleteLater)
+        self.discovery_thread.start()
+
+    def on_discovery_error(self, message):
+        """
+        Report a failed instrument scan. The configured devices stay usable.
+        """
+        self.statusView.append(f"Error: Could not scan for instruments: {message}")
+
+    def on_discovery_finished(self, resources):
+        """
+        Add the instruments found by the scan that are not in devices.json to the device menu,
+        and mark configured devices that were not found.
+        """
+        self.discovery_thread = None
+        self.discovery_worker = None
+        found = set(resources)
+        for index in range(self.DeviceMenu.count()):
+            resource = resource_name(self.devices[self.DeviceMenu.itemText(index)])
+            if not resource.startswith(SIMULATED_PREFIX) and resource not in found:
+                self.DeviceMenu.setItemData(index, "Not found on the last scan",
+                                            QtCore.Qt.ItemDataRole.ToolTipRole)
+        configured = {resource_name(device_info) for device_info in self.devices.values()}
+        for resource in resources:
+            # Serial ports are listed whether or not an instrument is attached to them
+            if resource in configured or resource.upper().startswith("ASRL"):
+                continue
+            self.devices[resource] = {
+                "resource_string": resource,
+                "timeout": DISCOVERED_DEVICE_TIMEOUT,
+                "driver": default_driver().name,
+            }
+            self.DeviceMenu.addItem(resource)
+
     def fill_device_info(self, identification):
         """
         Fill the device information fields with the identification string.
@@ -99,33 +265,31 @@ class MainWindow(QtWidgets.QWidget, Ui_Widget):
 
     def perform_measurement(self):
         """
-        Perform the measurement based on the selected measurement type and settings.
+        Start the measurement based on the selected measurement type and settings.
+        If a measurement is already running, the button stops it instead.
         """
-        if not self.usb_device and not DEBUG:
+        if self.acquisition_worker is not None:
+            self.stop_measurement()
+            return
+
+        if not self.usb_device:
+            self.connect_device()  # The initially selected device is not connected until it is used
+        if not self.usb_device or self.driver is None:
             self.statusView.clear()
             self.statusView.append("Error: No device selected or connected.")
             self.clear_device_info()
             return
 
-        if not self.measurement:
-            self.measurement = Measurement(self.usb_device)
+        if self.device_info is not None:
+            # Reuse the pooled connection; it is health-checked and reopened if it went stale
+            try:
+                self.usb_device = self.device_manager.connect_device(self.device_info)
+            except Exception as e:
+                self.statusView.append(f"Error: {str(e)}")
+                self.clear_device_info()
+                return
 
-        # Clear the measured values list
-        self.measurement.measured_values.clear()
-
-        # Get device details
-        # Clear the status view
-        self.statusView.clear()
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.statusView.append(f"Date and Time: {current_time}\n")
-        device_details = (
-            f"Device ID: {self.DeviceIdText.text()}\n"
-            f"Device: {self.DeviceText.text()}\n"
-            f"Serial Number: {self.SNText.text()}\n"
-            f"Software Version: {self.SoftwareText.text()}\n"
-            f"Hardware Version: {self.HardwareText.text()}\n"
-        )
-        self.statusView.append(device_details)
+        self.prepare_run()
 
         # Determine the number of measurements and interval based on AvgBox state
         if self.AvgBox.isChecked():
@@ -146,67 +310,386 @@ class MainWindow(QtWidgets.QWidget, Ui_Widget):
         self.statusView.append(f"Selected measurement type: {measurement_type}")
         self.statusView.append(f"Number of measurements: {num_measurements}")
         self.statusView.append(f"Interval: {interval_seconds * 1000} ms\n")
+        mode = self.ModeMenu.currentData()
+        if mode == BUFFERED:
+            self.statusView.append("Buffered run: the instrument paces the samples, their timestamps are "
+                                   "spread over the time each block took and the overrun policy does not apply.\n")
+
+        # Determine the unit and the settings applied once at the start of the run from the device's driver
+        try:
+            unit = self.driver.unit(measurement_type)
+            self.settings = self.driver.settings(measurement_type, self.SpeedMenu.currentText() or None,
+                                                 self.RangeMenu.currentData() or AUTO_RANGE)
+        except ValueError as e:
+            self.statusView.append(f"Error: {str(e)}")
+            return
+        self.unit = unit
+        self.statusView.append(f"{format_settings(self.settings, unit)}\n")
+
+        # Record the samples to disk while the run is in progress
+        try:
+            self.recording_path = self.start_recording(measurement_type, unit, num_measurements, interval_seconds)
+        except OSError as e:
+            self.statusView.append(f"Error: Could not create recording: {str(e)}")
+            return
+
         self.statusView.append("####################################################")
         self.statusView.append("Starting measurement...\n")
+        self.status_log.begin_samples()
+        self.plotView.clear(unit)
+
+        overrun_policy = OVERRUN_POLICIES[self.PolicyMenu.currentText()]
+        self.start_acquisition({
+            "device": self.DeviceMenu.currentText(),
+            "measurement_type": measurement_type,
+            "unit": unit,
+            "num_measurements": num_measurements,
+            "interval_seconds": interval_seconds,
+            "overrun_policy": overrun_policy,
+            "mode": mode,
+            "settings": self.settings,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    def prepare_run(self):
+        """
+        Create a fresh Measurement, reset the statistics and show the device details.
+        """
+        # Samples go to the recording and the running statistics, not to an in-memory list
+        self.measurement = Measurement(self.usb_device, driver=self.driver, keep_values=False)
+        self.statistics.reset()
+        self.timing_stats = None
+        self.run_failed = False
 
-        progress_increment = 100 / num_measurements
+        # Get device details
+        # Clear the status view
+        self.statusView.clear()
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.statusView.append(f"Date and Time: {current_time}\n")
+        device_details = (
+            f"Device ID: {self.DeviceIdText.text()}\n"
+            f"Device: {self.DeviceText.text()}\n"
+            f"Serial Number: {self.SNText.text()}\n"
+            f"Software Version: {self.SoftwareText.text()}\n"
+            f"Hardware Version: {self.HardwareText.text()}\n"
+        )
+        self.statusView.append(device_details)
+
+    def start_acquisition(self, state, first_index=0, start_time=None):
+        """
+        Run the acquisition described by the checkpoint state on a worker thread, or on the
+        asyncio event loop if "asyncio I/O" is checked.
+        Transient I/O errors are retried with backoff after reconnecting the device,
+        and progress is checkpointed next to the recording so the run can be resumed.
+        """
+        self.checkpoint = Checkpoint(self.recorder, state)
+        options = dict(mode=state["mode"], overrun_policy=state["overrun_policy"], recorder=self.recorder,
+                       settings=state["settings"], retry=self.device_manager.retry_policy(self.device_info),
+                       checkpoint=self.checkpoint, first_index=first_index)
+        if self.AsyncCheck.isChecked():
+            self.start_async_acquisition(state, options)
+        else:
+            runner = AcquisitionRunner(self.measurement, state["measurement_type"], state["num_measurements"],
+                                       state["interval_seconds"], **options)
+            self.start_thread_acquisition(runner)
 
-        # Determine the unit based on the measurement type
-        if measurement_type == "DC Voltage":
-            unit = "V"
-        elif measurement_type == "Resistance":
-            unit = "Ohm"
-        elif measurement_type == "Diode":
-            unit = "V"
+        self.StartButton.setText("Stop")
+        self.PauseButton.setText("Pause")
+        self.PauseButton.setEnabled(True)
+        self.progressBar.setValue(int(first_index * 100 / state["num_measurements"]))
+        if self.acquisition_thread is not None:
+            self.acquisition_thread.start()
         else:
-            self.statusView.append("Error: Unknown measurement type.")
+            self.acquisition_worker.run()
+
+    def start_thread_acquisition(self, runner):
+        """
+        Prepare a worker thread for the runner; start_acquisition starts it.
+        """
+        # Run the acquisition loop on a worker thread so the GUI stays responsive
+        self.acquisition_thread = QtCore.QThread(self)
+        self.acquisition_worker = AcquisitionWorker(runner)
+        self.acquisition_worker.moveToThread(self.acquisition_thread)
+        self.acquisition_thread.started.connect(self.acquisition_worker.run)
+        self.acquisition_worker.samples_acquired.connect(self.on_samples_acquired)
+        self.acquisition_worker.progress.connect(self.on_measurement_progress)
+        self.acquisition_worker.retrying.connect(self.on_measurement_retrying)
+        self.acquisition_worker.error.connect(self.on_measurement_error)
+        self.acquisition_worker.finished.connect(self.on_measurement_finished)
+        self.acquisition_worker.finished.connect(self.acquisition_thread.quit)
+        self.acquisition_thread.finished.connect(self.acquisition_worker.deleteLater)
+        self.acquisition_thread.finished.connect(self.acquisition_thread.deleteLater)
+
+    def start_async_acquisition(self, state, options):
+        """
+        Prepare an AsyncAcquisitionWorker that drives the pooled connection from the asyncio
+        event loop next to the Qt event loop; start_acquisition starts it.
+        """
+        if self.event_loop_thread is None:
+            self.event_loop_thread = EventLoopThread().start()
+        device = ExecutorInstrument(self.usb_device, timeout=self.device_info["timeout"] / 1000)
+        measurement = AsyncMeasurement(device, self.driver, self.device_manager.metrics)
+        runner = AsyncAcquisitionRunner(measurement, state["measurement_type"], state["num_measurements"],
+                                        state["interval_seconds"], **options)
+        self.acquisition_worker = AsyncAcquisitionWorker(runner, self.event_loop_thread)
+        self.acquisition_worker.samples_acquired.connect(self.on_samples_acquired)
+        self.acquisition_worker.progress.connect(self.on_measurement_progress)
+        self.acquisition_worker.retrying.connect(self.on_measurement_retrying)
+        self.acquisition_worker.error.connect(self.on_measurement_error)
+        self.acquisition_worker.finished.connect(self.on_measurement_finished)
+        self.acquisition_worker.finished.connect(self.acquisition_worker.deleteLater)
+
+    def offer_resume(self, path=None):
+        """
+        Offer to resume an interrupted run: the given checkpoint, or the newest one in the recordings directory.
+        """
+        if path is None:
+            paths = find_checkpoints(RECORDINGS_DIR)
+            if not paths:
+                return
+            path = paths[0]
+        try:
+            state = load_checkpoint(path)
+        except (OSError, ValueError) as e:
+            self.statusView.append(f"Error: Could not read checkpoint {path}: {str(e)}")
             return
+        answer = QMessageBox.question(
+            self, "Resume measurement",
+            f"An interrupted {state['measurement_type']} run on {state['device']} was found "
+            f"({state.get('samples', 0)} of {state['num_measurements']} samples recorded).\nResume it?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No | QMessageBox.StandardButton.Discard)
+        if answer == QMessageBox.StandardButton.Yes:
+            self.resume_run(state)
+        elif answer == QMessageBox.StandardButton.Discard:
+            os.remove(path)
 
+    def resume_run(self, state):
+        """
+        Continue an interrupted run from its checkpoint, appending to the same recording.
+        """
+        if self.acquisition_worker is not None:
+            self.statusView.append("Error: Stop the running measurement before resuming another one.")
+            return
+        if state["device"] not in self.devices:
+            self.statusView.append(f"Error: Unknown device in checkpoint: {state['device']}")
+            return
+        if self.DeviceMenu.currentText() != state["device"]:
+            self.DeviceMenu.setCurrentText(state["device"])  # Connects the device
+        if not self.usb_device:
+            self.connect_device()
+        if not self.usb_device or self.driver is None:
+            self.statusView.append(f"Error: Could not connect to {state['device']} to resume the run.")
+            return
+
+        self.MeastypeMenu.setCurrentText(state["measurement_type"])
+        self.prepare_run()
         try:
-            # Perform the measurements and update the progress bar
-            for i in range(num_measurements):
-                if DEBUG:
-                    measured_value = random.uniform(0, 10)  # Generate random voltage for debug
-                    self.measurement.measured_values.append(measured_value)
-                    self.statusView.append(f"Measurement {i + 1}: {measured_value:.5f} {unit}")
-                else:
-                    if measurement_type == "DC Voltage":
-                        self.measurement.measure_voltage(1, interval_seconds)
-                    elif measurement_type == "Resistance":
-                        self.measurement.measure_resistance(1, interval_seconds)
-                    elif measurement_type == "Diode":
-                        self.measurement.measure_diode(1, interval_seconds)
-                    else:
-                        self.statusView.append("Error: Unknown measurement type.")
-                        return
-
-                self.progressBar.setValue(int((i + 1) * progress_increment))
-
-            # Print the average of the measurements and close the device connection
-            average_value = round(sum(self.measurement.measured_values) / len(self.measurement.measured_values), 5)
-            self.statusView.append(f"\nAverage Value: {average_value} {unit}\n")
-            self.lcdNumber.display(average_value)  # Display the average value on the LCD number
-            if not DEBUG:
-                self.usb_device.close()
+            first_index, time_offset = resume_point(state)
+            self.recorder = Recorder.reopen(state["recording"])
+        except (OSError, ValueError) as e:
+            self.statusView.append(f"Error: Could not reopen recording: {str(e)}")
+            return
+        self.recording_path = state["recording"]
+        self.settings = state["settings"]
+        self.unit = state["unit"]
+        self.statusView.append(f"Resuming {state['measurement_type']} run started at {state['started_at']}")
+        self.statusView.append(f"{format_settings(self.settings, self.unit)}\n")
+        self.statusView.append("####################################################")
+        self.statusView.append(f"Continuing from sample {first_index + 1} of {state['num_measurements']}...\n")
+
+        # Rebuild the statistics and the plot from the samples already recorded
+        self.plotView.clear(self.unit)
+        with Recording(self.recording_path) as recording:
+            for timestamps, values in recording.iter_chunks():
+                for timestamp, value in zip(timestamps, values):
+                    self.statistics.add(value, timestamp)
+                    self.plotView.decimator.add(timestamp, value)
+        self.plotView.update()
+        self.status_log.begin_samples()
+
+        # Shift the start of the run into the past so timestamps continue where the recording ends
+        self.start_acquisition(state, first_index, time.monotonic() - time_offset)
+
+    def stop_measurement(self):
+        """
+        Cancel the running measurement.
+        """
+        if self.acquisition_worker is not None:
+            self.acquisition_worker.cancel()
+            self.StartButton.setEnabled(False)  # Re-enabled once the worker has finished
+
+    def toggle_pause(self):
+        """
+        Pause or resume the running measurement.
+        """
+        if self.acquisition_worker is None:
+            return
+        if self.acquisition_worker.runner.paused:
+            self.acquisition_worker.resume()
+            self.PauseButton.setText("Pause")
+            self.statusView.append("Measurement resumed.")
+        else:
+            self.acquisition_worker.pause()
+            self.PauseButton.setText("Resume")
+            self.statusView.append("Measurement paused.")
+
+    def on_samples_acquired(self, samples):
+        """
+        Show a batch of measured values from the worker. Every sample feeds the
+        statistics, but only the lines that fit in the status log are formatted.
+        """
+        for index, timestamp, measured_value in samples:
+            self.statistics.add(measured_value, timestamp)
+        self.lcdNumber.display(round(self.statistics.mean, 5))  # Live running average
+        self.plotView.add_samples(samples)
+        visible = samples[-self.status_log.max_lines:]
+        self.status_log.dropped += len(samples) - len(visible)
+        self.status_log.append_lines([f"Measurement {index + 1}: {measured_value:.5f} {self.unit}"
+                                      for index, timestamp, measured_value in visible])
+        if self.acquisition_worker is not None:
+            self.acquisition_worker.samples_shown(len(samples))
+
+    def on_measurement_progress(self, done, total):
+        """
+        Update the progress bar from the worker.
+        """
+        self.progressBar.setValue(int(done * 100 / total))
+
+    def on_measurement_retrying(self, attempt, message, delay):
+        """
+        Report a transient I/O error that is about to be retried.
+        """
+        self.statusView.append(f"<span style='color: orange;'>I/O error: {message}. "
+                               f"Reconnecting in {delay:.1f} s (attempt {attempt})...</span>")
+
+    def on_measurement_error(self, message):
+        """
+        Report an error raised by the worker.
+        """
+        self.run_failed = True
+        self.statusView.append(f"Error: {message}")
+        self.clear_device_info()
+
+    def on_measurement_finished(self, completed):
+        """
+        Print the average of the measurements. The device connection stays
+        open in the DeviceManager pool for the next run.
+        """
+        self.timing_stats = self.acquisition_worker.runner.timing_statistics()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        # Keep the checkpoint of a failed run so it can be resumed; a completed or stopped run no longer needs it
+        interrupted_checkpoint = None
+        if self.checkpoint is not None:
+            if self.run_failed and not completed:
+                interrupted_checkpoint = self.checkpoint.path
+            else:
+                self.checkpoint.remove()
+            self.checkpoint = None
+        self.acquisition_thread = None
+        self.acquisition_worker = None
+        self.StartButton.setText("Start")
+        self.StartButton.setEnabled(True)
+        self.PauseButton.setText("Pause")
+        self.PauseButton.setEnabled(False)
+
+        self.status_log.end_samples()
+        if self.status_log.dropped:
+            self.statusView.append(f"({self.status_log.dropped} earlier sample lines not shown; all samples are in the recording)")
+        if self.statistics.count:
+            self.statusView.append("")
+            for line in format_statistics(self.statistics.snapshot(), self.unit):
+                self.statusView.append(line)
+            self.statusView.append("")
+            self.lcdNumber.display(round(self.statistics.mean, 5))  # Display the average value on the LCD number
+            for line in format_timing(self.timing_stats):
+                self.statusView.append(line)
+        if completed:
             self.statusView.append("<span style='color: green;'>Measurement completed.</span>")
-            self.progressBar.setValue(0)
-        except Exception as e:
-            self.statusView.append(f"Error: {str(e)}")
-            self.clear_device_info()
+        else:
+            self.statusView.append("<span style='color: orange;'>Measurement stopped.</span>")
+        if self.recording_path:
+            self.statusView.append(f"Recording saved to {self.recording_path}")
+        self.progressBar.setValue(0)
+        if interrupted_checkpoint:
+            self.statusView.append("The run was interrupted; the samples so far are kept and it can be resumed.")
+            self.offer_resume(interrupted_checkpoint)
+
+    def start_recording(self, measurement_type, unit, num_measurements, interval_seconds):
+        """
+        Open a new recording file for the run and return its path.
+        """
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+        start_time = datetime.now()
+        file_name = f"{measurement_type.replace(' ', '_')}_measurement_{start_time.strftime('%Y-%m-%d_%H-%M-%S')}.dmmrec"
+        path = os.path.join(RECORDINGS_DIR, file_name)
+        metadata = {
+            "started_at": start_time.isoformat(timespec="seconds"),
+            "device_id": self.DeviceIdText.text(),
+            "device": self.DeviceText.text(),
+            "serial_number": self.SNText.text(),
+            "software_version": self.SoftwareText.text(),
+            "hardware_version": self.HardwareText.text(),
+            "measurement_type": measurement_type,
+            "unit": unit,
+            "num_measurements": num_measurements,
+            "interval_seconds": interval_seconds,
+            "settings": self.settings,
+        }
+        self.recorder = Recorder(path, metadata)
+        return path
+
+    def closeEvent(self, event):
+        """
+        Stop a running measurement or export and wait for a running instrument scan before the window closes.
+        """
+        if self.acquisition_thread is not None:
+            self.acquisition_worker.cancel()
+            self.acquisition_thread.quit()
+            self.acquisition_thread.wait()
+        elif self.acquisition_worker is not None:
+            self.acquisition_worker.cancel()
+            self.acquisition_worker.future.result()  # Returns once the display is restored
+        if self.event_loop_thread is not None:
+            self.event_loop_thread.stop()
+        if self.discovery_thread is not None:
+            self.discovery_thread.quit()
+            self.discovery_thread.wait()
+        if self.export_thread is not None:
+            self.export_worker.cancel()  # The partial file is removed, the target is left untouched
+            self.export_thread.quit()
+            self.export_thread.wait()
+        super().closeEvent(event)
 
     def copy_measurement(self):
         """
-        Copy the measurement results to the clipboard.
+        Copy the measurement results to the clipboard. Long runs are cut off after
+        CLIPBOARD_MAX_SAMPLES samples; Save writes all of them.
         """
-        # Implement copy functionality
-        pass
+        if not self.check_results_available():
+            return
+        try:
+            text, copied, total = clipboard_text(self.recording_path, self.report_header_lines(), CLIPBOARD_MAX_SAMPLES)
+        except (OSError, ValueError) as e:
+            self.statusView.append(f"Error copying measurement data: {str(e)}")
+            return
+        QtWidgets.QApplication.clipboard().setText(text)
+        if copied < total:
+            self.statusView.append(f"\nCopied the first {copied} of {total} samples to the clipboard; "
+                                   f"use Save to export all of them.")
+        else:
+            self.statusView.append(f"\nCopied {copied} samples to the clipboard.")
 
     def save_measurement(self):
         """
-        Save the measurement results to a file.
+        Save the measurement results to a file. The samples are streamed from the
+        recording on a worker thread; the format follows the file extension.
         """
-        if not self.measurement or not self.measurement.measured_values:
-            self.statusView.append("Error: No measurement data to save.")
+        if not self.check_results_available():
+            return
+        if self.export_thread is not None:
+            self.statusView.append("Error: Wait for the running export to finish.")
             return
 
         # Get the current date and time
@@ -217,31 +700,93 @@ class MainWindow(QtWidgets.QWidget, Ui_Widget):
         default_file_name = f"{measurement_type}_measurement_{current_time}.txt"
 
         # Open the file dialog with the default file name
-        file_path, _ = QFileDialog.getSaveFileName(self, "Save Measurement Data", default_file_name, "Text Files (*.txt);;All Files (*)")
-        if file_path:
-            try:
-                with open(file_path, 'w') as file:  # Open the file in write mode
-                    # Write date and time
-                    file.write(f"Measurement done at: {current_time}\n")
-                    # Write device details
-                    device_details = (
-                        f"Device ID: {self.DeviceIdText.text()}\n"
-                        f"Device: {self.DeviceText.text()}\n"
-                        f"Serial Number: {self.SNText.text()}\n"
-                        f"Software Version: {self.SoftwareText.text()}\n"
-                        f"Hardware Version: {self.HardwareText.text()}\n\n"
-                    )
-                    file.write(device_details)
-                    file.write(f"Measurement Type: {measurement_type.replace('_', ' ')}\n")
-                    file.write(f"Number of measurements: {len(self.measurement.measured_values)}\n")
-                    file.write(f"Interval: {float(self.IntervalEdit.text()) if self.IntervalEdit.text() else 500} ms\n\n")
-
-                    # Write measurement values
-                    for value in self.measurement.measured_values:
-                        file.write(f"{value}\n")
-                    # Calculate and write the average value
-                    average_value = round(sum(self.measurement.measured_values) / len(self.measurement.measured_values), 5)
-                    file.write(f"\nAverage Value: {average_value}\n")
-                self.statusView.append(f"\nMeasurement data saved to {file_path}")
-            except Exception as e:
-                self.statusView.append(f"Error saving measurement data: {str(e)}")
\ No newline at end of file
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Measurement Data", default_file_name,
+                                                   "Text Files (*.txt);;CSV Files (*.csv);;"
+                                                   "Columnar Binary Files (*.dmmcol);;All Files (*)")
+        if not file_path:
+            return
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".csv":
+            self.start_export(export_csv, file_path, metadata=self.export_metadata())
+        elif extension == ".dmmcol":
+            self.start_export(export_columnar, file_path, metadata=self.export_metadata())
+        else:
+            self.start_export(export_report, file_path, header_lines=self.report_header_lines(),
+                              footer_lines=format_statistics(self.statistics.snapshot(), self.unit))
+
+    def check_results_available(self):
+        """
+        Check that there is a finished run to copy or save, and report it if not.
+        """
+        if not self.statistics.count or not self.recording_path:
+            self.statusView.append("Error: No measurement data to save.")
+            return False
+        if self.acquisition_worker is not None:
+            self.statusView.append("Error: Wait for the measurement to finish before saving.")
+            return False
+        return True
+
+    def report_header_lines(self):
+        """
+        Return the lines describing the run at the top of a saved or copied report.
+        """
+        lines = [
+            f"Measurement done at: {datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}",
+            f"Device ID: {self.DeviceIdText.text()}",
+            f"Device: {self.DeviceText.text()}",
+            f"Serial Number: {self.SNText.text()}",
+            f"Software Version: {self.SoftwareText.text()}",
+            f"Hardware Version: {self.HardwareText.text()}",
+            "",
+            f"Measurement Type: {self.MeastypeMenu.currentText()}",
+            format_settings(self.settings, self.unit),
+            f"Number of measurements: {self.statistics.count}",
+        ]
+        if self.timing_stats:
+            lines.extend(format_timing(self.timing_stats))
+        else:
+            lines.append(f"Interval: {float(self.IntervalEdit.text()) if self.IntervalEdit.text() else 500} ms")
+        return lines
+
+    def export_metadata(self):
+        """
+        Return the results of the run that are stored with the samples in CSV and columnar exports.
+        """
+        return {"statistics": self.statistics.snapshot(), "timing": self.timing_stats}
+
+    def start_export(self, export, file_path, **options):
+        """
+        Run an exporter function on a worker thread, showing its progress in the progress bar.
+        """
+        self.statusView.append(f"\nSaving measurement data to {file_path}...")
+        self.export_path = file_path
+        self.export_thread = QtCore.QThread(self)
+        self.export_worker = ExportWorker(export, self.recording_path, file_path, **options)
+        self.export_worker.moveToThread(self.export_thread)
+        self.export_thread.started.connect(self.export_worker.run)
+        self.export_worker.progress.connect(self.on_measurement_progress)
+        self.export_worker.error.connect(self.on_export_error)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_worker.finished.connect(self.export_thread.quit)
+        self.export_thread.finished.connect(self.export_worker.deleteLater)
+        self.export_thread.finished.connect(self.export_thread.deleteLater)
+        self.SaveButton.setEnabled(False)
+        self.export_thread.start()
+
+    def on_export_error(self, message):
+        """
+        Report an error raised by the export worker.
+        """
+        self.statusView.append(f"Error saving measurement data: {message}")
+
+    def on_export_finished(self, completed):
+        """
+        Report the end of an export.
+        """
+        if completed:
+            self.statusView.append(f"Measurement data saved to {self.export_path}")
+        self.export_thread = None
+        self.export_worker = None
+        self.SaveButton.setEnabled(True)
+        if self.acquisition_worker is None:
+            self.progressBar.setValue(0)
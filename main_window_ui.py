@@ -12,7 +12,7 @@ from PyQt6 import QtCore, QtGui, QtWidgets
 class Ui_Widget(object):
     def setupUi(self, Widget):
         Widget.setObjectName("Widget")
-        Widget.resize(800, 600)
+        Widget.resize(800, 830)
         self.progressBar = QtWidgets.QProgressBar(parent=Widget)
         self.progressBar.setEnabled(True)
         self.progressBar.setGeometry(QtCore.QRect(80, 560, 191, 21))
@@ -93,6 +93,18 @@ class Ui_Widget(object):
         self.IntervalLabel = QtWidgets.QLabel(parent=self.AvgBox)
         self.IntervalLabel.setGeometry(QtCore.QRect(10, 60, 91, 21))
         self.IntervalLabel.setObjectName("IntervalLabel")
+        self.PolicyLabel = QtWidgets.QLabel(parent=self.AvgBox)
+        self.PolicyLabel.setGeometry(QtCore.QRect(10, 85, 91, 21))
+        self.PolicyLabel.setObjectName("PolicyLabel")
+        self.PolicyMenu = QtWidgets.QComboBox(parent=self.AvgBox)
+        self.PolicyMenu.setGeometry(QtCore.QRect(100, 85, 201, 21))
+        self.PolicyMenu.setObjectName("PolicyMenu")
+        self.ModeLabel = QtWidgets.QLabel(parent=self.AvgBox)
+        self.ModeLabel.setGeometry(QtCore.QRect(190, 30, 41, 21))
+        self.ModeLabel.setObjectName("ModeLabel")
+        self.ModeMenu = QtWidgets.QComboBox(parent=self.AvgBox)
+        self.ModeMenu.setGeometry(QtCore.QRect(230, 30, 71, 21))
+        self.ModeMenu.setObjectName("ModeMenu")
         self.ResultBox = QtWidgets.QGroupBox(parent=Widget)
         self.ResultBox.setGeometry(QtCore.QRect(370, 10, 411, 131))
         self.ResultBox.setAutoFillBackground(False)
@@ -144,11 +156,36 @@ class Ui_Widget(object):
         self.StartButton = QtWidgets.QPushButton(parent=Widget)
         self.StartButton.setGeometry(QtCore.QRect(20, 500, 83, 29))
         self.StartButton.setObjectName("StartButton")
+        self.PauseButton = QtWidgets.QPushButton(parent=Widget)
+        self.PauseButton.setEnabled(False)
+        self.PauseButton.setGeometry(QtCore.QRect(20, 530, 83, 25))
+        self.PauseButton.setObjectName("PauseButton")
+        self.AsyncCheck = QtWidgets.QCheckBox(parent=Widget)
+        self.AsyncCheck.setGeometry(QtCore.QRect(150, 530, 181, 25))
+        self.AsyncCheck.setObjectName("AsyncCheck")
+        self.SpeedLabel = QtWidgets.QLabel(parent=Widget)
+        self.SpeedLabel.setGeometry(QtCore.QRect(370, 145, 51, 21))
+        self.SpeedLabel.setObjectName("SpeedLabel")
+        self.SpeedMenu = QtWidgets.QComboBox(parent=Widget)
+        self.SpeedMenu.setGeometry(QtCore.QRect(420, 145, 151, 22))
+        self.SpeedMenu.setObjectName("SpeedMenu")
+        self.RangeLabel = QtWidgets.QLabel(parent=Widget)
+        self.RangeLabel.setGeometry(QtCore.QRect(590, 145, 51, 21))
+        self.RangeLabel.setObjectName("RangeLabel")
+        self.RangeMenu = QtWidgets.QComboBox(parent=Widget)
+        self.RangeMenu.setGeometry(QtCore.QRect(640, 145, 141, 22))
+        self.RangeMenu.setObjectName("RangeMenu")
         self.statusView = QtWidgets.QTextEdit(parent=Widget)
         self.statusView.setEnabled(True)
-        self.statusView.setGeometry(QtCore.QRect(370, 170, 411, 411))
+        self.statusView.setGeometry(QtCore.QRect(370, 175, 411, 406))
         self.statusView.setReadOnly(True)  # Make the statusView read-only
         self.statusView.setObjectName("statusView")
+        self.PlotBox = QtWidgets.QGroupBox(parent=Widget)
+        self.PlotBox.setGeometry(QtCore.QRect(20, 595, 761, 221))
+        self.PlotBox.setObjectName("PlotBox")
+        self.plotView = PlotWidget(parent=self.PlotBox)
+        self.plotView.setGeometry(QtCore.QRect(10, 25, 741, 186))
+        self.plotView.setObjectName("plotView")
 
         self.retranslateUi(Widget)
         QtCore.QMetaObject.connectSlotsByName(Widget)
@@ -167,6 +204,8 @@ class Ui_Widget(object):
         self.AvgBox.setTitle(_translate("Widget", "Avg measurement"))
         self.AvgLabel.setText(_translate("Widget", "Count"))
         self.IntervalLabel.setText(_translate("Widget", "Interval (ms)"))
+        self.PolicyLabel.setText(_translate("Widget", "On overrun"))
+        self.ModeLabel.setText(_translate("Widget", "Mode"))
         self.ResultBox.setTitle(_translate("Widget", "Result"))
         self.CopyButton.setText(_translate("Widget", "Copy"))
         self.SaveButton.setText(_translate("Widget", "Save As ..."))
@@ -175,3 +214,9 @@ class Ui_Widget(object):
         self.StartsFromLabel.setText(_translate("Widget", "Numbering from"))
         self.StartsFromEdit.setText(_translate("Widget", "1"))
         self.StartButton.setText(_translate("Widget", "Start"))
+        self.PauseButton.setText(_translate("Widget", "Pause"))
+        self.AsyncCheck.setText(_translate("Widget", "asyncio I/O"))
+        self.SpeedLabel.setText(_translate("Widget", "Speed"))
+        self.RangeLabel.setText(_translate("Widget", "Range"))
+        self.PlotBox.setTitle(_translate("Widget", "Live plot"))
+from plot_widget import PlotWidget
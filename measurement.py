@@ -1,40 +1,156 @@
 # measurement.py
+import logging
 import time
+from drivers import default_driver
+from metrics import default_metrics, log_event
+
+log = logging.getLogger("dmm.measurement")
 
 
 class Measurement:
-    def __init__(self, usb_device):
+    def __init__(self, usb_device, driver=None, verbose=True, keep_values=True, metrics=None):
         self.usb_device = usb_device
+        self.driver = driver or default_driver()
+        self.verbose = verbose  # Log every reading at DEBUG level
+        self.keep_values = keep_values  # Long runs turn this off and use a recorder and RunningStatistics instead
         self.measured_values = []
+        self.configured_type = None  # Set by configure(); read() then only triggers and fetches
+        self._display_off = False
+        self._buffer_type = None
+        self.metrics = metrics or default_metrics()
+        self.instrument = getattr(usb_device, "instrument", None) or getattr(usb_device, "resource_name", "unknown")
+        self._samples = {}
+        self._reading_seconds = self.metrics.histogram("dmm_reading_seconds", "Time per reading or buffer block",
+                                                       instrument=self.instrument, mode="per-sample")
+        self._block_seconds = self.metrics.histogram("dmm_reading_seconds", "Time per reading or buffer block",
+                                                     instrument=self.instrument, mode="buffered")
 
     def measure_voltage(self, num_measurements, interval_seconds):
-        for measurement_number in range(1, num_measurements + 1):
-            self.usb_device.write(":MEASure:VOLTage:DC?")
-            self._trigger_measurement(interval_seconds)
-            measured_voltage = float(self.usb_device.query(":FETCh?"))
-            self._process_measurement(measured_voltage, measurement_number, "V")
+        self._measure_repeated("DC Voltage", num_measurements, interval_seconds)
 
     def measure_resistance(self, num_measurements, interval_seconds):
-        for measurement_number in range(1, num_measurements + 1):
-            self.usb_device.write(":MEASure:RESistance? AUTO")
-            self._trigger_measurement(interval_seconds)
-            measured_resistance = float(self.usb_device.query(":FETCh?"))
-            self._process_measurement(measured_resistance, measurement_number, "Ohms")
+        self._measure_repeated("Resistance", num_measurements, interval_seconds)
 
     def measure_diode(self, num_measurements, interval_seconds):
+        self._measure_repeated("Diode", num_measurements, interval_seconds)
+
+    def _measure_repeated(self, measurement_type, num_measurements, interval_seconds):
+        function = self.driver.function(measurement_type)
         for measurement_number in range(1, num_measurements + 1):
-            self.usb_device.write(":MEASure:DIODe?")
+            self._write(function.measure)
             self._trigger_measurement(interval_seconds)
-            measured_diode_voltage = float(self.usb_device.query(":FETCh?"))
-            self._process_measurement(measured_diode_voltage, measurement_number, "V (Diode)")
+            measured_value = self._parse(self._query(self.driver.fetch))
+            self._count_samples(measurement_type, 1)
+            self._process_measurement(measured_value, measurement_number, function.unit)
+
+    def configure(self, settings):
+        """
+        Configure the instrument once for a run with the settings from InstrumentDriver.settings:
+        function, range, integration time, autozero and display. Afterwards read() no longer sends
+        MEASure, which would make the instrument reconfigure itself before every reading.
+        """
+        for command in self.driver.configure_commands(settings):
+            self._write(command)
+        self._display_off = settings.get("display") is False
+        self.configured_type = settings["measurement_type"]
+
+    def restore_display(self):
+        """
+        Turn the display back on if configure() turned it off.
+        """
+        if self._display_off:
+            self._write(self.driver.display.format(state="ON"))
+            self._display_off = False
+
+    def read(self, measurement_type, measurement_number):
+        """
+        Take a single reading of the given measurement type without any pacing delay.
+        The caller is responsible for the interval between readings.
+        """
+        start = time.perf_counter()
+        function = self.driver.function(measurement_type)
+        if measurement_type != self.configured_type:
+            self._write(function.measure)
+        if self.driver.trigger:
+            self._write(self.driver.trigger)
+        measured_value = self._parse(self._query(self.driver.fetch))
+        self._reading_seconds.observe(time.perf_counter() - start)
+        self._count_samples(measurement_type, 1)
+        self._process_measurement(measured_value, measurement_number, function.unit)
+        return measured_value
+
+    def configure_buffer(self, measurement_type, count, interval_seconds):
+        """
+        Configure the instrument to take count readings into its internal
+        reading memory on every initiate, using the driver's buffer commands.
+        """
+        configured = measurement_type == self.configured_type
+        self._buffer_type = measurement_type
+        for command in self.driver.buffer_commands(measurement_type, count, interval_seconds, configured):
+            self._write(command)
+
+    def set_buffer_count(self, count):
+        self._write(self.driver.buffer.sample_count.format(count=count))
+
+    def read_buffer(self):
+        """
+        Start a buffered acquisition and pull all readings in a single block transfer.
+        The instrument must have been set up with configure_buffer first.
+        """
+        start = time.perf_counter()
+        self._write(self.driver.buffer.initiate)
+        response = self._query(self.driver.buffer.fetch)
+        try:
+            measured_values = [float(value) for value in response.split(",")]
+        except ValueError:
+            self._parse_error(response)
+            raise
+        self._block_seconds.observe(time.perf_counter() - start)
+        self._count_samples(self._buffer_type, len(measured_values))
+        if self.keep_values:
+            self.measured_values.extend(measured_values)
+        return measured_values
+
+    def _write(self, command):
+        self.usb_device.write_raw(command.raw)
+
+    def _query(self, command):
+        self.usb_device.write_raw(command.raw)
+        return self.usb_device.read()
+
+    def _parse(self, response):
+        try:
+            return float(response)
+        except ValueError:
+            self._parse_error(response)
+            raise
+
+    def _parse_error(self, response):
+        self.metrics.counter("dmm_parse_errors_total", "Responses that were not a number",
+                             instrument=self.instrument).inc()
+        log_event(log, logging.WARNING, "Unparsable response", instrument=self.instrument, response=response[:200])
+
+    def _count_samples(self, measurement_type, count):
+        counter = self._samples.get(measurement_type)
+        if counter is None:
+            counter = self._samples[measurement_type] = self.metrics.counter(
+                "dmm_samples_total", "Samples read", instrument=self.instrument, type=measurement_type)
+        counter.inc(count)
 
     def _trigger_measurement(self, interval_seconds):
-        self.usb_device.write(":TRIGger:SINGle")
+        if self.driver.trigger:
+            self._write(self.driver.trigger)
         time.sleep(interval_seconds)
 
+    def add_value(self, measured_value):
+        if self.keep_values:
+            self.measured_values.append(measured_value)
+
     def _process_measurement(self, measured_value, measurement_number, unit):
-        self.measured_values.append(measured_value)
-        print(f"Measurement {measurement_number}:\t {measured_value:.5f} {unit}")
+        self.add_value(measured_value)
+        if self.verbose:
+            log_event(log, logging.DEBUG, "Reading", instrument=self.instrument, number=measurement_number,
+                      value=measured_value, unit=unit)
 
     def print_average(self):
         average_value = round(sum(self.measured_values) / len(self.measured_values), 5)
@@ -0,0 +1,289 @@
+# metrics.py
+"""
+Metrics and structured logging for monitoring measurement stations.
+
+The acquisition path updates these metrics as it runs (instrument is the VISA resource string):
+
+    dmm_samples_total{instrument,type}          samples read
+    dmm_reading_seconds{instrument,mode}        time per reading or per buffer block (histogram)
+    dmm_parse_errors_total{instrument}          responses that were not a number
+    dmm_io_seconds{instrument,operation}        time per I/O call on a pooled connection (histogram)
+    dmm_io_errors_total{instrument,kind}        failed I/O calls; kind is "timeout" or "error"
+    dmm_reconnects_total{instrument}            resources reopened after an I/O error
+    dmm_connections_open                        resources in the DeviceManager pool
+    dmm_retries_total{instrument}               readings retried by a RetryPolicy
+    dmm_schedule_overruns_total{instrument}     samples taken an interval or more late
+    dmm_skipped_samples_total{instrument}       samples dropped by the "skip" overrun policy
+    dmm_pending_samples                         samples acquired but not yet shown by the GUI
+
+Updating a metric takes a lock and an addition (and a bisect for histograms), so the hooks
+stay enabled in the hot path. MetricsServer serves the metrics as Prometheus text on
+http://127.0.0.1:<port>/metrics, and configure_logging() writes the "dmm" log records as
+JSON lines; events carry their details in extra={"fields": {...}}, see log_event().
+"""
+import bisect
+import json
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 9464
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+log = logging.getLogger("dmm.metrics")
+logging.getLogger("dmm").addHandler(logging.NullHandler())  # Silent unless configure_logging() is called
+
+
+class Counter:
+    """
+    A value that only goes up.
+    """
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge(Counter):
+    """
+    A value that goes up and down.
+    """
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+
+class Histogram:
+    """
+    Counts observations in cumulative buckets by upper bound, with their sum and count.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one counts values above all bounds
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative_counts(self):
+        """
+        Return [(upper_bound, count of observations <= upper_bound)], ending with infinity.
+        """
+        with self._lock:
+            counts = list(self.counts)
+        result, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    """
+    MetricsRegistry holds the metrics by name and label values. The same name and labels
+    always return the same metric object, so hooks look their metrics up once and keep them.
+    """
+    def __init__(self):
+        self._families = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text, **labels):
+        return self._metric(name, "counter", help_text, Counter, labels)
+
+    def gauge(self, name, help_text, **labels):
+        return self._metric(name, "gauge", help_text, Gauge, labels)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS, **labels):
+        return self._metric(name, "histogram", help_text, lambda: Histogram(buckets), labels)
+
+    def _metric(self, name, kind, help_text, factory, labels):
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, {"kind": kind, "help": help_text, "metrics": {}})
+            if family["kind"] != kind:
+                raise ValueError(f"Metric {name} is a {family['kind']}, not a {kind}")
+            metric = family["metrics"].get(key)
+            if metric is None:
+                metric = family["metrics"][key] = factory()
+            return metric
+
+    def render(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            families = [(name, family["kind"], family["help"], list(family["metrics"].items()))
+                        for name, family in sorted(self._families.items())]
+        lines = []
+        for name, kind, help_text, metrics in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics:
+                if kind == "histogram":
+                    for bound, count in metric.cumulative_counts():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {metric.sum!r}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {metric.value!r}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """
+        Return the current values as a dictionary: name -> list of {"labels", "value"} entries,
+        with count, sum and buckets instead of value for histograms.
+        """
+        with self._lock:
+            families = [(name, family["kind"], list(family["metrics"].items()))
+                        for name, family in self._families.items()]
+        result = {}
+        for name, kind, metrics in families:
+            entries = []
+            for labels, metric in metrics:
+                entry = {"labels": dict(labels)}
+                if kind == "histogram":
+                    entry.update(count=metric.count, sum=metric.sum, buckets=metric.cumulative_counts()[:-1])
+                else:
+                    entry["value"] = metric.value
+                entries.append(entry)
+            result[name] = entries
+        return result
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + "}"
+
+
+_default_metrics = MetricsRegistry()
+
+
+def default_metrics():
+    """
+    Return the registry the acquisition hooks report to.
+    """
+    return _default_metrics
+
+
+class MetricsServer:
+    """
+    MetricsServer serves a registry as Prometheus text at /metrics from a background thread.
+    It listens on localhost only unless another host is given. Port 0 picks a free port.
+    """
+    def __init__(self, registry=None, host="127.0.0.1", port=DEFAULT_PORT):
+        self.registry = registry or default_metrics()
+        self.host = host
+        self.requested_port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1] if self._server else self.requested_port
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug(format % args)
+
+        self._server = ThreadingHTTPServer((self.host, self.requested_port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        log_event(log, logging.INFO, "Metrics endpoint started", url=f"http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format log records as one JSON object per line: time, level, logger, message and the record's fields.
+    """
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def log_event(logger, level, message, **fields):
+    """
+    Log a message with structured fields, e.g. log_event(log, logging.WARNING, "I/O error", instrument=name).
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={"fields": fields})
+
+
+def configure_logging(path=None, level=logging.INFO):
+    """
+    Write the "dmm" log records as JSON lines to path, or to stderr if no path is given.
+    Returns the handler.
+    """
+    handler = logging.FileHandler(path) if path else logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("dmm")
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return handler
+
+
+def add_monitoring_arguments(parser):
+    """
+    Add the --metrics-port and --log-json options used by start_monitoring to an argument parser.
+    """
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help=f"serve Prometheus metrics on http://127.0.0.1:PORT/metrics (e.g. {DEFAULT_PORT})")
+    parser.add_argument("--log-json", metavar="FILE", help="write a structured JSON log to FILE ('-' for stderr)")
+
+
+def start_monitoring(metrics_port=None, log_path=None, log_level=logging.INFO):
+    """
+    Start what the command line options ask for: JSON logging (if log_path is set) and the
+    metrics endpoint (if metrics_port is set). Returns the MetricsServer or None.
+    """
+    if log_path:
+        configure_logging(None if log_path == "-" else log_path, log_level)
+    if metrics_port is not None:
+        return MetricsServer(port=metrics_port).start()
+    return None
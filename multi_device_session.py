@@ -0,0 +1,153 @@
+# multi_device_session.py
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from acquisition import AcquisitionRunner
+from drivers import AUTO_RANGE
+from measurement import Measurement
+from scheduler import SKIP
+
+_DEVICE_DONE = object()
+
+
+class MultiDeviceSession:
+    """
+    MultiDeviceSession opens several devices through a DeviceManager and
+    acquires from all of them in parallel, one worker thread per resource.
+    Readings are merged into a single stream of rows, one row per tick of the shared schedule.
+    """
+    def __init__(self, device_manager, devices):
+        self.device_manager = device_manager
+        self.devices = devices
+        self.instruments = {}
+        self.identifications = {}
+        self.runners = {}
+        self.settings = {}
+        self.errors = {}
+
+    def open(self):
+        """
+        Open every configured device in parallel and read its identification.
+        Devices that fail to open are recorded in self.errors and left out of the session.
+        """
+        with ThreadPoolExecutor(max_workers=max(1, len(self.devices))) as executor:
+            futures = {name: executor.submit(self._open_device, info) for name, info in self.devices.items()}
+        for name, future in futures.items():
+            try:
+                self.instruments[name], self.identifications[name] = future.result()
+            except Exception as e:
+                self.errors[name] = e
+        return list(self.instruments)
+
+    def _open_device(self, device_info):
+        instrument = self.device_manager.connect_device(device_info)
+        return instrument, self.device_manager.identify(device_info)
+
+    def close(self):
+        """
+        Close every device opened by this session and remove it from the DeviceManager pool.
+        """
+        for name in self.instruments:
+            self.device_manager.close_device(self.devices[name])
+        self.instruments.clear()
+
+    def cancel(self):
+        """
+        Stop the acquisition on all devices.
+        """
+        for runner in list(self.runners.values()):
+            runner.cancel()
+
+    def acquire(self, measurement_type, num_measurements, interval_seconds, overrun_policy=SKIP,
+                speed=None, measurement_range=AUTO_RANGE, mode=None, max_pending=1000):
+        """
+        Acquire from all open devices at once and yield merged rows as
+        (tick, {device_name: (timestamp, value)}), in tick order.
+        Every device is configured once with the speed preset (default: its driver's default)
+        and range before the run, and paced in mode (default: its driver's fastest mode).
+
+        All devices share the same start time and interval, and samples are merged by the
+        tick of the shared schedule they were taken at (their timestamp in intervals), not by
+        their index: a device that skipped samples or is paced by its own clock still lines up
+        with the others. A row is yielded as soon as every device has delivered a later
+        sample or has stopped. With an interval of 0 there is no schedule to share and the
+        sample index is used instead.
+
+        At most max_pending samples wait in the queue and at most max_pending incomplete rows
+        are held back for a slow device; beyond that the oldest row is yielded without it, and
+        its late samples come in rows of their own.
+        """
+        self.errors = {name: error for name, error in self.errors.items() if name not in self.instruments}
+        self.settings = {}
+        self.runners = {}
+        for name, instrument in self.instruments.items():
+            driver = self.device_manager.driver(self.devices[name])
+            self.settings[name] = driver.settings(measurement_type, speed or driver.default_speed, measurement_range)
+            self.runners[name] = AcquisitionRunner(Measurement(instrument, driver=driver, verbose=False, keep_values=False),
+                                                   measurement_type, num_measurements, interval_seconds,
+                                                   mode=mode, overrun_policy=overrun_policy, settings=self.settings[name])
+        if not self.runners:
+            return
+
+        samples = queue.Queue(maxsize=max_pending)
+        start_time = time.monotonic()
+        names = list(self.runners)
+        finished = set()
+        pending = {}
+        last_tick = {name: -1 for name in names}
+        yielded_tick = -1
+
+        def complete(tick):
+            return all(name in finished or last_tick[name] >= tick for name in names)
+
+        with ThreadPoolExecutor(max_workers=len(self.runners), thread_name_prefix="dmm") as executor:
+            for name, runner in self.runners.items():
+                executor.submit(self._run_device, name, runner, start_time, samples)
+
+            try:
+                while len(finished) < len(names):
+                    item = samples.get()
+                    if item[0] is _DEVICE_DONE:
+                        finished.add(item[1])
+                    else:
+                        name, index, timestamp, value = item
+                        tick = max(schedule_tick(index, timestamp, interval_seconds), last_tick[name] + 1)
+                        last_tick[name] = tick
+                        if tick <= yielded_tick:
+                            yield tick, {name: (timestamp, value)}  # Its row was yielded without it
+                            continue
+                        pending.setdefault(tick, {})[name] = (timestamp, value)
+
+                    while pending and (complete(min(pending)) or len(pending) > max_pending):
+                        yielded_tick = min(pending)
+                        yield yielded_tick, pending.pop(yielded_tick)
+            finally:
+                # Stop the workers if the caller stops iterating early, and unblock any waiting on a full queue
+                self.cancel()
+                while len(finished) < len(names):
+                    item = samples.get()
+                    if item[0] is _DEVICE_DONE:
+                        finished.add(item[1])
+
+        # Rows left over after a device stopped early
+        for tick in sorted(pending):
+            yield tick, pending[tick]
+
+    def _run_device(self, name, runner, start_time, samples):
+        try:
+            runner.run(on_sample=lambda index, timestamp, value: samples.put((name, index, timestamp, value)),
+                       start_time=start_time)
+        except Exception as e:
+            self.errors[name] = e
+        finally:
+            samples.put((_DEVICE_DONE, name))
+
+
+def schedule_tick(index, timestamp, interval_seconds):
+    """
+    Return the tick of the shared schedule a sample was taken at: its timestamp in intervals
+    since the common start time, or its index if there is no interval.
+    """
+    if interval_seconds <= 0:
+        return index
+    return round(timestamp / interval_seconds)
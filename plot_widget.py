@@ -0,0 +1,88 @@
+# plot_widget.py
+from PyQt6 import QtCore, QtGui, QtWidgets
+from decimation import MinMaxDecimator
+
+
+class PlotWidget(QtWidgets.QWidget):
+    """
+    PlotWidget draws the live sample stream as a min/max envelope over time.
+    Samples go into a MinMaxDecimator, so memory is bounded and each repaint
+    draws at most one vertical segment per pixel column, however long the run.
+    """
+    MARGIN_LEFT = 70
+    MARGIN_RIGHT = 10
+    MARGIN_TOP = 10
+    MARGIN_BOTTOM = 20
+
+    def __init__(self, parent=None, capacity=4096):
+        super().__init__(parent)
+        self.decimator = MinMaxDecimator(capacity)
+        self.unit = ""
+        self.setAutoFillBackground(True)
+        palette = self.palette()
+        palette.setColor(QtGui.QPalette.ColorRole.Window, QtGui.QColor("white"))
+        self.setPalette(palette)
+
+    def clear(self, unit=""):
+        """
+        Remove all samples, e.g. at the start of a new run.
+        """
+        self.decimator.reset()
+        self.unit = unit
+        self.update()
+
+    def add_samples(self, samples):
+        """
+        Add a batch of (index, timestamp, value) tuples from the acquisition worker.
+        The repaint is scheduled once per batch.
+        """
+        for index, timestamp, value in samples:
+            self.decimator.add(timestamp, value)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        plot = QtCore.QRect(self.MARGIN_LEFT, self.MARGIN_TOP,
+                            self.width() - self.MARGIN_LEFT - self.MARGIN_RIGHT,
+                            self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM)
+        painter.setPen(QtGui.QColor("gray"))
+        painter.drawRect(plot)
+
+        decimator = self.decimator
+        if not decimator.samples or plot.width() < 2 or plot.height() < 2:
+            painter.drawText(plot, QtCore.Qt.AlignmentFlag.AlignCenter, "No data")
+            painter.end()
+            return
+
+        low, high = decimator.minimum, decimator.maximum
+        if high == low:
+            low, high = low - 0.5 * (abs(low) or 1), high + 0.5 * (abs(high) or 1)
+
+        def y(value):
+            return plot.bottom() - (value - low) / (high - low) * plot.height()
+
+        # One vertical min..max segment per pixel column, joined into a single polyline
+        xs, minimums, maximums = decimator.columns(plot.width())
+        points = QtGui.QPolygonF()
+        for x, minimum, maximum in zip(xs, minimums, maximums):
+            points.append(QtCore.QPointF(plot.left() + x, y(minimum)))
+            points.append(QtCore.QPointF(plot.left() + x, y(maximum)))
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing, False)
+        painter.setPen(QtGui.QPen(QtGui.QColor("#2c3bad"), 1))
+        painter.drawPolyline(points)
+
+        # Axis labels: value range on the left, time span below
+        painter.setPen(QtGui.QColor("black"))
+        label_width = self.MARGIN_LEFT - 5
+        painter.drawText(QtCore.QRect(0, plot.top(), label_width, 20),
+                         QtCore.Qt.AlignmentFlag.AlignRight, f"{high:.5g} {self.unit}")
+        painter.drawText(QtCore.QRect(0, plot.bottom() - 20, label_width, 20),
+                         QtCore.Qt.AlignmentFlag.AlignRight | QtCore.Qt.AlignmentFlag.AlignBottom, f"{low:.5g} {self.unit}")
+        first_time = decimator.times[0]
+        painter.drawText(QtCore.QRect(plot.left(), plot.bottom(), plot.width(), self.MARGIN_BOTTOM),
+                         QtCore.Qt.AlignmentFlag.AlignLeft, f"{first_time:.3f} s")
+        painter.drawText(QtCore.QRect(plot.left(), plot.bottom(), plot.width(), self.MARGIN_BOTTOM),
+                         QtCore.Qt.AlignmentFlag.AlignRight, f"{decimator.last_time:.3f} s")
+        painter.drawText(QtCore.QRect(plot.left(), plot.bottom(), plot.width(), self.MARGIN_BOTTOM),
+                         QtCore.Qt.AlignmentFlag.AlignHCenter, f"{decimator.samples} samples")
+        painter.end()
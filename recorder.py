@@ -0,0 +1,207 @@
+# recorder.py
+"""
+Compact on-disk recording format for long captures.
+
+Layout of a .dmmrec file:
+    8 bytes   magic b"DMMREC1\\0"
+    4 bytes   little-endian uint32 length of the JSON metadata block
+    N bytes   JSON metadata (*IDN? fields, measurement type, unit, interval, ...),
+              padded with spaces so the records start on a 16-byte boundary
+    records   fixed-width little-endian float64 pairs (timestamp_s, value)
+
+Records are appended while the run is in progress, so a crash loses at most
+the last unflushed block. A partially written trailing record is ignored on read.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+MAGIC = b"DMMREC1\0"
+RECORD_SIZE = 16
+_LENGTH = struct.Struct("<I")
+
+
+def header_bytes(metadata, magic=MAGIC):
+    """
+    Return the file header: magic, metadata length and the JSON metadata, padded to a 16-byte boundary.
+    """
+    body = json.dumps(metadata).encode("utf-8")
+    header_size = len(magic) + _LENGTH.size + len(body)
+    body += b" " * (-header_size % RECORD_SIZE)
+    return magic + _LENGTH.pack(len(body)) + body
+
+
+def identification_metadata(identification):
+    """
+    Split an *IDN? response into the metadata fields used in recordings.
+    """
+    keys = ("device_id", "device", "serial_number", "software_version", "hardware_version")
+    parts = [part.strip() for part in identification.split(",")]
+    parts += [""] * (len(keys) - len(parts))
+    return dict(zip(keys, parts))
+
+
+class Recorder:
+    """
+    Recorder appends timestamped samples to a recording file as they arrive.
+    Samples are collected in a small array and written out every flush_samples
+    samples or flush_seconds seconds, whichever comes first.
+    """
+    def __init__(self, path, metadata, flush_samples=256, flush_seconds=1.0):
+        self.path = path
+        self.metadata = metadata
+        self.flush_samples = flush_samples
+        self.flush_seconds = flush_seconds
+        self.count = 0
+        self._pending = array("d")
+        self._last_flush = time.monotonic()
+        self._file = open(path, "wb")
+        self._file.write(header_bytes(metadata))
+        self._file.flush()
+
+    @classmethod
+    def reopen(cls, path, flush_samples=256, flush_seconds=1.0):
+        """
+        Open an existing recording to append more samples, e.g. when resuming an interrupted run.
+        A partially written trailing record is cut off first.
+        """
+        with Recording(path) as recording:
+            metadata = recording.metadata
+            count = len(recording)
+            data_offset = recording._data_offset
+        recorder = cls.__new__(cls)
+        recorder.path = path
+        recorder.metadata = metadata
+        recorder.flush_samples = flush_samples
+        recorder.flush_seconds = flush_seconds
+        recorder.count = count
+        recorder._pending = array("d")
+        recorder._last_flush = time.monotonic()
+        recorder._file = open(path, "r+b")
+        recorder._file.truncate(data_offset + count * RECORD_SIZE)
+        recorder._file.seek(0, 2)
+        return recorder
+
+    def append(self, timestamp, value):
+        """
+        Add one sample. Called from the acquisition thread.
+        """
+        self._pending.append(timestamp)
+        self._pending.append(value)
+        self.count += 1
+        if len(self._pending) >= 2 * self.flush_samples or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self, sync=False):
+        """
+        Write pending samples to disk. With sync, also wait until the operating system
+        has stored them, so they survive a power loss.
+        """
+        if self._pending:
+            if sys.byteorder != "little":
+                self._pending.byteswap()
+            self._file.write(self._pending.tobytes())
+            self._pending = array("d")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Recording:
+    """
+    Recording reads a recording file back through a memory map, without
+    loading the samples into memory. Indexing returns (timestamp, value).
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        magic = self._file.read(len(MAGIC))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f"{path} is not a DMM recording")
+        (length,) = _LENGTH.unpack(self._file.read(_LENGTH.size))
+        self.metadata = json.loads(self._file.read(length).decode("utf-8"))
+        self._data_offset = len(MAGIC) + _LENGTH.size + length
+        self._mmap = None
+        self._view = None
+        self._samples = memoryview(b"").cast("d")
+        self.refresh()
+
+    def refresh(self):
+        """
+        Re-map the file to pick up samples appended since it was opened.
+        """
+        self._release()
+        self._file.seek(0, 2)
+        data_size = self._file.tell() - self._data_offset
+        data_size -= data_size % RECORD_SIZE  # Ignore a partially written record
+        if data_size > 0:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._mmap)[self._data_offset:self._data_offset + data_size]
+            if sys.byteorder == "little":
+                self._samples = self._view.cast("d")
+            else:
+                samples = array("d", self._view.tobytes())
+                samples.byteswap()
+                self._samples = memoryview(samples)
+
+    def __len__(self):
+        return len(self._samples) // 2
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("recording index out of range")
+        return self._samples[2 * index], self._samples[2 * index + 1]
+
+    def __iter__(self):
+        samples = self._samples
+        for i in range(0, len(samples) - 1, 2):
+            yield samples[i], samples[i + 1]
+
+    def iter_chunks(self, chunk_size=65536):
+        """
+        Yield (timestamps, values) lists of up to chunk_size samples each.
+        """
+        samples = self._samples
+        for start in range(0, len(self), chunk_size):
+            block = samples[2 * start:2 * min(len(self), start + chunk_size)].tolist()
+            yield block[0::2], block[1::2]
+
+    def _release(self):
+        self._samples.release()
+        self._samples = memoryview(b"").cast("d")
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def close(self):
+        self._release()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
@@ -0,0 +1,106 @@
+# running_stats.py
+import math
+from collections import deque
+
+
+class RunningStatistics:
+    """
+    RunningStatistics accumulates statistics over a stream of samples at
+    constant cost per sample, without keeping the samples in memory.
+
+    Mean and variance use Welford's algorithm. The moving average covers the
+    last `window` samples. Drift is the least-squares slope of value over
+    time (units per second), also updated incrementally.
+    """
+    def __init__(self, window=100):
+        self.window = window
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.last = None
+        self._window_values = deque(maxlen=self.window)
+        self._window_sum = 0.0
+        self._mean_time = 0.0
+        self._m2_time = 0.0
+        self._co_moment = 0.0
+
+    def add(self, value, timestamp=None):
+        """
+        Add one sample. timestamp is in seconds; the sample index is used if it is omitted.
+        """
+        if timestamp is None:
+            timestamp = float(self.count)
+        self.count += 1
+        self.last = value
+
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        delta_time = timestamp - self._mean_time
+        self._mean_time += delta_time / self.count
+        self._m2_time += delta_time * (timestamp - self._mean_time)
+        self._co_moment += delta_time * (value - self.mean)
+
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+        if len(self._window_values) == self.window:
+            self._window_sum -= self._window_values[0]
+        self._window_values.append(value)
+        self._window_sum += value
+        if self.count % self.window == 0:
+            self._window_sum = sum(self._window_values)  # Keep rounding errors from accumulating
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    @property
+    def moving_average(self):
+        return self._window_sum / len(self._window_values) if self._window_values else None
+
+    @property
+    def drift(self):
+        return self._co_moment / self._m2_time if self._m2_time > 0 else 0.0
+
+    def snapshot(self):
+        """
+        Return the current statistics as a dictionary.
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "std": self.std,
+            "min": self.minimum,
+            "max": self.maximum,
+            "moving_average": self.moving_average,
+            "drift_per_second": self.drift,
+        }
+
+
+def format_statistics(stats, unit=""):
+    """
+    Format a RunningStatistics snapshot as lines for the status view and the saved file.
+    """
+    if not stats["count"]:
+        return ["No samples"]
+    unit = f" {unit}" if unit else ""
+    return [
+        f"Average Value: {round(stats['mean'], 5)}{unit}",
+        f"Std deviation: {stats['std']:.5g}{unit}",
+        f"Min: {stats['min']:.5f}{unit}, Max: {stats['max']:.5f}{unit}",
+        f"Moving average: {stats['moving_average']:.5f}{unit}",
+        f"Drift: {stats['drift_per_second']:.5g}{unit}/s",
+    ]
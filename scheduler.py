@@ -0,0 +1,150 @@
+# scheduler.py
+import math
+import threading
+import time
+
+SKIP = "skip"
+CATCH_UP = "catch_up"
+OVERRUN_POLICIES = {
+    "Skip missed samples": SKIP,
+    "Catch up": CATCH_UP,
+}
+
+
+class SampleScheduler:
+    """
+    SampleScheduler paces samples against absolute deadlines on the monotonic clock,
+    so the time spent talking to the instrument does not add up into drift.
+
+    When a sample is late by a whole interval or more the overrun policy decides what happens:
+    SKIP drops the missed deadlines and waits for the next one on the regular grid,
+    CATCH_UP takes the missed samples back to back until the schedule is met again.
+    """
+    def __init__(self, interval_seconds, policy=SKIP, clock=time.monotonic):
+        if policy not in (SKIP, CATCH_UP):
+            raise ValueError(f"Unknown overrun policy: {policy}")
+        self.interval_seconds = interval_seconds
+        self.policy = policy
+        self.clock = clock
+        self.start_time = None
+        self._slot = 0
+        self._first_timestamp = None
+        self._last_timestamp = None
+        self.samples = 0
+        self.overruns = 0
+        self.skipped = 0
+        self._jitter_mean = 0.0
+        self._jitter_m2 = 0.0
+        self.max_jitter = 0.0
+
+    def start(self, start_time=None):
+        """
+        Start the schedule. The first deadline is start_time, or now if not given.
+        """
+        self.start_time = self.clock() if start_time is None else start_time
+        self._slot = 0
+
+    def wait(self, cancel_event=None):
+        """
+        Block until the next deadline. Returns the timestamp of the sample
+        in seconds since start, or None if cancel_event was set while waiting.
+        """
+        deadline = self.next_deadline()
+        delay = deadline - self.clock()
+        if delay > 0:
+            if cancel_event is None:
+                cancel_event = threading.Event()
+            if cancel_event.wait(delay):
+                return None
+        return self.taken(deadline)
+
+    def next_deadline(self):
+        """
+        Return the deadline of the next sample on the scheduler clock, after applying
+        the overrun policy. Callers that do their own waiting (e.g. with asyncio.sleep)
+        call taken() once the deadline has passed.
+        """
+        if self.start_time is None:
+            self.start()
+        now = self.clock()
+        if self.interval_seconds <= 0:
+            return now  # Free-running: every sample is due as soon as the previous one is done
+        deadline = self.start_time + self._slot * self.interval_seconds
+
+        if now - deadline >= self.interval_seconds:
+            self.overruns += 1
+            if self.policy == SKIP:
+                missed = math.ceil((now - deadline) / self.interval_seconds)
+                self.skipped += missed
+                self._slot += missed
+                deadline += missed * self.interval_seconds
+        return deadline
+
+    def taken(self, deadline):
+        """
+        Record that the sample for the deadline is being taken now. Returns its timestamp in seconds since start.
+        """
+        now = self.clock()
+        self._slot += 1
+        self._record(now - deadline if self.interval_seconds > 0 else 0.0, now - self.start_time)
+        return now - self.start_time
+
+    def skip_to_now(self):
+        """
+        Move the next deadline to the first slot at or after now without counting the
+        slots before it as skipped, e.g. when resuming a run with a start time in the past.
+        """
+        if self.start_time is not None and self.interval_seconds > 0:
+            self._slot = max(self._slot, math.ceil((self.clock() - self.start_time) / self.interval_seconds))
+
+    def reset_deadline(self):
+        """
+        Restart the deadline grid from now, e.g. after a pause,
+        so the time spent paused is not counted as an overrun.
+        """
+        self.start_time = self.clock() - self._slot * self.interval_seconds
+
+    def _record(self, jitter, timestamp):
+        self.samples += 1
+        delta = jitter - self._jitter_mean
+        self._jitter_mean += delta / self.samples
+        self._jitter_m2 += delta * (jitter - self._jitter_mean)
+        self.max_jitter = max(self.max_jitter, jitter)
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+        self._last_timestamp = timestamp
+
+    def statistics(self):
+        """
+        Return the achieved timing as a dictionary (all times in seconds).
+        """
+        mean_interval = None
+        if self.samples > 1:
+            mean_interval = (self._last_timestamp - self._first_timestamp) / (self.samples - 1)
+        jitter_std = math.sqrt(self._jitter_m2 / (self.samples - 1)) if self.samples > 1 else 0.0
+        return {
+            "requested_interval": self.interval_seconds,
+            "mean_interval": mean_interval,
+            "mean_jitter": self._jitter_mean,
+            "max_jitter": self.max_jitter,
+            "jitter_std": jitter_std,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "policy": self.policy,
+        }
+
+
+def format_timing(stats):
+    """
+    Format the scheduler statistics as lines for the status view and the saved file.
+    """
+    lines = [f"Requested interval: {stats['requested_interval'] * 1000:.3f} ms"]
+    if stats.get("instrument_paced"):
+        lines.append("Timing: paced by the instrument, timestamps spread over each block")
+        return lines
+    if stats["mean_interval"] is not None:
+        lines.append(f"Actual mean interval: {stats['mean_interval'] * 1000:.3f} ms")
+    lines.append(f"Jitter: mean {stats['mean_jitter'] * 1000:.3f} ms, "
+                 f"max {stats['max_jitter'] * 1000:.3f} ms, std {stats['jitter_std'] * 1000:.3f} ms")
+    lines.append(f"Overruns: {stats['overruns']} (skipped samples: {stats['skipped']}, policy: {stats['policy']})")
+    return lines
@@ -0,0 +1,289 @@
+# sequence.py
+"""
+Test-sequence engine. Runs a test plan, a list of measurement steps with their own
+settings and pass/fail limits, back to back on pooled connections without any user
+interaction, and writes one consolidated result file per unit under test.
+
+A plan is a JSON file:
+    {
+        "name": "Power board",
+        "device": "BK_Precision_5493C",
+        "stop_on_fail": false,
+        "steps": [
+            {"name": "5V rail", "type": "DC Voltage", "count": 10, "interval_ms": 100,
+             "speed": "Medium", "range": 10, "setup": [":ROUTe:CLOSe (@101)"],
+             "limits": {"low": 4.9, "high": 5.1}},
+            {"name": "Pull-up", "type": "Resistance", "count": 5, "limits": {"low": 9500, "high": 10500}}
+        ]
+    }
+
+Step keys: name, type (one of the driver's measurement types), count, interval_ms, and optionally
+device, speed, range, mode ("per-sample" or "buffered"), setup (SCPI commands sent before the step,
+e.g. to route a scanner channel) and limits. Limits apply to the mean of the step
+("low", "high") and to its standard deviation ("max_std"); a step without limits passes if it
+completes.
+
+Example:
+    python sequence.py plans/example.json --serial SN0001 --output-dir results
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from acquisition import AcquisitionRunner
+from checkpoint import write_atomic
+from device_manager import DeviceManager
+from drivers import AUTO_RANGE, DEFAULT_DEVICES_FILE, load_devices
+from measurement import Measurement
+from metrics import add_monitoring_arguments, start_monitoring
+from running_stats import RunningStatistics
+
+
+class TestStep:
+    """
+    One step of a test plan.
+    """
+    def __init__(self, definition, default_device=None):
+        self.name = definition.get("name", definition["type"])
+        self.measurement_type = definition["type"]
+        self.device = definition.get("device", default_device)
+        self.count = int(definition.get("count", 1))
+        self.interval_seconds = definition.get("interval_ms", 0) / 1000
+        self.speed = definition.get("speed")
+        self.measurement_range = definition.get("range", AUTO_RANGE)
+        self.mode = definition.get("mode")
+        self.setup = definition.get("setup", [])
+        self.limits = definition.get("limits", {})
+        if self.device is None:
+            raise ValueError(f"Step {self.name}: no device given")
+        if self.count < 1:
+            raise ValueError(f"Step {self.name}: count must be at least 1")
+
+    def check(self, stats):
+        """
+        Compare a RunningStatistics snapshot with the limits. Returns a list of failed checks, empty if the step passed.
+        """
+        failures = []
+        if not stats["count"]:
+            return ["no samples"]
+        if "low" in self.limits and stats["mean"] < self.limits["low"]:
+            failures.append(f"mean {stats['mean']:.6g} < low limit {self.limits['low']:g}")
+        if "high" in self.limits and stats["mean"] > self.limits["high"]:
+            failures.append(f"mean {stats['mean']:.6g} > high limit {self.limits['high']:g}")
+        if "max_std" in self.limits and stats["std"] > self.limits["max_std"]:
+            failures.append(f"std {stats['std']:.6g} > max_std {self.limits['max_std']:g}")
+        return failures
+
+
+class TestPlan:
+    """
+    A named list of TestSteps loaded from a plan file.
+    """
+    def __init__(self, definition, path=None):
+        self.path = path
+        self.name = definition.get("name", os.path.splitext(os.path.basename(path or "plan"))[0])
+        self.stop_on_fail = definition.get("stop_on_fail", False)
+        self.steps = [TestStep(step, definition.get("device")) for step in definition["steps"]]
+        if not self.steps:
+            raise ValueError(f"Test plan {self.name} has no steps")
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as file:
+            return cls(json.load(file), path)
+
+
+class SequenceRunner:
+    """
+    SequenceRunner runs a TestPlan on the devices from devices.json. Connections come from
+    the DeviceManager pool and stay open from one step to the next; transient I/O errors are
+    retried as in a normal run. on_step(index, step, result) is called after every step.
+    """
+    def __init__(self, device_manager, devices, plan, on_step=None):
+        self.device_manager = device_manager
+        self.devices = devices
+        self.plan = plan
+        self.on_step = on_step
+        self._runner = None
+        self._cancelled = False
+
+    def validate(self):
+        """
+        Check every step against its device's driver before anything is measured.
+        Raises ValueError listing all problems.
+        """
+        problems = []
+        for step in self.plan.steps:
+            if step.device not in self.devices:
+                problems.append(f"{step.name}: unknown device {step.device}")
+                continue
+            driver = self.device_manager.driver(self.devices[step.device])
+            try:
+                driver.settings(step.measurement_type, step.speed or driver.default_speed, step.measurement_range)
+            except ValueError as e:
+                problems.append(f"{step.name}: {str(e)}")
+        if problems:
+            raise ValueError("Invalid test plan:\n  " + "\n  ".join(problems))
+
+    def cancel(self):
+        """
+        Stop the sequence after the current sample. Safe to call from another thread.
+        """
+        self._cancelled = True
+        if self._runner is not None:
+            self._runner.cancel()
+
+    def run(self, unit_id):
+        """
+        Run all steps for one unit under test and return the consolidated result.
+        """
+        self.validate()
+        result = {
+            "plan": self.plan.name,
+            "unit_id": unit_id,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "identifications": {},
+            "steps": [],
+        }
+        for index, step in enumerate(self.plan.steps):
+            if self._cancelled:
+                break
+            step_result = self._run_step(step, result["identifications"])
+            result["steps"].append(step_result)
+            if self.on_step:
+                self.on_step(index, step, step_result)
+            if not step_result["passed"] and self.plan.stop_on_fail:
+                break
+        result["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        result["completed"] = len(result["steps"]) == len(self.plan.steps) and not self._cancelled
+        result["passed"] = result["completed"] and all(step["passed"] for step in result["steps"])
+        return result
+
+    def _run_step(self, step, identifications):
+        device_info = self.devices[step.device]
+        driver = self.device_manager.driver(device_info)
+        step_result = {
+            "name": step.name,
+            "device": step.device,
+            "measurement_type": step.measurement_type,
+            "unit": driver.unit(step.measurement_type),
+            "count": step.count,
+            "interval_seconds": step.interval_seconds,
+            "limits": step.limits,
+        }
+        statistics = RunningStatistics()
+        samples = []
+        start = time.monotonic()
+        try:
+            connection = self.device_manager.connect_device(device_info)
+            if step.device not in identifications:
+                identifications[step.device] = self.device_manager.identify(device_info)
+            for command in step.setup:
+                connection.write(command)
+            settings = driver.settings(step.measurement_type, step.speed or driver.default_speed, step.measurement_range)
+            step_result["settings"] = settings
+            # A new Measurement per step, so nothing configured by an earlier step is assumed
+            measurement = Measurement(connection, driver=driver, verbose=False, keep_values=False)
+            self._runner = AcquisitionRunner(measurement, step.measurement_type, step.count, step.interval_seconds,
+                                             mode=step.mode, settings=settings,
+                                             retry=self.device_manager.retry_policy(device_info))
+
+            def on_sample(index, timestamp, value):
+                statistics.add(value, timestamp)
+                samples.append([timestamp, value])
+
+            completed = self._runner.run(on_sample=on_sample)
+            failures = step.check(statistics.snapshot()) if completed else ["cancelled"]
+        except Exception as e:
+            failures = [f"error: {str(e)}"]
+        finally:
+            self._runner = None
+        step_result.update({
+            "duration_s": time.monotonic() - start,
+            "statistics": statistics.snapshot(),
+            "passed": not failures,
+            "failures": failures,
+            "samples": samples,
+        })
+        return step_result
+
+
+def result_file_name(result):
+    timestamp = result["started_at"].replace(":", "-").replace("T", "_")
+    safe_unit = "".join(c if c.isalnum() or c in "-_." else "_" for c in result["unit_id"])
+    safe_plan = "".join(c if c.isalnum() or c in "-_." else "_" for c in result["plan"])
+    return f"{safe_unit}_{safe_plan}_{timestamp}.json"
+
+
+def write_result(result, directory):
+    """
+    Write the consolidated result of one unit under test. Returns the file path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, result_file_name(result))
+    write_atomic(path, result)
+    return path
+
+
+def format_step(step_result):
+    """
+    Format a step result as one line, e.g. "PASS  5V rail: 5.0012 V (10 samples)".
+    """
+    stats = step_result["statistics"]
+    verdict = "PASS" if step_result["passed"] else "FAIL"
+    value = f"{stats['mean']:.6g} {step_result['unit']}" if stats["count"] else "-"
+    line = f"{verdict}  {step_result['name']}: {value} ({stats['count']} samples)"
+    if step_result["failures"]:
+        line += "  [" + "; ".join(step_result["failures"]) + "]"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a test plan on one or more units under test.")
+    parser.add_argument("plan", help="test plan JSON file")
+    parser.add_argument("--serial", action="append", required=True,
+                        help="identifier of the unit under test; repeat to test several units one after another")
+    parser.add_argument("--devices-file", default=DEFAULT_DEVICES_FILE, help="device configuration file")
+    parser.add_argument("--output-dir", default="results", help="directory for the result files")
+    add_monitoring_arguments(parser)
+    args = parser.parse_args(argv)
+
+    devices = load_devices(args.devices_file)
+    try:
+        plan = TestPlan.load(args.plan)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: could not load test plan: {str(e)}", file=sys.stderr)
+        return 2
+
+    metrics_server = start_monitoring(args.metrics_port, args.log_json)
+    device_manager = DeviceManager()
+    all_passed = True
+    try:
+        for unit_id in args.serial:
+            if len(args.serial) > 1:
+                input(f"Connect unit {unit_id} and press Enter...")
+            sequence = SequenceRunner(device_manager, devices, plan,
+                                      on_step=lambda index, step, step_result: print(format_step(step_result)))
+            print(f"{plan.name}: unit {unit_id}")
+            try:
+                result = sequence.run(unit_id)
+            except ValueError as e:
+                print(f"Error: {str(e)}", file=sys.stderr)
+                return 2
+            except KeyboardInterrupt:
+                sequence.cancel()
+                return 1
+            path = write_result(result, args.output_dir)
+            print(f"Unit {unit_id}: {'PASSED' if result['passed'] else 'FAILED'} - result saved to {path}\n")
+            all_passed = all_passed and result["passed"]
+    finally:
+        device_manager.close_all()
+        if metrics_server:
+            metrics_server.stop()
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# simulated_instrument.py
+import random
+import re
+import threading
+import time
+
+SIMULATED_PREFIX = "SIM::"
+SIMULATED_DEVICE_NAME = "Simulated_DMM"
+SIMULATED_DEVICE_INFO = {
+    "resource_string": "SIM::DMM::INSTR",
+    "timeout": 10000,
+    "driver": "bk_precision_5490_series",
+}
+
+
+class SimulatedTimeoutError(TimeoutError):
+    """
+    Raised by SimulatedInstrument when an I/O error is injected.
+    """
+    pass
+
+
+def normalize_command(command):
+    """
+    Reduce a SCPI command header to upper-case short form, e.g.
+    ":MEASure:VOLTage:DC?" -> "MEAS:VOLT:DC?". Arguments are returned separately.
+    """
+    command = command.strip()
+    header, _, arguments = command.partition(" ")
+    query = header.endswith("?")
+    nodes = []
+    for node in header.strip(":").rstrip("?").split(":"):
+        node = node.upper()
+        if not node.startswith("*") and len(node) > 4:
+            node = node[:3] if node[3] in "AEIOU" else node[:4]
+        nodes.append(node)
+    return ":".join(nodes) + ("?" if query else ""), arguments.strip()
+
+
+class SimulatedInstrument:
+    """
+    SimulatedInstrument stands in for a pyvisa resource and answers the SCPI
+    subset used by Measurement: MEASure?, CONFigure, TRIGger, SAMPle, INITiate,
+    FETCh?, READ?, SENSe settings and the common *IDN?/*STB?/*OPC? queries.
+
+    Options (the "simulation" entry of a device in devices.json):
+        latency       seconds per command, or a dict of short-form header -> seconds
+                      with a "default" key, e.g. {"default": 0.001, "FETC?": 0.004}
+        noise         standard deviation of the Gaussian noise added to readings
+        values        nominal reading per function, e.g. {"VOLT:DC": 5.0}
+        error_rate    probability that an I/O call raises SimulatedTimeoutError
+        seed          random seed for reproducible noise and errors
+    """
+    DEFAULT_VALUES = {"VOLT:DC": 5.0, "RES": 1000.0, "DIOD": 0.6}
+    POWER_LINE_FREQUENCY = 50
+
+    def __init__(self, resource_name="SIM::DMM::INSTR", timeout=10000, latency=0.0, noise=0.001,
+                 values=None, error_rate=0.0, seed=None,
+                 identification="Simulated,DMM-SIM,SIM0001,1.0,1.0"):
+        self.resource_name = resource_name
+        self.timeout = timeout
+        self.latency = latency if isinstance(latency, dict) else {"default": latency}
+        self.noise = noise
+        self.values = dict(self.DEFAULT_VALUES, **(values or {}))
+        self.error_rate = error_rate
+        self.identification = identification
+        self.closed = False
+        self.settings = {}
+        self.function = "VOLT:DC"
+        self.sample_count = 1
+        self.trigger_count = 1
+        self.trigger_delay = 0.0
+        self.nplc = 1.0
+        self._random = random.Random(seed)
+        self._readings = []
+        self._ready_at = 0.0
+        self._response_ready_at = 0.0
+        self._output = []  # (ready_at, response) pairs; read() waits until the response is ready
+        self._errors = []
+        self._lock = threading.Lock()
+
+    def write(self, command):
+        with self._lock:
+            self._io(command)
+            self._output.clear()  # A new command discards unread output, as on a real instrument
+            self._response_ready_at = 0.0
+            response = self._execute(command)
+            if response is not None:
+                self._output.append((self._response_ready_at, response))
+        return len(command)
+
+    def write_raw(self, message):
+        self.write(message.decode("ascii"))
+        return len(message)
+
+    def read(self):
+        with self._lock:
+            self._io(None)
+            if not self._output:
+                raise SimulatedTimeoutError(f"{self.resource_name}: read timed out, no response pending")
+            ready_at, response = self._output[0]
+            self._wait_until(ready_at)  # The response stays pending if the measurement times out
+            self._output.pop(0)
+            return response + "\n"
+
+    def query(self, command):
+        self.write(command)
+        return self.read()
+
+    def open(self):
+        """
+        Start a new session, as when pyvisa reopens the resource. The meter keeps its
+        settings and readings; output that was not read yet is lost.
+        """
+        with self._lock:
+            self.closed = False
+            self._output.clear()
+
+    def close(self):
+        self.closed = True
+
+    def _io(self, command):
+        if self.closed:
+            raise SimulatedTimeoutError(f"{self.resource_name}: resource is closed")
+        header = normalize_command(command)[0] if command else None
+        delay = self.latency.get(header, self.latency.get("default", 0.0))
+        if delay:
+            time.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise SimulatedTimeoutError(f"{self.resource_name}: injected timeout on {command or 'read'}")
+
+    def _execute(self, command):
+        header, arguments = normalize_command(command)
+        function = re.match(r"(MEAS|CONF):(.+?)\??$", header)
+        if function and function.group(2) in self.values:
+            self.function = function.group(2)
+            if header.startswith("MEAS"):
+                self._readings = self._take_readings(1)
+                self._response_ready_at = time.monotonic() + self._reading_time()
+                return self._format_readings()
+            return None
+
+        if header == "*IDN?":
+            return self.identification
+        if header == "*STB?":
+            return "0"
+        if header == "*OPC?":
+            self._response_ready_at = self._ready_at
+            return "1"
+        if header in ("*RST", "*CLS"):
+            return None
+        if header == "SYST:ERR?":
+            return self._errors.pop(0) if self._errors else '+0,"No error"'
+        if header == "TRIG:SING":
+            self._readings = self._take_readings(1)
+            self._ready_at = time.monotonic() + self.trigger_delay + self._reading_time()
+            return None
+        if header == "TRIG:COUN":
+            self.trigger_count = int(float(arguments))
+            return None
+        if header == "SAMP:COUN":
+            self.sample_count = int(float(arguments))
+            return None
+        if header == "TRIG:DEL":
+            self.trigger_delay = float(arguments)
+            return None
+        if header == "INIT":
+            count = self.trigger_count * self.sample_count
+            self._readings = self._take_readings(count)
+            self._ready_at = time.monotonic() + count * (self.trigger_delay + self._reading_time())
+            return None
+        if header == "FETC?":
+            if not self._readings:
+                self._errors.append('-230,"Data stale"')
+                return None  # No response, so the following read times out as on a real instrument
+            self._response_ready_at = self._ready_at
+            return self._format_readings()
+        if header == "READ?":
+            count = self.trigger_count * self.sample_count
+            self._readings = self._take_readings(count)
+            self._ready_at = time.monotonic() + count * (self.trigger_delay + self._reading_time())
+            self._response_ready_at = self._ready_at
+            return self._format_readings()
+        if header.endswith(":NPLC"):
+            self.nplc = float(arguments)
+        if header.split(":")[0] in ("SENS", "VOLT", "RES", "DIOD", "ZERO", "DISP", "TRIG", "SYST"):
+            self.settings[header] = arguments
+            return None
+
+        self._errors.append(f'-113,"Undefined header; {command.strip()}"')
+        return None
+
+    def _reading_time(self):
+        return self.nplc / self.POWER_LINE_FREQUENCY
+
+    def _take_readings(self, count):
+        nominal = self.values[self.function]
+        return [self._random.gauss(nominal, self.noise) for _ in range(count)]
+
+    def _format_readings(self):
+        return ",".join(f"{reading:+.8E}" for reading in self._readings)
+
+    def _wait_until(self, ready_at):
+        remaining = ready_at - time.monotonic()
+        if remaining > 0:
+            if remaining > self.timeout / 1000:
+                time.sleep(self.timeout / 1000)
+                raise SimulatedTimeoutError(f"{self.resource_name}: timed out waiting for the measurement")
+            time.sleep(remaining)
@@ -0,0 +1,66 @@
+# status_log.py
+from PyQt6 import QtGui
+
+
+class StatusLog:
+    """
+    StatusLog appends sample lines to a QTextEdit in batches and keeps at most
+    max_lines of them, dropping the oldest. Lines written before begin_samples()
+    (date, device details, settings) are kept, so the cost of an update depends
+    only on the batch size and never on how many samples the run has produced.
+    """
+    def __init__(self, text_edit, max_lines=500):
+        self.text_edit = text_edit
+        self.max_lines = max_lines
+        self._first_sample_block = None
+        self._sample_lines = 0
+        self.dropped = 0
+
+    def begin_samples(self):
+        """
+        Mark the end of the header; everything appended after this is subject to the line limit.
+        """
+        self._first_sample_block = self.text_edit.document().blockCount()
+        self._sample_lines = 0
+        self.dropped = 0
+
+    def append_lines(self, lines):
+        """
+        Append a batch of lines in one document edit and trim the oldest sample lines.
+        """
+        if not lines:
+            return
+        if len(lines) > self.max_lines:
+            self.dropped += len(lines) - self.max_lines
+            lines = lines[-self.max_lines:]
+        cursor = QtGui.QTextCursor(self.text_edit.document())
+        cursor.movePosition(QtGui.QTextCursor.MoveOperation.End)
+        cursor.insertBlock()
+        cursor.insertText("\n".join(lines))  # Each line becomes its own block
+        self._sample_lines += len(lines)
+
+        excess = self._sample_lines - self.max_lines
+        if excess > 0 and self._first_sample_block is not None:
+            self._remove_blocks(self._first_sample_block, excess)
+            self._sample_lines -= excess
+            self.dropped += excess
+
+        scroll_bar = self.text_edit.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.maximum())
+
+    def end_samples(self):
+        """
+        Stop limiting lines; anything appended afterwards (the summary) is kept.
+        """
+        self._first_sample_block = None
+
+    def _remove_blocks(self, first_block, count):
+        document = self.text_edit.document()
+        start = document.findBlockByNumber(first_block)
+        end = document.findBlockByNumber(first_block + count)
+        if not start.isValid() or not end.isValid():
+            return
+        cursor = QtGui.QTextCursor(document)
+        cursor.setPosition(start.position())
+        cursor.setPosition(end.position(), QtGui.QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
@@ -0,0 +1,30 @@
+# conftest.py
+import os
+import sys
+import pytest
+
+# The modules live at the top of the repository, next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def simulated_device():
+    """
+    A devices.json entry for a simulated meter without added latency.
+    """
+    return {
+        "resource_string": "SIM::DMM::INSTR",
+        "timeout": 1000,
+        "driver": "bk_precision_5490_series",
+        "simulation": {"latency": 0.0, "noise": 0.001, "seed": 1},
+    }
+
+
+def metric_value(registry, name, **labels):
+    """
+    Return the value of a counter or gauge in a MetricsRegistry, 0 if it was never updated.
+    """
+    for entry in registry.snapshot().get(name, []):
+        if all(entry["labels"].get(label) == str(value) for label, value in labels.items()):
+            return entry["value"]
+    return 0
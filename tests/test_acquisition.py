@@ -0,0 +1,143 @@
+# test_acquisition.py
+import threading
+import time
+import pytest
+from acquisition import AcquisitionRunner, buffer_chunk_size
+from checkpoint import Checkpoint, checkpoint_path, load_checkpoint, resume_point
+from conftest import metric_value
+from device_manager import DeviceManager
+from drivers import BUFFERED, PER_SAMPLE
+from measurement import Measurement
+from metrics import MetricsRegistry
+from recorder import Recorder, Recording
+
+
+def make_runner(device_info, count, interval_seconds=0.0, **options):
+    registry = MetricsRegistry()
+    device_manager = DeviceManager(metrics=registry)
+    connection = device_manager.connect_device(device_info)
+    driver = device_manager.driver(device_info)
+    measurement = Measurement(connection, driver=driver, verbose=False, keep_values=False, metrics=registry)
+    options.setdefault("settings", driver.settings("DC Voltage", "Fast"))
+    runner = AcquisitionRunner(measurement, "DC Voltage", count, interval_seconds, **options)
+    return runner, device_manager, registry
+
+
+def test_each_io_error_reopens_the_resource_once(simulated_device):
+    simulated_device["simulation"]["error_rate"] = 0.05
+    runner, device_manager, registry = make_runner(simulated_device, 100, mode=PER_SAMPLE)
+    runner.retry = device_manager.retry_policy(simulated_device, initial_delay=0)
+    values = []
+    assert runner.run(on_sample=lambda index, timestamp, value: values.append(value))
+    assert len(values) == 100
+    assert runner.retries > 0
+    assert metric_value(registry, "dmm_io_errors_total") == runner.retries
+    assert metric_value(registry, "dmm_reconnects_total") == runner.retries
+
+
+def test_failed_run_raises_once_the_attempts_are_used_up(simulated_device):
+    simulated_device["simulation"]["error_rate"] = 1.0
+    runner, device_manager, registry = make_runner(simulated_device, 5, mode=PER_SAMPLE, settings=None)
+    runner.retry = device_manager.retry_policy(simulated_device, attempts=2, initial_delay=0)
+    with pytest.raises(OSError):
+        runner.run()
+    assert runner.retries == 2
+    assert metric_value(registry, "dmm_reconnects_total") == 2
+
+
+def test_resumed_run_continues_the_recording(simulated_device, tmp_path):
+    path = str(tmp_path / "run.dmmrec")
+    state = {"interval_seconds": 0.01}
+    recorder = Recorder(path, {})
+    runner, _, _ = make_runner(simulated_device, 10, 0.01, mode=PER_SAMPLE, recorder=recorder,
+                               checkpoint=Checkpoint(recorder, state))
+    assert not runner.run(on_sample=lambda index, timestamp, value: index == 3 and runner.cancel())
+    recorder.close()
+
+    state = load_checkpoint(checkpoint_path(path))
+    assert state["samples"] == 4
+    first_index, time_offset = resume_point(state)
+    recorder = Recorder.reopen(path)
+    runner, _, _ = make_runner(simulated_device, 10, 0.01, mode=PER_SAMPLE, recorder=recorder,
+                               checkpoint=Checkpoint(recorder, state), first_index=first_index)
+    indexes = []
+    assert runner.run(on_sample=lambda index, timestamp, value: indexes.append(index),
+                      start_time=time.monotonic() - time_offset)
+    recorder.close()
+
+    assert indexes == list(range(4, 10))
+    with Recording(path) as recording:
+        timestamps = [timestamp for timestamp, _ in recording]
+    assert len(timestamps) == 10
+    assert timestamps == sorted(timestamps)
+    assert timestamps[4] >= time_offset - 0.001
+
+
+def test_buffered_timestamps_follow_the_elapsed_time(simulated_device):
+    # Without settings the simulated meter integrates for 1 NPLC, 20 ms per reading on top of the 5 ms interval
+    runner, _, _ = make_runner(simulated_device, 10, 0.005, mode=BUFFERED, settings=None)
+    timestamps = []
+    start_time = time.monotonic()
+    assert runner.run(on_sample=lambda index, timestamp, value: timestamps.append(timestamp), start_time=start_time)
+    elapsed = time.monotonic() - start_time
+    assert len(set(timestamps)) == 10 and timestamps == sorted(timestamps)
+    assert 10 * 0.025 <= timestamps[-1] <= elapsed
+    assert timestamps[1] - timestamps[0] >= 0.025
+
+
+def test_cancel_from_another_thread(simulated_device):
+    runner, _, _ = make_runner(simulated_device, 1000, 0.01, mode=PER_SAMPLE)
+    values = []
+    timer = threading.Timer(0.1, runner.cancel)
+    timer.start()
+    assert not runner.run(on_sample=lambda index, timestamp, value: values.append(value))
+    timer.join()
+    assert 0 < len(values) < 1000
+
+
+def test_pause_is_not_counted_as_an_overrun(simulated_device):
+    runner, _, _ = make_runner(simulated_device, 6, 0.01, mode=PER_SAMPLE)
+    timestamps = []
+
+    def on_sample(index, timestamp, value):
+        timestamps.append(timestamp)
+        if index == 2:
+            runner.pause()
+            threading.Timer(0.1, runner.resume).start()
+
+    started = time.monotonic()
+    assert runner.run(on_sample=on_sample)
+    assert time.monotonic() - started >= 0.1
+    assert len(timestamps) == 6
+    assert timestamps[3] - timestamps[2] < 0.05  # The schedule continues after the pause
+    assert runner.scheduler.overruns == 0
+    assert not runner.paused
+
+
+def test_buffer_chunk_size(simulated_device):
+    buffer = DeviceManager().driver(simulated_device).buffer
+    assert buffer_chunk_size(buffer, 10, 0.0, 1.0) == 10
+    assert buffer_chunk_size(buffer, 10000, 0.0, None) == buffer.max_samples
+    assert buffer_chunk_size(buffer, 10000, 0.0, 1.0) == 40  # 0.8 s of 20 ms readings
+    assert buffer_chunk_size(buffer, 10, 2.0, 1.0) == 0
+
+
+def test_buffered_run_is_fetched_in_blocks(simulated_device):
+    runner, _, registry = make_runner(simulated_device, 100, mode=BUFFERED)
+    indexes, progress = [], []
+    assert runner.run(on_sample=lambda index, timestamp, value: indexes.append(index),
+                      on_progress=lambda done, total: progress.append(done))
+    assert indexes == list(range(100))
+    assert progress == [40, 80, 100]
+    assert runner.timing_statistics()["instrument_paced"]
+    assert metric_value(registry, "dmm_samples_total", type="DC Voltage") == 100
+
+
+def test_buffered_run_falls_back_to_per_sample_pacing(simulated_device):
+    # A 2 s interval does not fit in the 1 s I/O timeout
+    runner, _, _ = make_runner(simulated_device, 1, 2.0, mode=BUFFERED)
+    values = []
+    assert runner.run(on_sample=lambda index, timestamp, value: values.append(value))
+    assert runner.mode == PER_SAMPLE
+    assert not runner.timing_statistics()["instrument_paced"]
+    assert len(values) == 1
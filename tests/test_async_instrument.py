@@ -0,0 +1,78 @@
+# test_async_instrument.py
+import asyncio
+import threading
+import time
+from async_instrument import (AsyncAcquisitionRunner, AsyncMeasurement, EventLoopThread, ExecutorInstrument,
+                              acquire_all, retry_policy)
+from conftest import metric_value
+from device_manager import DeviceManager
+from drivers import BUFFERED, PER_SAMPLE
+from metrics import MetricsRegistry
+
+
+def make_runner(device_info, count, interval_seconds=0.0, **options):
+    registry = MetricsRegistry()
+    device_manager = DeviceManager(metrics=registry)
+    driver = device_manager.driver(device_info)
+    device = ExecutorInstrument(device_manager.connect_device(device_info), timeout=device_info["timeout"] / 1000)
+    measurement = AsyncMeasurement(device, driver, registry)
+    options.setdefault("settings", driver.settings("DC Voltage", "Fast"))
+    runner = AsyncAcquisitionRunner(measurement, "DC Voltage", count, interval_seconds, **options)
+    return runner, device_manager, registry
+
+
+def test_measurement_is_named_after_the_resource(simulated_device):
+    runner, _, _ = make_runner(simulated_device, 1)
+    assert runner.measurement.instrument == "SIM::DMM::INSTR"
+
+
+def test_each_io_error_reopens_the_resource_once(simulated_device):
+    simulated_device["simulation"]["error_rate"] = 0.05
+    runner, device_manager, registry = make_runner(simulated_device, 100, mode=PER_SAMPLE)
+    runner.retry = retry_policy(device_manager, simulated_device, initial_delay=0)
+    values = []
+    assert asyncio.run(runner.run(on_sample=lambda index, timestamp, value: values.append(value)))
+    assert len(values) == 100
+    assert runner.retries > 0
+    assert metric_value(registry, "dmm_io_errors_total") == runner.retries
+    assert metric_value(registry, "dmm_reconnects_total") == runner.retries
+
+
+def test_buffered_run_delivers_every_sample(simulated_device):
+    runner, _, _ = make_runner(simulated_device, 25, 0.001, mode=BUFFERED)
+    indices = []
+    assert asyncio.run(runner.run(on_sample=lambda index, timestamp, value: indices.append(index)))
+    assert indices == list(range(25))
+    assert runner.timing_statistics()["instrument_paced"]
+
+
+def test_cancel_from_another_thread(simulated_device):
+    runner, _, _ = make_runner(simulated_device, 1000, 0.01, mode=PER_SAMPLE)
+    timer = threading.Timer(0.1, runner.cancel)
+    timer.start()
+    results = asyncio.run(acquire_all({"dmm": runner}))
+    timer.join()
+    assert results == {"dmm": False}
+
+
+def test_event_loop_thread_runs_submitted_coroutines(simulated_device):
+    runner, _, _ = make_runner(simulated_device, 5, mode=PER_SAMPLE)
+    loop_thread = EventLoopThread().start()
+    try:
+        assert loop_thread.submit(runner.run()).result(timeout=5)
+    finally:
+        loop_thread.stop()
+    assert loop_thread.loop.is_closed()
+
+
+def test_buffered_timestamps_follow_the_elapsed_time(simulated_device):
+    # Without settings the simulated meter integrates for 1 NPLC, 20 ms per reading on top of the 5 ms interval
+    runner, _, _ = make_runner(simulated_device, 10, 0.005, mode=BUFFERED, settings=None)
+    timestamps = []
+    start_time = time.monotonic()
+    assert asyncio.run(runner.run(on_sample=lambda index, timestamp, value: timestamps.append(timestamp),
+                                  start_time=start_time))
+    elapsed = time.monotonic() - start_time
+    assert len(set(timestamps)) == 10 and timestamps == sorted(timestamps)
+    assert 10 * 0.025 <= timestamps[-1] <= elapsed
+    assert timestamps[1] - timestamps[0] >= 0.025
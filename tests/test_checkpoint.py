@@ -0,0 +1,64 @@
+# test_checkpoint.py
+import os
+import pytest
+from checkpoint import Checkpoint, checkpoint_path, find_checkpoints, load_checkpoint, resume_point
+from recorder import Recorder, Recording
+
+METADATA = {"measurement_type": "DC Voltage", "unit": "V", "interval_seconds": 0.5}
+
+
+def test_checkpoint_and_resume_round_trip(tmp_path):
+    path = str(tmp_path / "run.dmmrec")
+    state = {"device": "Simulated_DMM", "measurement_type": "DC Voltage", "num_measurements": 10,
+             "interval_seconds": 0.5}
+    recorder = Recorder(path, METADATA)
+    checkpoint = Checkpoint(recorder, state)
+    for i in range(4):
+        recorder.append(i * 0.5, float(i))
+    checkpoint.update(1.5, force=True)
+    recorder.close()  # The run crashes here, leaving the checkpoint behind
+
+    assert find_checkpoints(str(tmp_path)) == [checkpoint_path(path)]
+    loaded = load_checkpoint(checkpoint_path(path))
+    assert loaded["samples"] == 4
+    assert loaded["recording"] == path
+    assert loaded["last_timestamp"] == 1.5
+    first_index, time_offset = resume_point(loaded)
+    assert (first_index, time_offset) == (4, 2.0)
+
+    with Recorder.reopen(path) as recorder:
+        assert recorder.count == 4
+        for i in range(first_index, 10):
+            recorder.append(time_offset + (i - first_index) * 0.5, float(i))
+    with Recording(path) as recording:
+        assert recording.metadata == METADATA
+        assert [value for _, value in recording] == [float(i) for i in range(10)]
+        assert recording[4][0] == 2.0
+
+    checkpoint.remove()
+    assert not os.path.exists(checkpoint_path(path))
+
+
+def test_checkpoint_writes_at_most_every_interval(tmp_path):
+    recorder = Recorder(str(tmp_path / "run.dmmrec"), METADATA)
+    checkpoint = Checkpoint(recorder, {"interval_seconds": 0.5}, interval_seconds=60)
+    checkpoint.update(force=True)
+    recorder.append(0.0, 1.0)
+    checkpoint.update(0.0)
+    assert load_checkpoint(checkpoint.path)["samples"] == 0
+    checkpoint.update(0.0, force=True)
+    assert load_checkpoint(checkpoint.path)["samples"] == 1
+    recorder.close()
+
+
+def test_resume_point_of_an_empty_recording(tmp_path):
+    Recorder(str(tmp_path / "run.dmmrec"), METADATA).close()
+    path = str(tmp_path / "run.dmmrec")
+    assert resume_point({"recording": path, "interval_seconds": 0.5}) == (0, 0.0)
+
+
+def test_checkpoint_version_is_checked(tmp_path):
+    path = tmp_path / "run.dmmrec.checkpoint"
+    path.write_text('{"version": 99}')
+    with pytest.raises(ValueError):
+        load_checkpoint(str(path))
@@ -0,0 +1,84 @@
+# test_cli.py
+import json
+import os
+import pytest
+from checkpoint import checkpoint_path, load_checkpoint
+from cli import main
+from drivers import DEFAULT_DRIVERS_FILE
+
+
+@pytest.fixture
+def devices_file(tmp_path, simulated_device):
+    path = tmp_path / "devices.json"
+    path.write_text(json.dumps({"Sim": simulated_device}))
+    return path
+
+
+def rows(path):
+    return [line.split("\t") for line in open(path).read().splitlines() if not line.startswith("#")]
+
+
+def comments(path):
+    return [line for line in open(path).read().splitlines() if line.startswith("#")]
+
+
+def test_simulated_run(tmp_path):
+    output = str(tmp_path / "run.txt")
+    assert main(["--simulate", "--count", "5", "--interval", "0", "--output", output]) == 0
+    assert [row[0] for row in rows(output)] == ["0", "1", "2", "3", "4"]
+    assert all(abs(float(row[2]) - 5.0) < 0.1 for row in rows(output))
+
+
+@pytest.mark.parametrize("mode, paced_by_the_instrument", [("per-sample", False), ("buffered", True)])
+def test_mode_option(devices_file, tmp_path, mode, paced_by_the_instrument):
+    output = str(tmp_path / "run.txt")
+    assert main(["--devices-file", str(devices_file), "--device", "Sim", "--count", "5", "--interval", "1",
+                 "--mode", mode, "--output", output]) == 0
+    assert len(rows(output)) == 5
+    assert any("paced by the instrument" in line for line in comments(output)) == paced_by_the_instrument
+
+
+def test_buffered_mode_needs_reading_memory(tmp_path, simulated_device):
+    with open(DEFAULT_DRIVERS_FILE) as file:
+        driver = json.load(file)[simulated_device["driver"]]
+    del driver["buffer"]
+    driver["fastest_mode"] = "per-sample"
+    simulated_device["driver"] = driver
+    path = tmp_path / "devices.json"
+    path.write_text(json.dumps({"Sim": simulated_device}))
+    assert main(["--devices-file", str(path), "--device", "Sim", "--mode", "buffered"]) == 2
+
+
+def test_unknown_device(devices_file):
+    assert main(["--devices-file", str(devices_file), "--device", "Other"]) == 2
+
+
+def test_failed_run_is_resumed_in_the_same_mode(tmp_path, simulated_device):
+    simulated_device["simulation"]["error_rate"] = 0.1
+    devices_file = tmp_path / "devices.json"
+    devices_file.write_text(json.dumps({"Sim": simulated_device}))
+    recording = str(tmp_path / "run.dmmrec")
+    assert main(["--devices-file", str(devices_file), "--device", "Sim", "--count", "20", "--interval", "1",
+                 "--mode", "per-sample", "--retries", "0", "--record", recording,
+                 "--output", str(tmp_path / "failed.txt")]) == 1
+    assert load_checkpoint(checkpoint_path(recording))["mode"] == "per-sample"
+
+    simulated_device["simulation"]["error_rate"] = 0.0
+    devices_file.write_text(json.dumps({"Sim": simulated_device}))
+    output = str(tmp_path / "resumed.txt")
+    assert main(["--devices-file", str(devices_file), "--resume", checkpoint_path(recording), "--output", output]) == 0
+    assert len(rows(output)) == 20
+    assert not any("paced by the instrument" in line for line in comments(output))
+    assert not os.path.exists(checkpoint_path(recording))
+
+
+def test_all_devices(tmp_path, simulated_device):
+    devices = {name: dict(simulated_device, resource_string=f"SIM::{name}::INSTR") for name in ("A", "B")}
+    devices_file = tmp_path / "devices.json"
+    devices_file.write_text(json.dumps(devices))
+    output = str(tmp_path / "run.txt")
+    assert main(["--devices-file", str(devices_file), "--all-devices", "--count", "5", "--interval", "20",
+                 "--output", output]) == 0
+    assert comments(output)[-1].split("\t") == ["# tick", "A_timestamp_s", "A_value", "B_timestamp_s", "B_value"]
+    assert len(rows(output)) == 5
+    assert all(len(row) == 5 and all(row) for row in rows(output))
@@ -0,0 +1,54 @@
+# test_decimation.py
+import pytest
+from decimation import MinMaxDecimator
+
+
+def test_capacity_must_be_even():
+    with pytest.raises(ValueError):
+        MinMaxDecimator(capacity=5)
+    with pytest.raises(ValueError):
+        MinMaxDecimator(capacity=0)
+
+
+def test_few_samples_are_kept_as_they_are():
+    decimator = MinMaxDecimator(capacity=8)
+    decimator.extend([(0.0, 1.0), (1.0, 3.0), (2.0, 2.0)])
+    assert decimator.count == 3
+    assert list(decimator.minimums[:3]) == [1.0, 3.0, 2.0]
+    assert list(decimator.maximums[:3]) == [1.0, 3.0, 2.0]
+
+
+def test_buckets_stay_bounded_and_keep_spikes():
+    decimator = MinMaxDecimator(capacity=16)
+    for i in range(10000):
+        decimator.add(i * 0.001, 100.0 if i == 6789 else 0.0)
+    decimator.add(10.0, -50.0)
+    assert decimator.count <= 16
+    assert decimator.samples == 10001
+    assert max(decimator.maximums[:decimator.count]) == 100.0
+    assert min(decimator.minimums[:decimator.count]) == -50.0
+    assert decimator.minimum == -50.0 and decimator.maximum == 100.0
+    assert decimator.last_time == 10.0
+
+
+def test_columns_reduce_to_the_width():
+    decimator = MinMaxDecimator(capacity=64)
+    for i in range(64):
+        decimator.add(float(i), float(i % 4))
+    xs, minimums, maximums = decimator.columns(8)
+    assert len(xs) <= 8
+    assert xs[0] == 0 and xs[-1] == 7
+    assert min(minimums) == 0.0 and max(maximums) == 3.0
+
+
+def test_columns_of_an_empty_decimator():
+    assert MinMaxDecimator().columns(100) == ([], [], [])
+
+
+def test_reset_starts_over():
+    decimator = MinMaxDecimator(capacity=4)
+    decimator.extend((float(i), float(i)) for i in range(20))
+    decimator.reset()
+    assert decimator.count == 0
+    assert decimator.bucket_size == 1
+    assert decimator.minimum is None
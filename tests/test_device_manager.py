@@ -0,0 +1,66 @@
+# test_device_manager.py
+import threading
+import pytest
+from conftest import metric_value
+from device_manager import DeviceManager
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def device_manager():
+    device_manager = DeviceManager(metrics=MetricsRegistry())
+    yield device_manager
+    device_manager.close_all()
+
+
+def test_connections_are_pooled(device_manager, simulated_device):
+    connection = device_manager.connect_device(simulated_device)
+    assert device_manager.connect_device(simulated_device) is connection
+    assert metric_value(device_manager.metrics, "dmm_connections_open") == 1
+    assert device_manager.identify(simulated_device).startswith("Simulated,DMM-SIM")
+    connection.resource.close()
+    assert device_manager.identify(simulated_device).startswith("Simulated,DMM-SIM")  # Cached, no I/O
+    assert metric_value(device_manager.metrics, "dmm_reconnects_total") == 0
+
+
+def test_concurrent_connects_open_the_resource_once(device_manager, simulated_device):
+    connections = []
+    threads = [threading.Thread(target=lambda: connections.append(device_manager.connect_device(simulated_device)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(connections) == 8
+    assert all(connection is connections[0] for connection in connections)
+    assert metric_value(device_manager.metrics, "dmm_connections_open") == 1
+
+
+def test_stale_resource_is_reopened_on_connect(device_manager, simulated_device):
+    connection = device_manager.connect_device(simulated_device)
+    stale = connection.resource
+    stale.close()  # e.g. the instrument was power cycled
+    assert device_manager.connect_device(simulated_device) is connection
+    assert not connection.resource.closed
+    assert float(connection.query(":MEASure:VOLTage:DC?")) == pytest.approx(5.0, abs=0.1)
+    assert metric_value(device_manager.metrics, "dmm_reconnects_total", instrument="SIM::DMM::INSTR") == 1
+
+
+def test_io_errors_are_counted_and_raised(device_manager, simulated_device):
+    simulated_device["simulation"]["error_rate"] = 1.0
+    connection = device_manager.connect_device(simulated_device)
+    with pytest.raises(TimeoutError):
+        connection.query("*IDN?")
+    assert metric_value(device_manager.metrics, "dmm_io_errors_total", kind="timeout") == 1
+
+
+def test_closed_devices_leave_the_pool(device_manager, simulated_device):
+    other = dict(simulated_device, resource_string="SIM::OTHER::INSTR")
+    connection = device_manager.connect_device(simulated_device)
+    device_manager.connect_device(other)
+    assert metric_value(device_manager.metrics, "dmm_connections_open") == 2
+    device_manager.close_device(simulated_device)
+    assert metric_value(device_manager.metrics, "dmm_connections_open") == 1
+    assert device_manager.connect_device(simulated_device) is not connection
+    device_manager.close_all()
+    assert metric_value(device_manager.metrics, "dmm_connections_open") == 0
@@ -0,0 +1,89 @@
+# test_drivers.py
+import copy
+import json
+import pytest
+from drivers import BUFFERED, DEFAULT_DEVICES_FILE, DEFAULT_DRIVERS_FILE, DriverRegistry, default_registry, load_devices
+
+BK = "bk_precision_5490_series"
+
+
+@pytest.fixture
+def definition():
+    with open(DEFAULT_DRIVERS_FILE) as file:
+        return copy.deepcopy(json.load(file)[BK])
+
+
+def test_default_devices_use_registered_drivers():
+    devices = load_devices()
+    assert devices == load_devices(DEFAULT_DEVICES_FILE)
+    for device_info in devices.values():
+        assert default_registry().for_device(device_info).name == BK
+
+
+def test_inline_and_unknown_drivers(definition):
+    registry = DriverRegistry()
+    driver = registry.for_device({"resource_string": "SIM::X::INSTR", "driver": definition})
+    assert driver.fastest_mode == BUFFERED
+    assert driver.function("DC Voltage").measure.raw == b":MEASure:VOLTage:DC?\n"
+    with pytest.raises(ValueError):
+        registry.for_device({"driver": "other"})
+    with pytest.raises(ValueError):
+        driver.function("Capacitance")
+
+
+def test_write_termination_is_encoded_once(definition):
+    definition["write_termination"] = "\r\n"
+    driver = DriverRegistry().register("crlf", definition)
+    assert driver.fetch.raw == b":FETCh?\r\n"
+    assert driver.buffer.sample_count.format(count=5).raw == b":SAMPle:COUNt 5\r\n"
+
+
+def test_buffered_mode_needs_buffer_commands(definition):
+    del definition["buffer"]
+    with pytest.raises(ValueError):
+        DriverRegistry().register("no buffer", definition)
+    del definition["fastest_mode"]
+    assert DriverRegistry().register("no buffer", definition).fastest_mode == "per-sample"
+
+
+def test_speed_presets_must_use_supported_nplc_values(definition):
+    definition["speeds"]["Fast"]["nplc"] = 0.05
+    with pytest.raises(ValueError, match="NPLC 0.05"):
+        DriverRegistry().register("bad preset", definition)
+
+
+def test_settings_of_a_speed_preset():
+    driver = default_registry().drivers[BK]
+    settings = driver.settings("DC Voltage", "Fast", 10)
+    assert settings == {"measurement_type": "DC Voltage", "speed": "Fast", "range": 10, "nplc": 0.02,
+                        "autozero": False, "display": False}
+    assert [command.text for command in driver.configure_commands(settings)] == [
+        ":CONFigure:VOLTage:DC", ":SENSe:VOLTage:DC:RANGe 10", ":SENSe:VOLTage:DC:NPLCycles 0.02",
+        ":SENSe:ZERO:AUTO OFF", ":DISPlay:ENABle OFF"]
+
+
+def test_settings_leave_out_what_the_function_cannot_set():
+    driver = default_registry().drivers[BK]
+    settings = driver.settings("Diode", "Accurate")
+    assert settings == {"measurement_type": "Diode", "speed": "Accurate", "autozero": True, "display": True}
+    assert [command.text for command in driver.configure_commands(settings)] == [
+        ":CONFigure:DIODe", ":SENSe:ZERO:AUTO ON", ":DISPlay:ENABle ON"]
+    assert driver.configure_commands(driver.settings("Resistance"))[1].text == ":SENSe:RESistance:RANGe:AUTO ON"
+
+
+def test_invalid_settings_are_rejected():
+    driver = default_registry().drivers[BK]
+    with pytest.raises(ValueError):
+        driver.settings("DC Voltage", "Turbo")
+    with pytest.raises(ValueError):
+        driver.settings("DC Voltage", "Fast", 3)
+    with pytest.raises(ValueError):
+        driver.settings("Diode", measurement_range=1)
+
+
+def test_buffer_commands_keep_the_configured_function():
+    driver = default_registry().drivers[BK]
+    commands = [command.text for command in driver.buffer_commands("DC Voltage", 100, 0.5)]
+    assert commands == [":CONFigure:VOLTage:DC", ":TRIGger:SOURce IMMediate", ":TRIGger:COUNt 1",
+                        ":TRIGger:DELay 0.5", ":SAMPle:COUNt 100"]
+    assert driver.buffer_commands("DC Voltage", 100, 0.5, configured=True)[0].text == ":TRIGger:SOURce IMMediate"
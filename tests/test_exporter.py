@@ -0,0 +1,75 @@
+# test_exporter.py
+import os
+import threading
+import pytest
+from exporter import clipboard_text, export_columnar, export_csv, export_report, load_columnar
+from recorder import Recorder
+
+SAMPLES = [(i * 0.25, 1.0 + i / 8) for i in range(100)]
+
+
+@pytest.fixture
+def recording_path(tmp_path):
+    path = str(tmp_path / "run.dmmrec")
+    with Recorder(path, {"measurement_type": "DC Voltage", "unit": "V"}) as recorder:
+        for timestamp, value in SAMPLES:
+            recorder.append(timestamp, value)
+    return path
+
+
+def test_csv_export(recording_path, tmp_path):
+    path = str(tmp_path / "run.csv")
+    progress = []
+    assert export_csv(recording_path, path, {"serial": "SN1"}, on_progress=lambda done, total: progress.append(done),
+                      chunk_size=30)
+    lines = open(path).read().splitlines()
+    assert lines[:4] == ["# measurement_type: DC Voltage", "# unit: V", "# serial: SN1", "timestamp_s,value"]
+    assert lines[4] == "0.000000,1.0"
+    assert len(lines) == 4 + len(SAMPLES)
+    assert progress == [30, 60, 90, 100]
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_report_export(recording_path, tmp_path):
+    path = str(tmp_path / "run.txt")
+    assert export_report(recording_path, path, ["Device: Simulated"], ["Average Value: 7.1875 V"])
+    lines = open(path).read().splitlines()
+    assert lines[0] == "Device: Simulated"
+    assert lines[2] == "0.000000\t1.0"
+    assert lines[-1] == "Average Value: 7.1875 V"
+
+
+def test_columnar_round_trip(recording_path, tmp_path):
+    path = str(tmp_path / "run.dmmcol")
+    assert export_columnar(recording_path, path, {"serial": "SN1"}, chunk_size=7)
+    metadata, columns = load_columnar(path)
+    assert metadata["rows"] == len(SAMPLES)
+    assert metadata["serial"] == "SN1"
+    assert all(column["offset"] % 16 == 0 for column in metadata["columns"])
+    assert list(columns["timestamp_s"]) == [timestamp for timestamp, _ in SAMPLES]
+    assert list(columns["value"]) == [value for _, value in SAMPLES]
+
+
+def test_load_columnar_rejects_other_files(recording_path):
+    with pytest.raises(ValueError):
+        load_columnar(recording_path)
+
+
+def test_cancelled_export_leaves_the_target_untouched(recording_path, tmp_path):
+    path = tmp_path / "run.csv"
+    path.write_text("previous export\n")
+    cancel_event = threading.Event()
+    assert not export_csv(recording_path, str(path), on_progress=lambda done, total: cancel_event.set(),
+                          cancel_event=cancel_event, chunk_size=10)
+    assert path.read_text() == "previous export\n"
+    assert not os.path.exists(str(path) + ".tmp")
+
+
+def test_clipboard_text_is_limited(recording_path):
+    text, copied, total = clipboard_text(recording_path, ["Device: Simulated"], max_samples=10)
+    lines = text.splitlines()
+    assert (copied, total) == (10, len(SAMPLES))
+    assert lines[:3] == ["Device: Simulated", "", "timestamp_s\tvalue"]
+    assert len(lines) == 3 + 10
+    text, copied, total = clipboard_text(recording_path)
+    assert copied == total == len(SAMPLES)
@@ -0,0 +1,72 @@
+# test_metrics.py
+import json
+import logging
+import urllib.request
+import pytest
+from metrics import JsonFormatter, MetricsRegistry, MetricsServer, log_event
+
+
+def test_same_labels_return_the_same_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter("dmm_samples_total", "Samples read", instrument="A", type="DC Voltage")
+    assert registry.counter("dmm_samples_total", "Samples read", type="DC Voltage", instrument="A") is counter
+    assert registry.counter("dmm_samples_total", "Samples read", instrument="B", type="DC Voltage") is not counter
+    with pytest.raises(ValueError):
+        registry.gauge("dmm_samples_total", "Samples read")
+
+
+def test_render_counters_and_gauges():
+    registry = MetricsRegistry()
+    registry.counter("dmm_io_errors_total", "Failed I/O calls", instrument='SIM::"A"', kind="timeout").inc(2)
+    registry.gauge("dmm_connections_open", "Resources in the DeviceManager pool").set(3)
+    assert registry.render().splitlines() == [
+        "# HELP dmm_connections_open Resources in the DeviceManager pool",
+        "# TYPE dmm_connections_open gauge",
+        "dmm_connections_open 3",
+        "# HELP dmm_io_errors_total Failed I/O calls",
+        "# TYPE dmm_io_errors_total counter",
+        'dmm_io_errors_total{instrument="SIM::\\"A\\"",kind="timeout"} 2.0',
+    ]
+
+
+def test_render_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("dmm_reading_seconds", "Time per reading", buckets=(0.01, 0.1), mode="buffered")
+    for value in (0.005, 0.05, 0.05, 5.0):
+        histogram.observe(value)
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'dmm_reading_seconds_bucket{mode="buffered",le="0.01"} 1',
+        'dmm_reading_seconds_bucket{mode="buffered",le="0.1"} 3',
+        'dmm_reading_seconds_bucket{mode="buffered",le="+Inf"} 4',
+        'dmm_reading_seconds_sum{mode="buffered"} 5.105',
+        'dmm_reading_seconds_count{mode="buffered"} 4',
+    ]
+
+
+def test_metrics_server():
+    registry = MetricsRegistry()
+    registry.counter("dmm_retries_total", "Readings retried", instrument="A").inc()
+    server = MetricsServer(registry, port=0).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert response.read().decode("utf-8") == registry.render()
+    finally:
+        server.stop()
+
+
+def test_json_log_records_carry_their_fields():
+    logger = logging.getLogger("dmm.test")
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        log_event(logger, logging.WARNING, "I/O error", instrument="A", attempt=2)
+    finally:
+        logger.removeHandler(handler)
+    entry = json.loads(JsonFormatter().format(records[0]))
+    assert entry["message"] == "I/O error"
+    assert entry["level"] == "WARNING"
+    assert (entry["instrument"], entry["attempt"]) == ("A", 2)
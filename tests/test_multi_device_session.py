@@ -0,0 +1,61 @@
+# test_multi_device_session.py
+from device_manager import DeviceManager
+from drivers import PER_SAMPLE
+from metrics import MetricsRegistry
+from multi_device_session import MultiDeviceSession, schedule_tick
+
+INTERVAL = 0.02
+
+
+def simulated_devices(**latencies):
+    return {name: {"resource_string": f"SIM::{name}::INSTR", "timeout": 1000, "driver": "bk_precision_5490_series",
+                   "simulation": {"latency": latency, "noise": 0.001, "seed": 1}}
+            for name, latency in latencies.items()}
+
+
+def open_session(devices):
+    session = MultiDeviceSession(DeviceManager(metrics=MetricsRegistry()), devices)
+    assert session.open() == list(devices)
+    return session
+
+
+def test_schedule_tick():
+    assert schedule_tick(3, 0.098, 0.02) == 5
+    assert schedule_tick(3, 0.098, 0.0) == 3
+
+
+def test_rows_hold_every_device():
+    session = open_session(simulated_devices(A=0.0, B=0.0))
+    rows = list(session.acquire("DC Voltage", 10, INTERVAL, mode=PER_SAMPLE))
+    assert [tick for tick, _ in rows] == list(range(10))
+    assert all(set(readings) == {"A", "B"} for _, readings in rows)
+    assert not session.errors
+
+
+def test_skipped_samples_line_up_by_tick():
+    # B needs about two intervals per reading and skips the samples in between
+    session = open_session(simulated_devices(A=0.0, B=INTERVAL))
+    rows = list(session.acquire("DC Voltage", 10, INTERVAL, mode=PER_SAMPLE))
+    ticks = [tick for tick, _ in rows]
+    assert ticks == sorted(set(ticks))
+    assert session.runners["B"].scheduler.skipped > 0
+    shared = [readings for _, readings in rows if set(readings) == {"A", "B"}]
+    assert shared
+    assert all(abs(readings["A"][0] - readings["B"][0]) < INTERVAL / 2 for readings in shared)
+
+
+def test_rows_are_not_held_back_beyond_max_pending():
+    # A is done long before B delivers its first sample
+    session = open_session(simulated_devices(A=0.0, B=0.01))
+    rows = list(session.acquire("DC Voltage", 10, 0.0, mode=PER_SAMPLE, max_pending=2))
+    assert sorted(tick for tick, readings in rows if "A" in readings) == list(range(10))
+    assert sorted(tick for tick, readings in rows if "B" in readings) == list(range(10))
+    assert any(set(readings) == {"B"} for _, readings in rows)  # Late samples of B in rows of their own
+
+
+def test_stopping_early_cancels_the_devices():
+    session = open_session(simulated_devices(A=0.0, B=0.0))
+    rows = session.acquire("DC Voltage", 1000, 0.0, mode=PER_SAMPLE, max_pending=4)
+    assert next(rows)[0] == 0
+    rows.close()
+    assert all(runner.cancelled for runner in session.runners.values())
@@ -0,0 +1,51 @@
+# test_recorder.py
+import pytest
+from recorder import MAGIC, RECORD_SIZE, Recorder, Recording, identification_metadata
+
+METADATA = {"measurement_type": "DC Voltage", "unit": "V", "interval_seconds": 0.5}
+
+
+def record(path, samples, metadata=METADATA):
+    with Recorder(path, metadata) as recorder:
+        for timestamp, value in samples:
+            recorder.append(timestamp, value)
+    return path
+
+
+def test_recording_round_trip(tmp_path):
+    samples = [(i * 0.5, 5.0 + i * 1e-3) for i in range(1000)]
+    path = record(str(tmp_path / "run.dmmrec"), samples)
+    with open(path, "rb") as file:
+        assert file.read(len(MAGIC)) == MAGIC
+    with Recording(path) as recording:
+        assert recording.metadata == METADATA
+        assert len(recording) == 1000
+        assert list(recording) == samples
+        assert recording[-1] == samples[-1]
+        chunks = list(recording.iter_chunks(300))
+        assert [len(values) for _, values in chunks] == [300, 300, 300, 100]
+        assert chunks[1][0][0] == samples[300][0]
+        with pytest.raises(IndexError):
+            recording[1000]
+
+
+def test_partial_trailing_record_is_ignored(tmp_path):
+    path = record(str(tmp_path / "run.dmmrec"), [(0.0, 1.0), (0.5, 2.0)])
+    with open(path, "ab") as file:
+        file.write(b"\0" * (RECORD_SIZE // 2))  # A crash in the middle of a write
+    with Recording(path) as recording:
+        assert len(recording) == 2
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"something else entirely")
+    with pytest.raises(ValueError):
+        Recording(str(path))
+
+
+def test_identification_metadata():
+    metadata = identification_metadata("BK Precision, 5493C ,SN123")
+    assert metadata["device"] == "5493C"
+    assert metadata["serial_number"] == "SN123"
+    assert metadata["hardware_version"] == ""
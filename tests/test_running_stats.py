@@ -0,0 +1,61 @@
+# test_running_stats.py
+import random
+import statistics
+import pytest
+from running_stats import RunningStatistics, format_statistics
+
+
+def test_matches_batch_statistics():
+    rng = random.Random(7)
+    values = [rng.gauss(5.0, 0.01) for _ in range(1000)]
+    stats = RunningStatistics()
+    for value in values:
+        stats.add(value)
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.std == pytest.approx(statistics.stdev(values))
+    assert stats.minimum == min(values)
+    assert stats.maximum == max(values)
+    assert stats.last == values[-1]
+
+
+def test_moving_average_covers_the_window():
+    stats = RunningStatistics(window=3)
+    for value in [1.0, 2.0, 3.0, 4.0, 5.0]:
+        stats.add(value)
+    assert stats.moving_average == pytest.approx(4.0)
+
+
+def test_drift_is_the_slope_over_time():
+    stats = RunningStatistics()
+    for i in range(10):
+        stats.add(1.0 + 0.25 * i * 0.5, timestamp=i * 0.5)  # 0.25 units per second
+    assert stats.drift == pytest.approx(0.25)
+
+
+def test_empty_and_single_sample():
+    stats = RunningStatistics()
+    snapshot = stats.snapshot()
+    assert snapshot["count"] == 0
+    assert snapshot["mean"] is None
+    assert format_statistics(snapshot) == ["No samples"]
+    stats.add(3.0)
+    assert stats.variance == 0.0
+    assert stats.drift == 0.0
+
+
+def test_reset_clears_everything():
+    stats = RunningStatistics()
+    stats.add(1.0)
+    stats.add(2.0)
+    stats.reset()
+    assert stats.snapshot() == RunningStatistics().snapshot()
+
+
+def test_format_statistics_includes_unit():
+    stats = RunningStatistics()
+    for value in [1.0, 2.0, 3.0]:
+        stats.add(value)
+    lines = format_statistics(stats.snapshot(), "V")
+    assert lines[0] == "Average Value: 2.0 V"
+    assert lines[2] == "Min: 1.00000 V, Max: 3.00000 V"
@@ -0,0 +1,104 @@
+# test_scheduler.py
+import pytest
+from scheduler import CATCH_UP, SKIP, SampleScheduler, format_timing
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def take(scheduler, clock, duration):
+    """
+    Take one sample at its deadline (or now, if late) that keeps the instrument busy for duration seconds.
+    """
+    deadline = scheduler.next_deadline()
+    clock.now = max(clock.now, deadline)
+    timestamp = scheduler.taken(deadline)
+    clock.now += duration
+    return timestamp
+
+
+def test_samples_follow_the_deadline_grid():
+    clock = FakeClock()
+    scheduler = SampleScheduler(0.5, clock=clock)
+    scheduler.start()
+    timestamps = [take(scheduler, clock, 0.1) for _ in range(4)]
+    assert timestamps == pytest.approx([0.0, 0.5, 1.0, 1.5])
+    stats = scheduler.statistics()
+    assert stats["mean_interval"] == pytest.approx(0.5)
+    assert stats["overruns"] == 0
+    assert stats["max_jitter"] == pytest.approx(0.0)
+
+
+def test_skip_drops_missed_deadlines():
+    clock = FakeClock()
+    scheduler = SampleScheduler(0.5, SKIP, clock=clock)
+    scheduler.start()
+    take(scheduler, clock, 1.2)  # Overruns the next two deadlines
+    assert take(scheduler, clock, 0.1) == pytest.approx(1.5)
+    assert scheduler.overruns == 1
+    assert scheduler.skipped == 2
+
+
+def test_catch_up_takes_missed_samples_back_to_back():
+    clock = FakeClock()
+    scheduler = SampleScheduler(0.5, CATCH_UP, clock=clock)
+    scheduler.start()
+    take(scheduler, clock, 1.2)
+    late = take(scheduler, clock, 0.0)
+    assert late == pytest.approx(1.2)
+    assert scheduler.skipped == 0
+    assert scheduler.overruns == 1
+    assert take(scheduler, clock, 0.0) == pytest.approx(1.2)  # The 1.0 s slot, still late but within an interval
+    assert take(scheduler, clock, 0.0) == pytest.approx(1.5)
+
+
+def test_free_running_without_interval():
+    clock = FakeClock()
+    scheduler = SampleScheduler(0, clock=clock)
+    scheduler.start()
+    assert [take(scheduler, clock, 0.01) for _ in range(3)] == pytest.approx([0.0, 0.01, 0.02])
+    assert scheduler.statistics()["mean_jitter"] == 0.0
+
+
+def test_reset_deadline_does_not_count_a_pause_as_overrun():
+    clock = FakeClock()
+    scheduler = SampleScheduler(0.5, clock=clock)
+    scheduler.start()
+    take(scheduler, clock, 0.1)
+    clock.now += 10.0
+    scheduler.reset_deadline()
+    take(scheduler, clock, 0.1)
+    assert scheduler.overruns == 0
+
+
+def test_skip_to_now_continues_a_resumed_run():
+    clock = FakeClock()
+    scheduler = SampleScheduler(0.5, clock=clock)
+    scheduler.start(clock.now - 2.2)  # The recording already holds 2.2 s of samples
+    scheduler.skip_to_now()
+    assert take(scheduler, clock, 0.1) == pytest.approx(2.5)
+    assert scheduler.skipped == 0
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        SampleScheduler(1.0, "sometimes")
+
+
+def test_format_timing():
+    clock = FakeClock()
+    scheduler = SampleScheduler(0.5, clock=clock)
+    scheduler.start()
+    take(scheduler, clock, 0.1)
+    take(scheduler, clock, 0.1)
+    lines = format_timing(scheduler.statistics())
+    assert lines[0] == "Requested interval: 500.000 ms"
+    assert lines[1] == "Actual mean interval: 500.000 ms"
+    assert lines[-1].startswith("Overruns: 0")
+    paced = format_timing(dict(scheduler.statistics(), instrument_paced=True))
+    assert len(paced) == 2 and paced[1].startswith("Timing: paced by the instrument")
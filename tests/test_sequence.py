@@ -0,0 +1,73 @@
+# test_sequence.py
+import json
+import pytest
+from device_manager import DeviceManager
+from metrics import MetricsRegistry
+import sequence
+
+PLAN = {
+    "name": "Power board",
+    "device": "Sim",
+    "steps": [
+        {"name": "5V rail", "type": "DC Voltage", "count": 5, "speed": "Fast", "range": 10,
+         "setup": [":ROUTe:CLOSe (@101)"], "limits": {"low": 4.9, "high": 5.1, "max_std": 0.01}},
+        {"name": "Pull-up", "type": "Resistance", "count": 3, "limits": {"low": 9500, "high": 10500}},
+        {"name": "Diode", "type": "Diode", "count": 2, "mode": "per-sample"},
+    ],
+}
+
+
+def run_plan(simulated_device, definition=PLAN):
+    runner = sequence.SequenceRunner(DeviceManager(metrics=MetricsRegistry()), {"Sim": simulated_device},
+                                     sequence.TestPlan(definition))
+    return runner.run("SN0001")
+
+
+def test_steps_are_checked_against_their_limits(simulated_device):
+    result = run_plan(simulated_device)
+    assert result["completed"] and not result["passed"]
+    rail, pull_up, diode = result["steps"]
+    assert rail["passed"] and len(rail["samples"]) == 5
+    assert rail["settings"]["nplc"] == 0.02
+    assert not pull_up["passed"]
+    assert pull_up["failures"][0].endswith("< low limit 9500")
+    assert diode["passed"] and diode["statistics"]["count"] == 2
+    assert result["identifications"]["Sim"].startswith("Simulated")
+
+
+def test_stop_on_fail(simulated_device):
+    result = run_plan(simulated_device, dict(PLAN, stop_on_fail=True))
+    assert [step["name"] for step in result["steps"]] == ["5V rail", "Pull-up"]
+    assert not result["completed"]
+
+
+def test_plan_is_validated_before_measuring(simulated_device):
+    plan = dict(PLAN, steps=PLAN["steps"] + [{"type": "DC Voltage", "speed": "Turbo"},
+                                             {"type": "DC Voltage", "device": "Other"}])
+    with pytest.raises(ValueError) as error:
+        run_plan(simulated_device, plan)
+    assert "Turbo" in str(error.value) and "unknown device Other" in str(error.value)
+
+
+def test_step_definitions():
+    with pytest.raises(ValueError):
+        sequence.TestStep({"type": "DC Voltage"})
+    with pytest.raises(ValueError):
+        sequence.TestStep({"type": "DC Voltage", "count": 0}, "Sim")
+    assert sequence.TestStep({"type": "DC Voltage"}, "Sim").check({"count": 0}) == ["no samples"]
+    with pytest.raises(ValueError):
+        sequence.TestPlan({"steps": []})
+
+
+def test_main_writes_one_result_per_unit(tmp_path, simulated_device):
+    plan_path = tmp_path / "plan.json"
+    plan_path.write_text(json.dumps(dict(PLAN, steps=PLAN["steps"][:1])))
+    devices_path = tmp_path / "devices.json"
+    devices_path.write_text(json.dumps({"Sim": simulated_device}))
+    output_dir = tmp_path / "results"
+    assert sequence.main([str(plan_path), "--serial", "SN/1", "--devices-file", str(devices_path),
+                 "--output-dir", str(output_dir)]) == 0
+    [path] = output_dir.iterdir()
+    assert path.name.startswith("SN_1_Power_board_")
+    result = json.loads(path.read_text())
+    assert result["passed"] and result["unit_id"] == "SN/1"
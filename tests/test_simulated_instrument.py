@@ -0,0 +1,110 @@
+# test_simulated_instrument.py
+import time
+import pytest
+from simulated_instrument import SimulatedInstrument, SimulatedTimeoutError, normalize_command
+
+
+def test_normalize_command_uses_short_form():
+    assert normalize_command(":MEASure:VOLTage:DC?") == ("MEAS:VOLT:DC?", "")
+    assert normalize_command(":SENSe:VOLTage:DC:NPLCycles 10\n") == ("SENS:VOLT:DC:NPLC", "10")
+    assert normalize_command("*idn?") == ("*IDN?", "")
+
+
+def test_identification_and_status():
+    instrument = SimulatedInstrument(identification="Sim,Model,SN1,2.0,3.0")
+    assert instrument.query("*IDN?") == "Sim,Model,SN1,2.0,3.0\n"
+    assert instrument.query("*STB?") == "0\n"
+
+
+def test_measure_returns_reading_near_nominal():
+    instrument = SimulatedInstrument(values={"RES": 470.0}, noise=0.01, seed=1)
+    instrument.nplc = 0.01
+    assert float(instrument.query(":MEASure:RESistance?")) == pytest.approx(470.0, abs=0.1)
+
+
+def test_fetch_waits_in_read_not_in_write():
+    instrument = SimulatedInstrument(seed=1)
+    instrument.write(":SENSe:VOLTage:DC:NPLCycles 5")  # 0.1 s per reading at 50 Hz
+    instrument.write(":TRIGger:SINGle")
+
+    start = time.monotonic()
+    instrument.write(":FETCh?")
+    write_seconds = time.monotonic() - start
+    start = time.monotonic()
+    response = instrument.read()
+    read_seconds = time.monotonic() - start
+
+    assert write_seconds < 0.05
+    assert read_seconds >= 0.05
+    assert float(response) == pytest.approx(5.0, abs=0.1)
+
+
+def test_read_times_out_when_the_measurement_takes_too_long():
+    instrument = SimulatedInstrument(timeout=20)
+    instrument.write(":SENSe:VOLTage:DC:NPLCycles 10")  # 0.2 s per reading
+    instrument.write(":TRIGger:SINGle")
+    instrument.write(":FETCh?")
+    with pytest.raises(SimulatedTimeoutError):
+        instrument.read()
+
+
+def test_fetch_without_trigger_has_no_response():
+    instrument = SimulatedInstrument()
+    instrument.write(":FETCh?")
+    with pytest.raises(SimulatedTimeoutError):
+        instrument.read()
+    assert instrument.query(":SYSTem:ERRor?").startswith("-230")
+
+
+def test_new_command_discards_unread_output():
+    instrument = SimulatedInstrument()
+    instrument.write("*IDN?")
+    instrument.write("*CLS")
+    with pytest.raises(SimulatedTimeoutError):
+        instrument.read()
+
+
+def test_buffered_fetch_returns_all_readings():
+    instrument = SimulatedInstrument(seed=1)
+    instrument.write(":SENSe:VOLTage:DC:NPLCycles 0.02")
+    instrument.write(":SAMPle:COUNt 5")
+    instrument.write(":INITiate")
+    readings = instrument.query(":FETCh?").strip().split(",")
+    assert len(readings) == 5
+
+
+def test_unknown_command_is_queued_as_error():
+    instrument = SimulatedInstrument()
+    instrument.write(":BOGus:COMMand")
+    assert instrument.query(":SYSTem:ERRor?").startswith("-113")
+    assert instrument.query(":SYSTem:ERRor?") == '+0,"No error"\n'
+
+
+def test_injected_errors_and_closed_resource():
+    instrument = SimulatedInstrument(error_rate=1.0)
+    with pytest.raises(SimulatedTimeoutError):
+        instrument.write("*IDN?")
+    instrument = SimulatedInstrument()
+    instrument.close()
+    with pytest.raises(SimulatedTimeoutError):
+        instrument.query("*IDN?")
+
+
+def test_seed_makes_readings_reproducible():
+    first = SimulatedInstrument(seed=42)
+    second = SimulatedInstrument(seed=42)
+    for instrument in (first, second):
+        instrument.nplc = 0.01
+    assert first.query(":MEASure:VOLTage:DC?") == second.query(":MEASure:VOLTage:DC?")
+
+
+def test_reopened_session_keeps_the_settings_but_not_the_output():
+    instrument = SimulatedInstrument(seed=1)
+    instrument.write(":SENSe:VOLTage:DC:NPLCycles 0.02")
+    instrument.write("*IDN?")
+    instrument.close()
+    instrument.open()
+    with pytest.raises(SimulatedTimeoutError):
+        instrument.read()
+    assert instrument.nplc == 0.02
+    assert float(instrument.query(":MEASure:VOLTage:DC?")) == pytest.approx(5.0, abs=0.1)